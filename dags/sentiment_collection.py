@@ -75,7 +75,7 @@ collect_data = BashOperator(
 # Task 2: Deduplicate data
 deduplicate_data = BashOperator(
     task_id='deduplicate_data',
-    bash_command='cd /opt/airflow && python src/deduplicate_data.py',
+    bash_command='cd /opt/airflow && python src/deduplicate_data.py --incremental',
     dag=dag,
 )
 
@@ -94,7 +94,14 @@ auto_score = BashOperator(
     dag=dag,
 )
 
-    # Task 5: Log Success
+    # Task 5: Per-ticker daily features from the newly scored articles
+ticker_features = BashOperator(
+    task_id='build_ticker_features',
+    bash_command='cd /opt/airflow && python src/ticker_features.py',
+    dag=dag,
+)
+
+    # Task 6: Log Success
 log_success = BashOperator(
     task_id='log_success',
     bash_command='echo "Daily Sentiment Pipeline Completed Successfully at $(date)"',
@@ -102,4 +109,4 @@ log_success = BashOperator(
 )
 
     # Define task dependencies
-collect_data >> deduplicate_data >> quality_check >> auto_score >> log_success
+collect_data >> deduplicate_data >> quality_check >> auto_score >> ticker_features >> log_success
@@ -1,10 +1,23 @@
 import streamlit as st
 import ollama
-import yfinance as yf
+import html
 import plotly.graph_objects as go
-import json
 import pandas as pd
 import time
+import os
+import re
+from batch_jobs import JobManager
+from fast_classifier import CONFIDENCE_THRESHOLD, MODEL_FILE, Cascade, FastClassifier
+from keyword_matcher import KeywordMatcher
+from label_cache import LabelCache
+from market_data import MarketDataStore, market_overview
+from stock_data import STOCK_DATA, is_current_tag
+from ticker_features import latest_scores
+from ticker_index import TickerIndex, article_date
+from upload_reader import file_kind, read_chunks, read_preview
+from structured_output import (
+    NUM_PREDICT, PARSE_ERROR, SENTIMENT_SCHEMA, ParseError, StreamingLabel, label_with_retries
+)
 
 # --- Page Config ---
 st.set_page_config(
@@ -87,198 +100,246 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# --- Comprehensive Stock Mapping (EGX 30) ---
-# Format: "Display Name": {"ticker": "TICKER.CA", "keywords": ["list", "of", "keywords"]}
-STOCK_DATA = {
-    # --- Banking Sector ---
-    "Commercial International Bank (CIB)": {
-        "ticker": "COMI.CA",
-        "keywords": ["CIB", "COMI", "Commercial International Bank", "البنك التجاري الدولي", "التجاري الدولي", "CIB Egypt"]
-    },
-    "QNB Alahli": {
-        "ticker": "QNBA.CA",
-        "keywords": ["QNB", "QNBA", "Qatar National Bank", "بنك قطر الوطني", "قطر الوطني", "QNB Alahli", "بنك قطر الوطني الأهلي"]
-    },
-    "Crédit Agricole Egypt": {
-        "ticker": "CIEB.CA",
-        "keywords": ["Credit Agricole", "CIEB", "Crédit Agricole", "كريدي أجريكول", "بنك كريدي أجريكول"]
-    },
-    "Housing & Development Bank": {
-        "ticker": "HDBK.CA",
-        "keywords": ["HDBK", "Housing & Development Bank", "Housing and Development Bank", "بنك التعمير والإسكان", "التعمير والإسكان"]
-    },
-    "Faisal Islamic Bank of Egypt": {
-        "ticker": "FAIT.CA",
-        "keywords": ["Faisal Islamic Bank", "FAIT", "FAITA", "بنك فيصل الإسلامي", "فيصل الإسلامي"]
-    },
-    "Abu Dhabi Islamic Bank (ADIB)": {
-        "ticker": "ADIB.CA",
-        "keywords": ["ADIB", "Abu Dhabi Islamic Bank", "مصرف أبوظبي الإسلامي", "أبوظبي الإسلامي", "ADIB Egypt"]
-    },
-    "Al Baraka Bank Egypt": {
-        "ticker": "SAUD.CA",
-        "keywords": ["Al Baraka", "SAUD", "Al Baraka Bank", "بنك البركة", "البركة مصر"]
-    },
-    "Egyptian Gulf Bank (EGBANK)": {
-        "ticker": "EGBE.CA",
-        "keywords": ["EGBANK", "EGBE", "Egyptian Gulf Bank", "البنك المصري الخليجي", "المصري الخليجي"]
-    },
-    "Export Development Bank of Egypt (EBank)": {
-        "ticker": "EXPA.CA",
-        "keywords": ["EBank", "EXPA", "Export Development Bank", "البنك المصري لتنمية الصادرات", "تنمية الصادرات"]
-    },
-
-    # --- Non-Bank Financial Services ---
-    "EFG Hermes": {
-        "ticker": "HRHO.CA",
-        "keywords": ["EFG Hermes", "HRHO", "EFG", "EFG Holding", "المجموعة المالية هيرميس", "هيرميس", "هيرميس القابضة"]
-    },
-    "E-Finance": {
-        "ticker": "EFIH.CA",
-        "keywords": ["E-Finance", "EFIH", "e-finance", "إي فاينانس", "اي فاينانس", "e-finance for Digital and Financial Investments"]
-    },
-    "Fawry": {
-        "ticker": "FWRY.CA",
-        "keywords": ["Fawry", "FWRY", "Fawry for Banking Technology", "فوري", "شركة فوري", "فوري للمدفوعات"]
-    },
-    "Belton Financial": {
-        "ticker": "BTFH.CA",
-        "keywords": ["Belton", "BTFH", "Belton Financial", "بلتون", "بلتون المالية", "بلتون القابضة"]
-    },
-    "CI Capital": {
-        "ticker": "CICH.CA",
-        "keywords": ["CI Capital", "CICH", "سي آي كابيتال", "سي اي كابيتال"]
-    },
-
-    # --- Real Estate & Construction ---
-    "Talaat Moustafa Group (TMG)": {
-        "ticker": "TMGH.CA",
-        "keywords": ["Talaat Moustafa", "TMGH", "TMG", "TMG Holding", "طلعت مصطفى", "مجموعة طلعت مصطفى", "Madinaty", "Rehab City", "مدينتي", "الرحاب"]
-    },
-    "Palm Hills Developments": {
-        "ticker": "PHDC.CA",
-        "keywords": ["Palm Hills", "PHDC", "Palm Hills Developments", "بالم هيلز", "بالم هيلز للتعمير", "Badya", "بادية"]
-    },
-    "Sixth of October Development & Investment (SODIC)": {
-        "ticker": "OCDI.CA",
-        "keywords": ["SODIC", "OCDI", "Sixth of October Development", "سوديك", "السادس من أكتوبر للتنمية"]
-    },
-    "Madinet Masr (MNHD)": {
-        "ticker": "MASR.CA",
-        "keywords": ["Madinet Masr", "MASR", "Madinet Nasr", "MNHD", "مدينة مصر", "مدينة نصر للإسكان", "Taj City", "تاج سيتي"]
-    },
-    "Heliopolis Housing": {
-        "ticker": "HELI.CA",
-        "keywords": ["Heliopolis", "HELI", "Heliopolis Company for Housing", "مصر الجديدة", "مصر الجديدة للإسكان", "مصر الجديدة للاسكان والتعمير"]
-    },
-    "Orascom Construction": {
-        "ticker": "ORAS.CA",
-        "keywords": ["Orascom Construction", "ORAS", "Orascom", "أوراسكوم للإنشاءات", "أوراسكوم كونستراكشون"]
-    },
-    "Emaar Misr": {
-        "ticker": "EMFD.CA",
-        "keywords": ["Emaar", "EMFD", "Emaar Misr", "إعمار", "إعمار مصر", "Marassi", "مراسي"]
-    },
-
-    # --- Industrial & Basic Resources ---
-    "Elsewedy Electric": {
-        "ticker": "SWDY.CA",
-        "keywords": ["Elsewedy", "SWDY", "El Sewedy", "Elsewedy Electric", "السويدي", "السويدي إليكتريك", "السويدي للكابلات"]
-    },
-    "Ezz Steel": {
-        "ticker": "ESRS.CA",
-        "keywords": ["Ezz Steel", "ESRS", "Ezz", "Al Ezz Dekheila", "حديد عز", "عز الدخيلة", "مجموعة عز"]
-    },
-    "Abu Qir Fertilizers": {
-        "ticker": "ABUK.CA",
-        "keywords": ["Abu Qir", "ABUK", "Abu Qir Fertilizers", "أبو قير", "أبو قير للأسمدة", "ابوقير"]
-    },
-    "Misr Fertilizers Production (MOPCO)": {
-        "ticker": "MFPC.CA",
-        "keywords": ["MOPCO", "MFPC", "Misr Fertilizers", "موبكو", "مصر لإنتاج الأسمدة"]
-    },
-    "Sidi Kerir Petrochemicals (SIDPEC)": {
-        "ticker": "SKPC.CA",
-        "keywords": ["Sidi Kerir", "SKPC", "Sidpec", "سيدي كرير", "سيدبك", "سيدي كرير للبتروكيماويات"]
-    },
-    "Alexandria Mineral Oils (AMOC)": {
-        "ticker": "AMOC.CA",
-        "keywords": ["AMOC", "Alexandria Mineral Oils", "أموك", "زيوت معدنية", "الاسكندرية للزيوت المعدنية"]
-    },
-    "Kima": {
-        "ticker": "KIMA.CA",
-        "keywords": ["Kima", "KIMA", "Egyptian Chemical Industries", "كيما", "الصناعات الكيماوية المصرية"]
-    },
-
-    # --- Telecom & Technology ---
-    "Telecom Egypt (WE)": {
-        "ticker": "ETEL.CA",
-        "keywords": ["Telecom Egypt", "ETEL", "WE", "TE", "المصرية للاتصالات", "وي", "تي إي داتا"]
-    },
-
-    # --- Consumer & Healthcare ---
-    "Eastern Company": {
-        "ticker": "EAST.CA",
-        "keywords": ["Eastern Company", "EAST", "Eastern Tobacco", "الشرقية للدخان", "ايسترن كومباني", "سجائر"]
-    },
-    "Juhayna Food Industries": {
-        "ticker": "JUFO.CA",
-        "keywords": ["Juhayna", "JUFO", "جهينة", "جهينه", "جهينة للصناعات الغذائية"]
-    },
-    "Edita Food Industries": {
-        "ticker": "EFID.CA",
-        "keywords": ["Edita", "EFID", "إيديتا", "ايديتا", "إيديتا للصناعات الغذائية"]
-    },
-    "Ibnsina Pharma": {
-        "ticker": "ISPH.CA",
-        "keywords": ["Ibnsina", "ISPH", "Ibnsina Pharma", "ابن سينا", "ابن سينا فارما"]
-    },
-    "Cleopatra Hospitals": {
-        "ticker": "CLHO.CA",
-        "keywords": ["Cleopatra", "CLHO", "Cleopatra Hospitals Group", "CHG", "مستشفيات كليوباترا", "مجموعة كليوباترا"]
-    },
-    "GB Corp (Ghabbour)": {
-        "ticker": "GBCO.CA",
-        "keywords": ["GB Corp", "GBCO", "GB Auto", "Ghabbour", "جي بي أوتو", "غبور", "جي بي كورب"]
-    },
-
-    # --- Others ---
-    "Egypt Kuwait Holding": {
-        "ticker": "EKHO.CA",
-        "keywords": ["Egypt Kuwait Holding", "EKHO", "EKH", "القابضة المصرية الكويتية", "المصرية الكويتية"]
-    },
-    "Qalaa Holdings": {
-        "ticker": "CCAP.CA",
-        "keywords": ["Qalaa", "CCAP", "Citadel Capital", "القلعة", "القلعة للاستشارات المالية"]
-    },
-    "Egyptian Satellites (NileSat)": {
-        "ticker": "EGSA.CA",
-        "keywords": ["NileSat", "EGSA", "Egyptian Satellites", "نايل سات", "المصرية للأقمار الصناعية"]
-    }
-}
-
 # --- Helper Functions ---
+MODEL_NAME = "egysentiment"
+PROMPT_VERSION = "ollama-schema-v1"  # Same key space as auto_score.py
+MARKET_CACHE_TTL = 300  # Seconds a ticker's bars are served from memory between store checks
+SENTIMENT_WINDOW_DAYS = 7  # Rolling window of the sentiment shown in the market overview
+
+@st.cache_resource
+def get_label_cache():
+    """Open the shared label cache once per server process"""
+    return LabelCache()
+
+# Resolved here rather than inside analyze_text, which also runs on batch job threads
+label_cache = get_label_cache()
+
 def analyze_text(text):
+    cached = label_cache.get(text, MODEL_NAME, PROMPT_VERSION)
+    if cached is not None:
+        return cached["sentiment"], cached["reasoning"]
+    
+    def generate():
+        response = ollama.chat(model=MODEL_NAME, messages=[
+            {'role': 'user', 'content': text},
+        ], format=SENTIMENT_SCHEMA, options={'num_predict': NUM_PREDICT})
+        return response['message']['content']
+
+    try:
+        sentiment, reasoning = label_with_retries(generate)
+        label_cache.put(text, MODEL_NAME, PROMPT_VERSION, {"sentiment": sentiment, "reasoning": reasoning})
+        return sentiment, reasoning
+    except ParseError as e:
+        return "neutral", f"{PARSE_ERROR}: {e}"
+    except Exception as e:
+        return "neutral", f"Error: {str(e)}"
+
+def stream_analysis(text):
+    """Yield (sentiment, reasoning so far) as tokens arrive; the last item is the final label"""
+    cached = label_cache.get(text, MODEL_NAME, PROMPT_VERSION)
+    if cached is not None:
+        yield cached["sentiment"], cached["reasoning"]
+        return
+
+    streamed = StreamingLabel()
     try:
-        response = ollama.chat(model='egysentiment', messages=[
+        for chunk in ollama.chat(model=MODEL_NAME, messages=[
             {'role': 'user', 'content': text},
-        ])
-        content = response['message']['content'].strip()
+        ], format=SENTIMENT_SCHEMA, options={'num_predict': NUM_PREDICT}, stream=True):
+            streamed.feed(chunk['message']['content'])
+            yield streamed.sentiment, streamed.reasoning
+        sentiment, reasoning = streamed.result()
+    except ParseError:
+        # Not even a JSON object could be extracted from the streamed text: ask again on the blocking path
+        yield analyze_text(text)
+        return
+    except Exception as e:
+        yield "neutral", f"Error: {str(e)}"
+        return
+    label_cache.put(text, MODEL_NAME, PROMPT_VERSION, {"sentiment": sentiment, "reasoning": reasoning})
+    yield sentiment, reasoning
+
+def sentiment_card(sentiment):
+    # Dynamic Color Class
+    color_class = f"sent-{sentiment}"
+    return f"""
+    <div class="metric-card">
+        <h4 style="margin:0; color: #888; text-transform: uppercase; letter-spacing: 1px;">Detected Sentiment</h4>
+        <h1 class="big-font {color_class}">{sentiment.upper()}</h1>
+    </div>
+    """
+
+def reasoning_box(reasoning):
+    return f"""
+    <div style="background-color: #1E1E1E; border-left: 4px solid #444; padding: 16px; border-radius: 0 8px 8px 0;">
+        <strong style="color: #eee;">💡 Reasoning:</strong><br>
+        <span style="color: #ccc;">{html.escape(reasoning)}</span>
+    </div>
+    """
+
+@st.cache_resource
+def get_fast_classifier():
+    """Load the offline-trained fast classifier once, if it has been trained"""
+    return FastClassifier.load(MODEL_FILE) if os.path.exists(MODEL_FILE) else None
+
+@st.cache_resource
+def get_keyword_matcher(stock_name):
+    """Compile the keyword matcher for a stock once per server process"""
+    return KeywordMatcher(STOCK_DATA[stock_name]["keywords"], whole_words=True)
+
+@st.cache_resource
+def get_market_store():
+    """Open the local OHLCV store once per server process"""
+    return MarketDataStore()
+
+@st.cache_resource
+def get_ticker_index():
+    """Open the dataset's ticker -> article index once per server process"""
+    return TickerIndex()
+
+def recent_coverage(ticker, limit=5):
+    """Latest collected articles mentioning the ticker, caught up with newly appended records"""
+    index = get_ticker_index()
+    index.sync()
+    return index.recent(ticker, limit)
+
+@st.cache_data(ttl=MARKET_CACHE_TTL, show_spinner=False)
+def get_price_history(ticker, days=90):
+    """Recent daily bars, topped up from the market data source at most once per TTL"""
+    return get_market_store().history(ticker, days)
+
+@st.cache_data(ttl=MARKET_CACHE_TTL, show_spinner=False)
+def get_market_overview():
+    """Daily change of every STOCK_DATA ticker (one batched download when stale) with its latest sentiment"""
+    tickers = [info["ticker"] for info in STOCK_DATA.values()]
+    overview = market_overview(get_market_store().update_many(tickers))
+    return overview.join(latest_scores(window=SENTIMENT_WINDOW_DAYS))
+
+@st.cache_resource
+def get_job_manager():
+    """Registry of background batch jobs, shared by all sessions of this server process"""
+    return JobManager()
+
+job_manager = get_job_manager()
+
+def job_label(job):
+    """Labeling function for a job's settings: the cascade if requested and trained, else the LLM"""
+    threshold = job.meta.get("cascade_threshold")
+    fast_classifier = get_fast_classifier()
+    if threshold is not None and fast_classifier is not None:
+        return Cascade(fast_classifier, analyze_text, threshold)
+    return analyze_text
+
+def describe_job(job):
+    status = job_manager.status(job)
+    meta = job.meta
+    return (f"{meta['file_name']} · {meta['target_stock']} · {meta['created'][:16].replace('T', ' ')} · "
+            f"{status['done']}/{status['total']} ({status['state']})")
+
+@st.fragment(run_every=2)
+def show_job_progress(job_id):
+    """Poll a running job; reruns the whole page once it stops"""
+    runner = job_manager.runner(job_id)
+    status = runner.status() if runner is not None else None
+    if status is None or status["state"] != "running":
+        st.rerun()
+    st.progress(status["done"] / status["total"] if status["total"] else 1.0)
+    eta = f", ~{status['eta']:.0f}s left" if status["eta"] else ""
+    st.text(f"Processing {status['done']}/{status['total']} · {status['rate']:.2f} rows/sec{eta}")
+    if status["parse_failures"]:
+        st.caption(f"🧩 Parse failures so far: {status['parse_failures']}")
+    if st.button("⏸️ Stop Job"):
+        runner.stop()
+
+def render_batch_results(job, status):
+    """Scores, optional daily aggregation and CSV download of a finished job"""
+    text_col = job.meta["text_col"]
+    date_col = job.meta["date_col"]
+    target_stock = job.meta["target_stock"]
+    df = job.frame()
+    if df.empty:
+        st.warning("⚠️ This job has no rows.")
+        return
+    total = len(df)
+    df['sentiment_score'] = df['sentiment'].map(get_sentiment_score)
+    parse_failures = int(df['reasoning'].astype(str).str.startswith(PARSE_ERROR).sum())
+    df = df.drop(columns=['reasoning'])
+    st.caption(f"🧩 Parse failures: {parse_failures}/{total} ({parse_failures / total:.1%}) — scored neutral")
+    runner = job_manager.runner(job.job_id)
+    if runner is not None and isinstance(runner.label, Cascade):
+        st.caption(f"⚡ {runner.label.summary()}")
+
+    # Handle Aggregation
+    if job.meta["aggregate_daily"] and date_col != "None":
+        try:
+            # Convert to datetime
+            df[date_col] = pd.to_datetime(df[date_col])
+            # Group by Date
+            daily_df = df.groupby(df[date_col].dt.date).agg({
+                'sentiment_score': 'mean',
+                text_col: 'count'  # Count articles per day
+            }).reset_index()
+            daily_df.rename(columns={text_col: 'article_count', 'sentiment_score': 'daily_sentiment_score'}, inplace=True)
+            
+            st.success(f"✅ Aggregated into {len(daily_df)} daily records!")
+            st.dataframe(daily_df.head(), use_container_width=True)
+            
+            # Download Aggregated
+            filename = f"{target_stock.replace(' ', '_')}_DAILY_features.csv" if target_stock != "None (Process All)" else "daily_sentiment_features.csv"
+            csv = daily_df.to_csv(index=False).encode('utf-8')
+            st.download_button(
+                label=f"💾 Download Daily Features CSV",
+                data=csv,
+                file_name=filename,
+                mime='text/csv',
+            )
+        except Exception as e:
+            st.error(f"Aggregation Failed: {e}")
+            # Fallback to raw download
+            st.warning("Downloading raw data instead.")
+            csv = df.to_csv(index=False).encode('utf-8')
+            st.download_button(
+                label="💾 Download Raw Features CSV",
+                data=csv,
+                file_name='raw_features.csv',
+                mime='text/csv',
+            )
+    else:
+        duration = f" in {status['elapsed']:.2f} seconds" if status["elapsed"] else ""
+        st.success(f"✅ Processed {total} items{duration}!")
         
-        # Robust JSON extraction
-        start_idx = content.find("{")
-        if start_idx != -1:
-            end_idx = content.rfind("}")
-            if end_idx != -1:
-                content = content[start_idx:end_idx+1]
-            else:
-                # If closing brace is missing, try to append it
-                content = content[start_idx:] + "}"
+        # Preview
+        st.dataframe(df[[text_col, 'sentiment', 'sentiment_score']].head(), use_container_width=True)
         
-        result = json.loads(content)
-        return result.get("sentiment", "neutral").lower(), result.get("reasoning", "")
-    except Exception as e:
-        return "neutral", f"Error: {str(e)} | Raw: {content if 'content' in locals() else 'No content'}"
+        # Download Raw
+        filename = f"{target_stock.replace(' ', '_')}_features.csv" if target_stock != "None (Process All)" else "egysentiment_features.csv"
+        csv = df.to_csv(index=False).encode('utf-8')
+        st.download_button(
+            label=f"💾 Download {filename}",
+            data=csv,
+            file_name=filename,
+            mime='text/csv',
+        )
+
+def mentions_ticker(tickers, ticker):
+    """True if a `tickers` cell (a list, or its string form after a CSV round trip) contains the ticker"""
+    if isinstance(tickers, str):
+        tickers = re.findall(r"[\w.]+", tickers)
+    return ticker in list(tickers)
+
+def stock_mask(chunk, text_col, target_stock):
+    """Rows about the target stock: its ticker in the `tickers` column when tagged by the current tagger, else its keywords in the text"""
+    matcher = get_keyword_matcher(target_stock)
+    texts = chunk[text_col].fillna('').astype(str)
+    if "tickers" not in chunk.columns:
+        # Filter rows where text contains ANY of the keywords
+        return texts.map(matcher.search)
+    # Collected data is tagged at ingest; only untagged or stale-tagged rows need the keyword scan
+    ticker = STOCK_DATA[target_stock]["ticker"]
+    versions = chunk["tagger_version"] if "tagger_version" in chunk.columns else pd.Series(None, index=chunk.index)
+    tagged = chunk["tickers"].map(lambda t: t is not None and not isinstance(t, float)) & versions.map(is_current_tag)
+    matched = chunk["tickers"].map(lambda t: t is not None and not isinstance(t, float) and mentions_ticker(t, ticker))
+    return matched | (~tagged & texts.map(matcher.search))
 
 def get_sentiment_score(sentiment):
     if sentiment == "positive": return 1
@@ -307,7 +368,7 @@ with st.sidebar:
 # --- Main Content ---
 st.markdown("## 🦅 Financial Intelligence Dashboard")
 
-tab1, tab2 = st.tabs(["⚡ Live Analysis", "🏭 Batch Processing (Forecasting)"])
+tab1, tab2, tab3 = st.tabs(["⚡ Live Analysis", "🏭 Batch Processing (Forecasting)", "🗺️ Market Overview"])
 
 # === TAB 1: LIVE ANALYSIS ===
 with tab1:
@@ -323,41 +384,44 @@ with tab1:
         )
         
         analyze_btn = st.button("⚡ Analyze Sentiment", type="primary", use_container_width=True)
+        stream_output = st.toggle("Stream output", value=True, help="Show the label as soon as it is generated")
 
         if analyze_btn and news_text:
-            with st.spinner("Processing article..."):
-                sentiment, reasoning = analyze_text(news_text)
-                
-                # Display Results
-                st.markdown("### Analysis Result")
-                
-                # Dynamic Color Class
-                color_class = f"sent-{sentiment}"
-                
-                st.markdown(f"""
-                <div class="metric-card">
-                    <h4 style="margin:0; color: #888; text-transform: uppercase; letter-spacing: 1px;">Detected Sentiment</h4>
-                    <h1 class="big-font {color_class}">{sentiment.upper()}</h1>
-                </div>
-                """, unsafe_allow_html=True)
+            st.markdown("### Analysis Result")
+            label_slot = st.empty()
+            reasoning_slot = st.empty()
+            timing_slot = st.empty()
+            start_time = time.time()
+            first_label = None
+
+            if stream_output:
+                label_slot.caption("Waiting for the model...")
+                for sentiment, reasoning in stream_analysis(news_text):
+                    if sentiment and first_label is None:
+                        first_label = time.time() - start_time
+                        label_slot.markdown(sentiment_card(sentiment), unsafe_allow_html=True)
+                    if reasoning:
+                        reasoning_slot.markdown(reasoning_box(reasoning + " ▌"), unsafe_allow_html=True)
+            else:
+                with st.spinner("Processing article..."):
+                    sentiment, reasoning = analyze_text(news_text)
+                first_label = time.time() - start_time
+            total_time = time.time() - start_time
                 
-                # Reasoning Box
-                st.markdown(f"""
-                <div style="background-color: #1E1E1E; border-left: 4px solid #444; padding: 16px; border-radius: 0 8px 8px 0;">
-                    <strong style="color: #eee;">💡 Reasoning:</strong><br>
-                    <span style="color: #ccc;">{reasoning}</span>
-                </div>
-                """, unsafe_allow_html=True)
+            # Display Results (the final parse may differ from what was streamed)
+            label_slot.markdown(sentiment_card(sentiment), unsafe_allow_html=True)
+            reasoning_slot.markdown(reasoning_box(reasoning), unsafe_allow_html=True)
+            timing_slot.caption(f"⏱️ Time to first label: {first_label if first_label is not None else total_time:.2f}s · "
+                                f"Total: {total_time:.2f}s")
 
     with col2:
         st.markdown(f"### 📊 {selected_name}")
         
         # Fetch Data
         try:
-            stock = yf.Ticker(selected_ticker)
-            hist = stock.history(period="3mo")
+            hist = get_price_history(selected_ticker)
             
-            if not hist.empty:
+            if len(hist) >= 2:
                 # Calculate Metrics
                 current_price = hist['Close'].iloc[-1]
                 prev_price = hist['Close'].iloc[-2]
@@ -407,6 +471,18 @@ with tab1:
         except Exception as e:
             st.error(f"Market Data Error: {e}")
 
+        st.markdown("#### 🗞️ Recent Coverage")
+        try:
+            coverage = recent_coverage(selected_ticker)
+            if coverage:
+                for record in coverage:
+                    title = record.get('title') or str(record.get('text', ''))[:80]
+                    st.caption(f"{article_date(record) or '?'} · {record.get('sentiment') or '-'} · {title}")
+            else:
+                st.caption(f"No collected articles mention {selected_ticker} yet")
+        except Exception as e:
+            st.error(f"Ticker Index Error: {e}")
+
 # === TAB 2: BATCH PROCESSING ===
 with tab2:
     st.markdown("### 🏭 Feature Extraction for Forecasting")
@@ -416,18 +492,16 @@ with tab2:
     
     if uploaded_file:
         try:
-            if uploaded_file.name.endswith('.csv'):
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_json(uploaded_file, lines=True)
-            
-            st.dataframe(df.head(), use_container_width=True)
+            kind = file_kind(uploaded_file.name)
+            # Only the first block is parsed here; the whole file is streamed in chunks when the job starts
+            preview = read_preview(uploaded_file, kind)
+            st.dataframe(preview, use_container_width=True)
             
             col1, col2, col3 = st.columns(3)
             with col1:
-                text_col = st.selectbox("Select Text Column", df.columns)
+                text_col = st.selectbox("Select Text Column", preview.columns)
             with col2:
-                date_col = st.selectbox("Select Date Column (Optional)", ["None"] + list(df.columns))
+                date_col = st.selectbox("Select Date Column (Optional)", ["None"] + list(preview.columns))
             with col3:
                 # Smart Filter Dropdown
                 target_stock = st.selectbox("Select Target Stock", ["None (Process All)"] + list(STOCK_DATA.keys()))
@@ -436,107 +510,154 @@ with tab2:
             if target_stock != "None (Process All)":
                 keywords = STOCK_DATA[target_stock]["keywords"]
                 st.info(f"🔍 Filtering for **{target_stock}** using keywords: {', '.join(keywords)}")
-                
-                keyword_list = [k.strip().lower() for k in keywords]
-                initial_count = len(df)
-                # Filter rows where text contains ANY of the keywords
-                df = df[df[text_col].astype(str).str.lower().apply(lambda x: any(k in x for k in keyword_list))]
-                final_count = len(df)
-                
-                if final_count == 0:
-                    st.warning("⚠️ No articles matched the selected stock. Try 'None' to process all.")
-                else:
-                    st.success(f"✅ Found **{final_count}** relevant articles (out of {initial_count}).")
             
             # Aggregation Option
             aggregate_daily = False
             if date_col != "None":
                 aggregate_daily = st.checkbox("📅 Aggregate Scores by Day? (Recommended for Forecasting)", value=True)
 
-            if st.button("🚀 Start Batch Processing", disabled=df.empty):
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                sentiments = []
-                scores = []
-                
-                total = len(df)
-                start_time = time.time()
-                
-                # Iterate over the filtered dataframe
-                for i, (index, row) in enumerate(df.iterrows()):
-                    text = row[text_col]
-                    
-                    # Update UI
-                    status_text.text(f"Processing {i+1}/{total}: {str(text)[:50]}...")
-                    progress_bar.progress((i + 1) / total)
-                    
-                    # Inference
-                    sent, _ = analyze_text(str(text))
-                    score = get_sentiment_score(sent)
-                    
-                    sentiments.append(sent)
-                    scores.append(score)
-                
-                # Add results
-                df['sentiment'] = sentiments
-                df['sentiment_score'] = scores
-                
-                # Handle Aggregation
-                if aggregate_daily and date_col != "None":
-                    try:
-                        # Convert to datetime
-                        df[date_col] = pd.to_datetime(df[date_col])
-                        # Group by Date
-                        daily_df = df.groupby(df[date_col].dt.date).agg({
-                            'sentiment_score': 'mean',
-                            text_col: 'count'  # Count articles per day
-                        }).reset_index()
-                        daily_df.rename(columns={text_col: 'article_count', 'sentiment_score': 'daily_sentiment_score'}, inplace=True)
-                        
-                        st.success(f"✅ Aggregated into {len(daily_df)} daily records!")
-                        st.dataframe(daily_df.head(), use_container_width=True)
-                        
-                        # Download Aggregated
-                        filename = f"{target_stock.replace(' ', '_')}_DAILY_features.csv" if target_stock != "None (Process All)" else "daily_sentiment_features.csv"
-                        csv = daily_df.to_csv(index=False).encode('utf-8')
-                        st.download_button(
-                            label=f"💾 Download Daily Features CSV",
-                            data=csv,
-                            file_name=filename,
-                            mime='text/csv',
-                        )
-                    except Exception as e:
-                        st.error(f"Aggregation Failed: {e}")
-                        # Fallback to raw download
-                        st.warning("Downloading raw data instead.")
-                        csv = df.to_csv(index=False).encode('utf-8')
-                        st.download_button(
-                            label="💾 Download Raw Features CSV",
-                            data=csv,
-                            file_name='raw_features.csv',
-                            mime='text/csv',
-                        )
+            # Cascade Option
+            fast_classifier = get_fast_classifier()
+            cascade_threshold = None
+            if fast_classifier is not None and st.checkbox("⚡ Fast classifier first (LLM only for low-confidence articles)"):
+                cascade_threshold = st.slider("Confidence threshold", 0.5, 0.99, CONFIDENCE_THRESHOLD, 0.01)
+
+            if st.button("🚀 Start Batch Processing", disabled=preview.empty):
+                columns = [text_col] + ([date_col] if date_col not in ("None", text_col) else [])
+                # The collectors' `tickers`/`tagger_version` columns are read only to filter on
+                filter_columns = columns + [c for c in ("tickers", "tagger_version")
+                                            if c in preview.columns and c not in columns]
+                counts = {"scanned": 0, "matched": 0}
+
+                def filtered_records():
+                    for chunk in read_chunks(uploaded_file, kind, filter_columns):
+                        counts["scanned"] += len(chunk)
+                        if target_stock != "None (Process All)":
+                            chunk = chunk[stock_mask(chunk, text_col, target_stock)]
+                        counts["matched"] += len(chunk)
+                        yield from chunk[columns].to_dict('records')
+
+                # Same rows + settings map to the same job, which resumes where it stopped
+                with st.spinner("Reading upload..."):
+                    job = job_manager.submit(filtered_records(), {
+                        "file_name": uploaded_file.name,
+                        "text_col": text_col,
+                        "date_col": date_col,
+                        "target_stock": target_stock,
+                        "aggregate_daily": aggregate_daily,
+                        "cascade_threshold": cascade_threshold
+                    })
+                if counts["matched"] == 0:
+                    st.warning("⚠️ No articles matched the selected stock. Try 'None' to process all.")
                 else:
-                    end_time = time.time()
-                    duration = end_time - start_time
-                    st.success(f"✅ Processed {total} items in {duration:.2f} seconds!")
-                    
-                    # Preview
-                    st.dataframe(df[[text_col, 'sentiment', 'sentiment_score']].head(), use_container_width=True)
-                    
-                    # Download Raw
-                    filename = f"{target_stock.replace(' ', '_')}_features.csv" if target_stock != "None (Process All)" else "egysentiment_features.csv"
-                    csv = df.to_csv(index=False).encode('utf-8')
-                    st.download_button(
-                        label=f"💾 Download {filename}",
-                        data=csv,
-                        file_name=filename,
-                        mime='text/csv',
-                    )
+                    st.success(f"✅ Found **{counts['matched']}** relevant articles (out of {counts['scanned']}).")
+                    job_manager.start(job, job_label(job))
+                st.session_state["batch_job_id"] = job.job_id
                 
         except Exception as e:
             st.error(f"Error processing file: {e}")
 
+    # Jobs live on disk and in the server process, so they survive reruns and page refreshes
+    jobs = job_manager.jobs()
+    if jobs:
+        st.markdown("---")
+        st.markdown("#### 📂 Batch Jobs")
+        job_ids = [job.job_id for job in jobs]
+        active_id = st.session_state.get("batch_job_id")
+        selected_id = st.selectbox(
+            "Job",
+            job_ids,
+            index=job_ids.index(active_id) if active_id in job_ids else 0,
+            format_func=lambda job_id: describe_job(jobs[job_ids.index(job_id)])
+        )
+        st.session_state["batch_job_id"] = selected_id
+        job = jobs[job_ids.index(selected_id)]
+        status = job_manager.status(job)
+
+        if status["state"] == "running":
+            show_job_progress(job.job_id)
+        elif status["state"] in ("stopped", "failed"):
+            if status["error"]:
+                st.error(f"Batch job failed: {status['error']}")
+            st.progress(status["done"] / status["total"] if status["total"] else 1.0)
+            st.caption(f"{status['done']}/{status['total']} rows labeled")
+            if st.button("▶️ Resume Job"):
+                job_manager.start(job, job_label(job))
+                st.rerun()
+        else:
+            render_batch_results(job, status)
+
+# === TAB 3: MARKET OVERVIEW ===
+with tab3:
+    st.markdown("### 🗺️ EGX Market Overview")
+    try:
+        start = time.time()
+        overview = get_market_overview()
+        elapsed = time.time() - start
+        priced = overview.dropna(subset=["change_pct"])
+        mean_col = f"mean_score_{SENTIMENT_WINDOW_DAYS}d"
+        count_col = f"article_count_{SENTIMENT_WINDOW_DAYS}d"
+
+        col1, col2 = st.columns([1.8, 1.2], gap="large")
+
+        with col1:
+            if priced.empty:
+                st.warning("No market data available")
+            else:
+                # Sector -> ticker heatmap of the last daily change
+                sectors = priced.groupby("sector")["change_pct"].mean()
+                fig = go.Figure(go.Treemap(
+                    ids=list(sectors.index) + list(priced.index),
+                    labels=list(sectors.index) + list(priced.index),
+                    parents=[""] * len(sectors) + list(priced["sector"]),
+                    values=[0] * len(sectors) + [1] * len(priced),
+                    customdata=list(sectors.index) + list(priced["name"]),
+                    marker=dict(
+                        colors=list(sectors) + list(priced["change_pct"]),
+                        colorscale=[[0, '#EF553B'], [0.5, '#262730'], [1, '#00CC96']],
+                        cmid=0
+                    ),
+                    texttemplate="<b>%{label}</b><br>%{color:+.2f}%",
+                    hovertemplate="%{customdata}<br>Daily change: %{color:+.2f}%<extra></extra>"
+                ))
+                fig.update_layout(
+                    height=480,
+                    margin=dict(l=0, r=0, t=20, b=0),
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(color="#ccc")
+                )
+                st.plotly_chart(fig, use_container_width=True)
+
+        with col2:
+            # Article-weighted sentiment across all tickers
+            counts = overview[count_col].fillna(0)
+            total_articles = int(counts.sum())
+            market_score = (overview[mean_col].fillna(0) * counts).sum() / total_articles if total_articles else None
+            st.metric(
+                label=f"Market Sentiment ({SENTIMENT_WINDOW_DAYS}d)",
+                value=f"{market_score:+.2f}" if market_score is not None else "n/a",
+                help=f"Mean sentiment score (-1 to 1) of {total_articles} tagged articles"
+            )
+            if not priced.empty:
+                advancers = int((priced["change_pct"] > 0).sum())
+                st.metric(label="Advancers", value=f"{advancers}/{len(priced)}",
+                          delta=f"{priced['change_pct'].mean():+.2f}% avg")
+
+            table = overview[["name", "sector", "change_pct", mean_col, count_col]].rename(columns={
+                "name": "Company", "sector": "Sector", "change_pct": "Change %",
+                mean_col: "Sentiment", count_col: "Articles"
+            })
+            st.dataframe(
+                table.sort_values("Articles", ascending=False).style.format(
+                    {"Change %": "{:+.2f}", "Sentiment": "{:+.2f}", "Articles": "{:.0f}"}, na_rep="-"
+                ),
+                use_container_width=True,
+                height=360
+            )
+        st.caption(f"{len(priced)}/{len(overview)} tickers priced · loaded in {elapsed * 1000:.0f} ms")
+
+    except Exception as e:
+        st.error(f"Market Overview Error: {e}")
+
 st.markdown("---")
 st.markdown("<div style='text-align: center; color: #666;'>EgySentiment © 2024 | Financial Intelligence Unit</div>", unsafe_allow_html=True)
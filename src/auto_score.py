@@ -1,104 +1,227 @@
+import argparse
 import json
-import pandas as pd
 import requests
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from fast_classifier import CONFIDENCE_THRESHOLD, MODEL_FILE, Cascade, FastClassifier
+from feature_store import FeatureStore, content_hash, partition_date
+from label_cache import LabelCache
+from stock_data import TickerTagger
+from structured_output import (
+    MAX_PARSE_RETRIES, NUM_PREDICT, PARSE_ERROR, SENTIMENT_SCHEMA, ParseError, label_with_retries, parse_stats
+)
+from ticker_index import article_date
 
 # Configuration
 INPUT_FILE = "data/testing_data.jsonl"
-OUTPUT_FILE = "data/forecast_features.csv"
 OLLAMA_URL = "http://host.docker.internal:11434/api/chat"  # For Docker -> Host communication
 MODEL_NAME = "egysentiment"
+PROMPT_VERSION = "ollama-schema-v1"  # Article text + SENTIMENT_SCHEMA format; shared with the dashboard
+OLLAMA_NUM_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))  # Keep in step with the Ollama server setting
+OLLAMA_TIMEOUT = 30
+WRITE_BATCH = 20  # Scored rows buffered before each append to the feature store
+CHUNK_SIZE = 200  # Input records read, scored and flushed at a time
+MAX_ROW_ATTEMPTS = 3  # Runs allowed to fail on one article before it stops holding the input offset
+
+ticker_tagger = TickerTagger()
+
+_label_cache = None
+_label_cache_lock = threading.Lock()
+
+def get_label_cache():
+    """Open the label cache on first use, so importing this module touches no files"""
+    global _label_cache
+    with _label_cache_lock:
+        if _label_cache is None:
+            _label_cache = LabelCache()
+        return _label_cache
+
+def build_session(pool_size=OLLAMA_NUM_PARALLEL):
+    """Keep-alive session with one pooled connection per in-flight request"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+session = build_session()
 
 def get_sentiment_score(sentiment):
     if sentiment == "positive": return 1
     if sentiment == "negative": return -1
     return 0
 
-def analyze_text(text):
+def request_content(text):
+    """One schema-constrained chat call; returns the raw message content"""
     payload = {
         "model": MODEL_NAME,
         "messages": [{"role": "user", "content": text}],
+        "format": SENTIMENT_SCHEMA,
+        "options": {"num_predict": NUM_PREDICT},
         "stream": False
     }
+    response = session.post(OLLAMA_URL, json=payload, timeout=OLLAMA_TIMEOUT)
+    response.raise_for_status()
+    return response.json()['message']['content']
+
+def analyze_text(text):
+    """Return (sentiment, reasoning); sentiment is None if the output never parsed"""
+    cached = get_label_cache().get(text, MODEL_NAME, PROMPT_VERSION)
+    if cached is not None:
+        return cached["sentiment"], cached["reasoning"]
+    
     try:
-        response = requests.post(OLLAMA_URL, json=payload, timeout=30)
-        response.raise_for_status()
-        content = response.json()['message']['content']
-        
-        # Robust JSON extraction
-        if "{" in content:
-            content = content[content.find("{"):content.rfind("}")+1]
-        
-        result = json.loads(content)
-        return result.get("sentiment", "neutral").lower(), result.get("reasoning", "")
+        sentiment, reasoning = label_with_retries(lambda: request_content(text))
+        get_label_cache().put(text, MODEL_NAME, PROMPT_VERSION, {"sentiment": sentiment, "reasoning": reasoning})
+        return sentiment, reasoning
+    except ParseError as e:
+        print(f"⚠️ Unparseable model output after {MAX_PARSE_RETRIES + 1} attempts: {e}")
+        return None, PARSE_ERROR
     except Exception as e:
         print(f"⚠️ Error analyzing text: {e}")
         return "neutral", "Error"
 
-def main():
+def score_row(row, label=analyze_text):
+    """Score one article row into a feature-store record, or None if it could not be labeled"""
+    text = row.get('text', '')
+    date = article_date(row)  # Publication date, else the scrape timestamp
+    sentiment, reasoning = label(text)
+    if sentiment is None:
+        return None
+    return {
+        'date': date,
+        'content_hash': row['content_hash'],
+        'sentiment': sentiment,
+        'sentiment_score': get_sentiment_score(sentiment),
+        'reasoning': reasoning,
+        'tickers': row.get('tickers', [])
+    }
+
+def read_jsonl_chunks(path, offset=0, chunk_size=CHUNK_SIZE):
+    """Yield ([(offset, record), ...], end_offset) chunks of complete JSON lines from `offset` on"""
+    chunk = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            # A partially written last line is picked up on the next run
+            if not line.endswith(b'\n'):
+                break
+            try:
+                chunk.append((offset, json.loads(line)))
+            except ValueError:
+                pass
+            offset += len(line)
+            if len(chunk) >= chunk_size:
+                yield chunk, offset
+                chunk = []
+    yield chunk, offset
+
+def main(workers=OLLAMA_NUM_PARALLEL, chunk_size=CHUNK_SIZE, cascade_threshold=None):
     print(f"🚀 Starting Auto-Scoring at {datetime.now()}")
     
-    # 1. Load Input Data
-    try:
-        data = []
-        with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-            for line in f:
-                data.append(json.loads(line))
-        df_input = pd.DataFrame(data)
-        print(f"📚 Loaded {len(df_input)} articles from {INPUT_FILE}")
-    except FileNotFoundError:
+    if not os.path.exists(INPUT_FILE):
         print(f"❌ Input file {INPUT_FILE} not found.")
         return
 
-    # 2. Load Existing Features (to avoid re-scoring)
-    if os.path.exists(OUTPUT_FILE):
-        df_existing = pd.read_csv(OUTPUT_FILE)
-        # Create a unique signature for deduplication (e.g., text hash or URL if available)
-        # Assuming 'text' is unique enough for now, or we can use URL if present
-        existing_texts = set(df_existing['text'].astype(str))
-        print(f"📂 Loaded {len(df_existing)} existing scored articles.")
-    else:
-        df_existing = pd.DataFrame(columns=['date', 'text', 'sentiment', 'sentiment_score', 'reasoning'])
-        existing_texts = set()
-        print("✨ Creating new features file.")
+    # Optional fast tier: confident classifier predictions skip the LLM
+    label = analyze_text
+    cascade = None
+    if cascade_threshold is not None:
+        if os.path.exists(MODEL_FILE):
+            cascade = Cascade(FastClassifier.load(MODEL_FILE), analyze_text, cascade_threshold)
+            label = cascade
+        else:
+            print(f"⚠️ No fast classifier at {MODEL_FILE} (run fast_classifier.py train); using the LLM only")
 
-    # 3. Identify New Articles
-    new_articles = df_input[~df_input['text'].astype(str).isin(existing_texts)]
-    
-    if new_articles.empty:
-        print("✅ No new articles to score.")
-        return
+    # 1. Open the feature store (hash index only, no text is loaded)
+    store = FeatureStore()
+    store.import_csv(tag=ticker_tagger.tag)
+    print(f"📂 {len(store)} articles already scored in {store.root}")
 
-    print(f"⚡ Found {len(new_articles)} new articles to score.")
-
-    # 4. Score New Articles
-    new_rows = []
-    for index, row in new_articles.iterrows():
-        text = row.get('text', '')
-        date = row.get('date', datetime.now().strftime('%Y-%m-%d')) # Default to today if missing
-        
-        print(f"   Processing: {text[:50]}...")
-        sentiment, reasoning = analyze_text(text)
-        score = get_sentiment_score(sentiment)
-        
-        new_rows.append({
-            'date': date,
-            'text': text,
-            'sentiment': sentiment,
-            'sentiment_score': score,
-            'reasoning': reasoning
-        })
-
-    # 5. Append and Save
-    if new_rows:
-        df_new = pd.DataFrame(new_rows)
-        # Append to file (header only if file didn't exist)
-        df_new.to_csv(OUTPUT_FILE, mode='a', header=not os.path.exists(OUTPUT_FILE), index=False)
-        print(f"💾 Appended {len(df_new)} new scored articles to {OUTPUT_FILE}")
-    
+    # 2. Resume from the last processed offset (0 if the file was rewritten)
+    offset = store.input_offset(INPUT_FILE)
+    print(f"📚 Reading {INPUT_FILE} from byte {offset} in chunks of {chunk_size}")
+
+    total = 0
+    written = 0
+    undated = 0
+    given_up = 0
+    retry_from = None  # Offset of the first row that failed to parse; the stored offset stops there
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for chunk, end_offset in read_jsonl_chunks(INPUT_FILE, offset, chunk_size):
+            # 3. Keep the chunk's articles that are not scored yet
+            new_rows = {}
+            for row_id, record in chunk:
+                record['content_hash'] = content_hash(record.get('text', ''))
+                if record['content_hash'] not in store:
+                    # Features are filed by publication day; a record with no date at all cannot be placed
+                    if not partition_date(article_date(record)):
+                        undated += 1
+                        continue
+                    if store.failed_attempts(record['content_hash']) >= MAX_ROW_ATTEMPTS:
+                        given_up += 1
+                        continue
+                    # Tagged at ingest since the collectors record `tickers`; older or stale tags are redone here
+                    record['tickers'] = ticker_tagger.record_tickers(record)
+                    new_rows.setdefault(record['content_hash'], (row_id, record))
+
+            # 4. Score them, up to `workers` requests in flight
+            futures = {executor.submit(score_row, record, label): (row_id, str(record.get('text', '')))
+                       for row_id, record in new_rows.values()}
+            pending = []
+            # 5. Append results in completion order, tagged with their input row (byte offset)
+            for future in as_completed(futures):
+                result = future.result()
+                row_id, text = futures[future]
+                total += 1
+                if result is None:
+                    # Left out of the store so the next run re-reads it from here, up to MAX_ROW_ATTEMPTS runs
+                    if store.record_failure(content_hash(text)) < MAX_ROW_ATTEMPTS:
+                        retry_from = row_id if retry_from is None else min(retry_from, row_id)
+                    print(f"   [{total}] row @{row_id}: {PARSE_ERROR} {text[:50]}...")
+                    continue
+                print(f"   [{total}] row @{row_id}: {result['sentiment']:<8} {text[:50]}...")
+                pending.append(result)
+                if len(pending) >= WRITE_BATCH:
+                    written += store.append(pending)
+                    pending = []
+            written += store.append(pending)
+
+            # Only move the offset once the whole chunk is stored, and never past a failed row;
+            # the rows after it are already in the store and are skipped by hash on the re-read
+            store.set_input_offset(INPUT_FILE, end_offset if retry_from is None else retry_from)
+    elapsed = time.time() - start
+
+    if retry_from is not None:
+        print(f"🔁 Unparseable rows are retried next run from byte {retry_from}")
+    if given_up:
+        print(f"⚠️ Skipped {given_up} articles that failed to parse in {MAX_ROW_ATTEMPTS} runs")
+    if undated:
+        print(f"⚠️ Skipped {undated} records without a published date or timestamp")
+    if not total:
+        print("✅ No new articles to score.")
+    else:
+        print(f"💾 Added {written} new scored articles to {store.root}")
+        print(f"⏱️  Scored {total} articles in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.2f} articles/sec, "
+              f"{workers} in flight)")
+    get_label_cache().print_stats()
+    parse_stats.print_stats()
+    if cascade:
+        cascade.print_stats()
     print("🏁 Auto-Scoring Complete.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Score new articles with the local Ollama model")
+    parser.add_argument("--workers", type=int, default=OLLAMA_NUM_PARALLEL,
+                        help="Concurrent requests (default: $OLLAMA_NUM_PARALLEL or 4)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="Input records read and scored per chunk")
+    parser.add_argument("--cascade", type=float, nargs="?", const=CONFIDENCE_THRESHOLD, metavar="THRESHOLD",
+                        help="Label confident articles with the fast classifier, the rest with the LLM")
+    args = parser.parse_args()
+    main(max(1, args.workers), max(1, args.chunk_size), args.cascade)
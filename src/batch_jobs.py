@@ -0,0 +1,244 @@
+"""
+EgySentiment Batch Jobs
+Background, resumable labeling jobs for the dashboard's Batch tab. A job is a
+directory under data/batch_jobs/<job_id>/ holding the rows to label
+(input.jsonl), the labels finished so far (results.jsonl, appended and
+flushed as each row completes) and its settings (job.json). The job id is a
+hash of the rows and settings, so re-submitting the same upload resumes the
+existing job instead of starting over.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+import pandas as pd
+
+from structured_output import PARSE_ERROR
+
+JOBS_DIR = "data/batch_jobs"
+INPUT_FILE = "input.jsonl"
+RESULTS_FILE = "results.jsonl"
+META_FILE = "job.json"
+BATCH_WORKERS = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))  # Keep in step with the Ollama server setting
+IN_FLIGHT_PER_WORKER = 2  # Rows submitted ahead of the pool, so input is read lazily
+
+
+class BatchJob:
+    """One labeling job persisted on disk"""
+
+    def __init__(self, job_id, root=JOBS_DIR):
+        self.job_id = job_id
+        self.dir = os.path.join(root, job_id)
+        with open(os.path.join(self.dir, META_FILE), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+
+    @classmethod
+    def create(cls, records, settings, root=JOBS_DIR):
+        """Persist `records` (dicts) and `settings`; returns the existing job if the same one was submitted before"""
+        os.makedirs(root, exist_ok=True)
+        tmp_dir = os.path.join(root, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        digest = hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8'))
+        total = 0
+        with open(os.path.join(tmp_dir, INPUT_FILE), 'w', encoding='utf-8') as f:
+            for record in records:
+                line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+                digest.update(line.encode('utf-8'))
+                f.write(line)
+                total += 1
+
+        job_id = digest.hexdigest()[:16]
+        job_dir = os.path.join(root, job_id)
+        if os.path.exists(os.path.join(job_dir, META_FILE)):
+            shutil.rmtree(tmp_dir)
+            return cls(job_id, root)
+        meta = dict(settings, job_id=job_id, total=total, created=datetime.now().isoformat())
+        with open(os.path.join(tmp_dir, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_dir, job_dir)
+        return cls(job_id, root)
+
+    @property
+    def total(self):
+        return self.meta["total"]
+
+    def iter_input(self):
+        """Yield (row, record) in input order"""
+        with open(os.path.join(self.dir, INPUT_FILE), 'r', encoding='utf-8') as f:
+            for row, line in enumerate(f):
+                yield row, json.loads(line)
+
+    def results(self):
+        """Finished labels by row; skips a partially written last line, so it is safe while a runner appends"""
+        path = os.path.join(self.dir, RESULTS_FILE)
+        finished = {}
+        if not os.path.exists(path):
+            return finished
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                result = json.loads(line)
+                finished[result["row"]] = result
+        return finished
+
+    def repair(self):
+        """Drop a partially written last line left by a crash; only call with no runner appending"""
+        path = os.path.join(self.dir, RESULTS_FILE)
+        if not os.path.exists(path):
+            return
+        valid = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                valid += len(line)
+        if valid < os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(valid)
+
+    def frame(self):
+        """Input rows joined with their sentiment/reasoning, for the finished rows"""
+        finished = self.results()
+        rows = [dict(record, sentiment=finished[row]["sentiment"], reasoning=finished[row]["reasoning"])
+                for row, record in self.iter_input() if row in finished]
+        return pd.DataFrame(rows)
+
+
+class JobRunner:
+    """Labels a job's unfinished rows on a thread pool in a background thread"""
+
+    def __init__(self, job, label, workers=BATCH_WORKERS):
+        self.job = job
+        self.label = label
+        self.workers = workers
+        # The runner is the job's only writer: repair the file once, then count from its own records
+        job.repair()
+        self._finished = set(job.results())
+        self.done = len(self._finished)
+        self.resumed_from = self.done
+        self.parse_failures = 0
+        self.error = None
+        self.started = time.time()
+        self.finished = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"batch-{job.job_id}", daemon=True)
+        self._thread.start()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def stop(self):
+        """Stop submitting rows; rows already in flight are still recorded"""
+        self._stop.set()
+
+    def _label(self, text):
+        try:
+            return self.label(text)
+        except Exception as e:
+            return "neutral", f"Error: {str(e)}"
+
+    def _record(self, out, row, future):
+        sentiment, reasoning = future.result()
+        out.write(json.dumps({"row": row, "sentiment": sentiment, "reasoning": reasoning}, ensure_ascii=False) + '\n')
+        out.flush()
+        with self._lock:
+            self.done += 1
+            self.parse_failures += str(reasoning).startswith(PARSE_ERROR)
+
+    def _run(self):
+        text_col = self.job.meta["text_col"]
+        try:
+            in_flight = {}
+            with open(os.path.join(self.job.dir, RESULTS_FILE), 'a', encoding='utf-8') as out, \
+                    ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for row, record in self.job.iter_input():
+                    if self._stop.is_set():
+                        break
+                    if row in self._finished:
+                        continue
+                    in_flight[executor.submit(self._label, str(record.get(text_col, '')))] = row
+                    if len(in_flight) >= self.workers * IN_FLIGHT_PER_WORKER:
+                        completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in completed:
+                            self._record(out, in_flight.pop(future), future)
+                for future in list(in_flight):
+                    self._record(out, in_flight.pop(future), future)
+        except Exception as e:
+            self.error = str(e)
+        self.finished = time.time()
+
+    def status(self):
+        """Progress snapshot: state, done/total, throughput and ETA of this run"""
+        with self._lock:
+            done, failures = self.done, self.parse_failures
+        elapsed = (self.finished or time.time()) - self.started
+        rate = (done - self.resumed_from) / elapsed if elapsed > 0 else 0.0
+        remaining = self.job.total - done
+        if self.error:
+            state = "failed"
+        elif self.running:
+            state = "running"
+        else:
+            state = "finished" if remaining <= 0 else "stopped"
+        return {
+            "state": state,
+            "done": done,
+            "total": self.job.total,
+            "parse_failures": failures,
+            "rate": rate,
+            "eta": remaining / rate if rate > 0 and self.running else None,
+            "elapsed": elapsed,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Process-wide registry of running jobs, so reruns and new sessions reattach to them"""
+
+    def __init__(self, root=JOBS_DIR):
+        self.root = root
+        self._runners = {}
+        self._lock = threading.Lock()
+
+    def submit(self, records, settings):
+        """Create (or find) the job for these rows and settings"""
+        return BatchJob.create(records, settings, self.root)
+
+    def start(self, job, label, workers=BATCH_WORKERS):
+        """Run the job's unfinished rows unless it is already running"""
+        with self._lock:
+            runner = self._runners.get(job.job_id)
+            if runner is None or not runner.running:
+                runner = JobRunner(job, label, workers)
+                self._runners[job.job_id] = runner
+            return runner
+
+    def runner(self, job_id):
+        return self._runners.get(job_id)
+
+    def status(self, job):
+        """Live status if running in this process, else progress read from disk"""
+        runner = self._runners.get(job.job_id)
+        if runner is not None:
+            return runner.status()
+        done = len(job.results())
+        return {"state": "finished" if done >= job.total else "stopped", "done": done, "total": job.total,
+                "parse_failures": None, "rate": 0.0, "eta": None, "elapsed": None, "error": None}
+
+    def jobs(self):
+        """Jobs on disk, newest first"""
+        if not os.path.exists(self.root):
+            return []
+        found = [BatchJob(name, self.root) for name in os.listdir(self.root)
+                 if os.path.exists(os.path.join(self.root, name, META_FILE))]
+        return sorted(found, key=lambda job: job.meta.get("created", ""), reverse=True)
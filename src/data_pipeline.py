@@ -5,6 +5,7 @@ RSS scraping with workarounds for blocked feeds + direct web scraping
 Optimized for continuous fine-tuning data collection
 """
 
+import argparse
 import feedparser
 import requests
 import urllib3
@@ -12,14 +13,25 @@ from bs4 import BeautifulSoup
 import json
 import time
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
-from groq import Groq
+from groq import Groq, RateLimitError
 from tqdm import tqdm
 from dotenv import load_dotenv
 from fake_useragent import UserAgent
-from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+from urllib.parse import urljoin, urlparse
 from newspaper import Article
 import nltk
+from http_cache import HttpCache
+from keyword_matcher import KeywordMatcher
+from rate_limiter import RateLimiter, estimate_tokens
+from work_pipeline import run_pipeline
+from label_cache import LabelCache
+from url_index import UrlIndex
+from near_duplicates import NearDuplicateFilter
+from stock_data import TAGGER_VERSION, TickerTagger
 
 # Download necessary NLTK data
 try:
@@ -36,7 +48,54 @@ client = Groq(api_key=os.getenv("GROQ_API_KEY"))
 
 # Configuration
 GROQ_MODEL = "llama-3.3-70b-versatile"
-RATE_LIMIT_DELAY = 2.5  # Non-negotiable 30 RPM rate limit
+GROQ_RPM = 30  # Non-negotiable 30 RPM rate limit
+GROQ_TPM = 12000  # Tokens per minute for GROQ_MODEL
+MAX_COMPLETION_TOKENS = 150
+MAX_RETRIES = 3  # Attempts per article when Groq answers 429
+SYSTEM_PROMPT = "You are a financial sentiment analysis expert. Always respond with valid JSON only."
+EXTRACT_WORKERS = 4  # Concurrent newspaper3k downloads
+EXTRACT_QUEUE_SIZE = 16  # Extracted articles buffered ahead of the labeling stage
+PACK_SIZE = 8  # Articles per request in packed mode
+PACKED_ARTICLE_CHARS = 600  # Per-article truncation in packed mode
+PACKED_TOKENS_PER_ARTICLE = 80  # Completion budget per packed article
+VALID_SENTIMENTS = {"positive", "negative", "neutral"}
+rate_limiter = RateLimiter(GROQ_RPM, GROQ_TPM)
+PROMPT_VERSION = "groq-sentiment-v1"  # Bump when the prompt changes to invalidate cached labels
+PACKED_PROMPT_VERSION = "groq-sentiment-packed-v1"
+ticker_tagger = TickerTagger()  # Tags each record with the EGX tickers it mentions
+
+
+_http_cache = None
+_http_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    """Open the HTTP cache on first use, so importing this module touches no files"""
+    global _http_cache
+    with _http_cache_lock:
+        if _http_cache is None:
+            _http_cache = HttpCache()
+        return _http_cache
+
+
+_label_cache = None
+_label_cache_lock = threading.Lock()
+
+
+def get_label_cache():
+    """Open the label cache on first use, so importing this module touches no files"""
+    global _label_cache
+    with _label_cache_lock:
+        if _label_cache is None:
+            _label_cache = LabelCache()
+        return _label_cache
+
+
+# Feed fetching
+FETCH_TIMEOUT = 15  # Per-request timeout (seconds)
+FETCH_WORKERS = 8  # Concurrent feed downloads
+PER_HOST_LIMIT = 2  # Max simultaneous requests to the same host
+FETCH_DEADLINE = 45  # Global budget (seconds) for the whole feed sweep
 
 # Enhanced RSS Feeds - With SSL bypass workarounds
 RSS_FEEDS = [
@@ -173,6 +232,9 @@ KEYWORDS = [
     "الشرقية للدخان", "أبو قير", "موبكو", "عز الدخيلة", "حديد عز"
 ]
 
+# Compiled once; scans each entry in a single pass
+keyword_matcher = KeywordMatcher(KEYWORDS)
+
 
 def get_headers():
     """Generate headers with random user agent"""
@@ -184,75 +246,109 @@ def get_headers():
     }
 
 
-def fetch_rss_entries():
-    """Parse RSS feeds with user-agent spoofing and SSL bypass"""
+def build_session(pool_size=FETCH_WORKERS):
+    """Create a pooled HTTP session shared by all fetch workers"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def parse_feed(response):
+    """Parse a feed response into its entries"""
+    return feedparser.parse(response.content).entries
+
+
+def fetch_feed(session, feed_url, deadline):
+    """Fetch and parse a single RSS feed, retrying without SSL verification if needed"""
+    def get(verify):
+        timeout = max(1, min(FETCH_TIMEOUT, deadline - time.monotonic()))
+        # The deadline bounds the whole download; the timeout only bounds each socket read
+        return get_http_cache().fetch(session, feed_url, parse_feed, headers=get_headers(), deadline=deadline,
+                                      timeout=timeout, verify=verify)
+
+    try:
+        entries = get(verify=True)
+        mode = ""
+    except requests.exceptions.Timeout:
+        # A dead host will not answer an unverified request either
+        print(f"✗ Timed out fetching {feed_url}")
+        return []
+    except requests.exceptions.SSLError:
+        # Retry without SSL verification for blocked sources
+        try:
+            entries = get(verify=False)
+            mode = " (SSL bypass)"
+        except Exception as e2:
+            print(f"✗ SSL bypass also failed for {feed_url}: {type(e2).__name__}")
+            return []
+    except Exception as e:
+        # Try SSL bypass as fallback
+        try:
+            entries = get(verify=False)
+            mode = " (fallback)"
+        except Exception:
+            print(f"✗ Error fetching {feed_url}: {type(e).__name__}")
+            return []
+
+    if entries:
+        print(f"✓ Fetched {len(entries)} entries from {feed_url}{mode}")
+    else:
+        print(f"⚠️  No entries from {feed_url}")
+    return entries
+
+
+def fetch_rss_entries(max_workers=FETCH_WORKERS, deadline=FETCH_DEADLINE):
+    """Fetch all RSS feeds concurrently over a shared session within a global deadline"""
     entries = []
     print("📡 Fetching RSS feeds...")
     
     # Disable SSL warnings for problematic feeds
     urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
     
+    session = build_session(max_workers)
+    host_limits = {}
     for feed_url in RSS_FEEDS:
-        success = False
-        
-        # Try with SSL verification first
+        host = urlparse(feed_url).netloc
+        host_limits.setdefault(host, threading.Semaphore(PER_HOST_LIMIT))
+    
+    deadline_at = time.monotonic() + deadline
+    
+    def worker(feed_url):
+        with host_limits[urlparse(feed_url).netloc]:
+            if time.monotonic() >= deadline_at:
+                return []
+            return fetch_feed(session, feed_url, deadline_at)
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = {feed_url: executor.submit(worker, feed_url) for feed_url in RSS_FEEDS}
+    done, not_done = wait(futures.values(), timeout=deadline)
+    executor.shutdown(wait=False, cancel_futures=True)
+    
+    # Collect in RSS_FEEDS order so the output is stable between runs
+    for feed_url, future in futures.items():
+        if future in not_done:
+            print(f"✗ Deadline reached before {feed_url} finished")
+            continue
         try:
-            response = requests.get(feed_url, headers=get_headers(), timeout=15, verify=True)
-            feed = feedparser.parse(response.content)
-            
-            if feed.entries:
-                entries.extend(feed.entries)
-                print(f"✓ Fetched {len(feed.entries)} entries from {feed_url}")
-                success = True
-            else:
-                print(f"⚠️  No entries from {feed_url}")
-                
-        except requests.exceptions.SSLError:
-            # Retry without SSL verification for blocked sources
-            try:
-                response = requests.get(feed_url, headers=get_headers(), timeout=15, verify=False)
-                feed = feedparser.parse(response.content)
-                
-                if feed.entries:
-                    entries.extend(feed.entries)
-                    print(f"✓ Fetched {len(feed.entries)} entries from {feed_url} (SSL bypass)")
-                    success = True
-                else:
-                    print(f"⚠️  No entries from {feed_url}")
-                    
-            except Exception as e2:
-                print(f"✗ SSL bypass also failed for {feed_url}: {type(e2).__name__}")
-                
+            entries.extend(future.result())
         except Exception as e:
-            # Try SSL bypass as fallback
-            if not success:
-                try:
-                    response = requests.get(feed_url, headers=get_headers(), timeout=15, verify=False)
-                    feed = feedparser.parse(response.content)
-                    
-                    if feed.entries:
-                        entries.extend(feed.entries)
-                        print(f"✓ Fetched {len(feed.entries)} entries from {feed_url} (fallback)")
-                        success = True
-                    else:
-                        print(f"⚠️  No entries from {feed_url}")
-                        
-                except Exception as e2:
-                    print(f"✗ Error fetching {feed_url}: {type(e).__name__}")
+            print(f"✗ Error fetching {feed_url}: {type(e).__name__}")
     
+    # Fetches still running stop at their next read, so nothing waits on them;
+    # closing the session only drops its idle connections
+    session.close()
     return entries
 
 
 def scrape_latest_articles(source_name, config):
     """Scrape latest articles directly from website"""
-    articles = []
-    
-    try:
-        response = requests.get(config['url'], headers=get_headers(), timeout=10)
+    def parse_listing(response):
         soup = BeautifulSoup(response.content, 'lxml')
-        
         links = soup.select(config['selector'])[:15]  # Get latest 15 articles
         
+        articles = []
         for link in links:
             href = link.get('href', '')
             title = link.get_text(strip=True)
@@ -267,6 +363,12 @@ def scrape_latest_articles(source_name, config):
                     'published': ''
                 }
                 articles.append(entry)
+        return articles
+    
+    articles = []
+    
+    try:
+        articles = get_http_cache().fetch(requests, config['url'], parse_listing, headers=get_headers(), timeout=10)
         
         if articles:
             print(f"✓ Scraped {len(articles)} articles from {source_name}")
@@ -295,15 +397,44 @@ def filter_relevant_entries(entries):
     filtered = []
     
     for entry in entries:
-        text = f"{entry.get('title', '')} {entry.get('summary', '')}".lower()
+        text = f"{entry.get('title', '')} {entry.get('summary', '')}"
         
-        if any(keyword.lower() in text for keyword in KEYWORDS):
+        if keyword_matcher.search(text):
             filtered.append(entry)
     
     print(f"🔍 Filtered {len(filtered)} relevant entries from {len(entries)} total")
     return filtered
 
 
+def request_completion(prompt, max_tokens=MAX_COMPLETION_TOKENS):
+    """Send one rate-limited chat request to Groq and return the message content"""
+    estimated = estimate_tokens(SYSTEM_PROMPT + prompt, max_tokens)
+    
+    for _ in range(MAX_RETRIES):
+        # Block only when the RPM/TPM budget is actually exhausted
+        rate_limiter.acquire(estimated)
+        try:
+            raw = client.chat.completions.with_raw_response.create(
+                model=GROQ_MODEL,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.3,
+                max_tokens=max_tokens
+            )
+        except RateLimitError as e:
+            rate_limiter.sync(e.response.headers)
+            continue
+        
+        rate_limiter.sync(raw.headers)
+        response = raw.parse()
+        rate_limiter.settle(estimated, response.usage.total_tokens if response.usage else None)
+        return response.choices[0].message.content
+    
+    raise RuntimeError("rate limited")
+
+
 def distill_knowledge(text):
     """Send text to Groq for sentiment analysis"""
     prompt = f"""Analyze the sentiment of this Egyptian financial news article.
@@ -313,18 +444,17 @@ Article: {text[:2000]}
 Respond ONLY with valid JSON in this exact format:
 {{"sentiment": "positive/negative/neutral", "reasoning": "brief explanation"}}"""
 
+    # Identical text (re-fetched, re-deduplicated, query-string variants) costs a lookup
+    cached = get_label_cache().get(text, GROQ_MODEL, PROMPT_VERSION)
+    if cached is not None:
+        return cached
+    
     try:
-        response = client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a financial sentiment analysis expert. Always respond with valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=150
-        )
-        
-        result = json.loads(response.choices[0].message.content)
+        result = json.loads(request_completion(prompt))
+        if not isinstance(result, dict) or result.get("sentiment") not in VALID_SENTIMENTS:
+            # Left out of the cache so the next run asks again
+            return {"sentiment": "neutral", "reasoning": "parsing_error"}
+        get_label_cache().put(text, GROQ_MODEL, PROMPT_VERSION, result)
         return result
     
     except json.JSONDecodeError:
@@ -333,18 +463,70 @@ Respond ONLY with valid JSON in this exact format:
         return {"sentiment": "neutral", "reasoning": f"error: {str(e)}"}
 
 
-def load_existing_urls(output_file):
-    """Load URLs of already processed articles"""
-    existing_urls = set()
-    if os.path.exists(output_file):
+def parse_packed_response(content, ids):
+    """Validate a packed JSON array answer and split it into {id: analysis}"""
+    try:
+        parsed = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        # Tolerate prose around the array
+        start, end = content.find("["), content.rfind("]")
+        if start == -1 or end <= start:
+            return {}
         try:
-            with open(output_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    record = json.loads(line.strip())
-                    existing_urls.add(record.get('source', ''))
-        except Exception as e:
-            print(f"⚠️  Warning: Could not load existing URLs: {e}")
-    return existing_urls
+            parsed = json.loads(content[start:end + 1])
+        except json.JSONDecodeError:
+            return {}
+    
+    # Some answers wrap the array in an object, e.g. {"results": [...]}
+    if isinstance(parsed, dict):
+        parsed = next((v for v in parsed.values() if isinstance(v, list)), [])
+    if not isinstance(parsed, list):
+        return {}
+    
+    results = {}
+    for item in parsed:
+        if not isinstance(item, dict):
+            continue
+        article_id = str(item.get("id", "")).strip()
+        sentiment = str(item.get("sentiment", "")).strip().lower()
+        if article_id in ids and article_id not in results and sentiment in VALID_SENTIMENTS:
+            results[article_id] = {"sentiment": sentiment, "reasoning": item.get("reasoning", "")}
+    return results
+
+
+def distill_knowledge_packed(texts):
+    """Label several short articles with one Groq request
+
+    `texts` maps an article id to its text. Articles missing from (or invalid
+    in) the answer are re-queued as individual distill_knowledge calls.
+    """
+    articles = "\n\n".join(f"[{article_id}] {text[:PACKED_ARTICLE_CHARS]}" for article_id, text in texts.items())
+    prompt = f"""Analyze the sentiment of each of these Egyptian financial news articles.
+
+{articles}
+
+Respond ONLY with a valid JSON array containing one object per article, in this exact format:
+[{{"id": "article id", "sentiment": "positive/negative/neutral", "reasoning": "brief explanation"}}]"""
+
+    try:
+        content = request_completion(prompt, max_tokens=PACKED_TOKENS_PER_ARTICLE * len(texts))
+        results = parse_packed_response(content, set(texts))
+    except Exception as e:
+        print(f"⚠️  Packed request failed: {e}")
+        results = {}
+    
+    for article_id, analysis in results.items():
+        get_label_cache().put(texts[article_id], GROQ_MODEL, PACKED_PROMPT_VERSION, analysis)
+    
+    missing = [article_id for article_id in texts if article_id not in results]
+    for article_id in missing:
+        results[article_id] = distill_knowledge(texts[article_id])
+    return results, len(missing)
+
+
+def load_existing_urls(output_file):
+    """Open the URL index of already processed articles (catches up with appended lines)"""
+    return UrlIndex(output_file)
 
 
 def extract_full_text(url):
@@ -358,7 +540,75 @@ def extract_full_text(url):
         # print(f"⚠️  Could not extract full text from {url}: {e}")
         return ""
 
-def build_training_dataset(entries):
+def build_record(entry, text, analysis):
+    """Build a training record from an entry and its Groq analysis"""
+    return {
+        "text": text,
+        "title": entry.get('title', ''),
+        "sentiment": analysis.get("sentiment", "neutral"),
+        "reasoning": analysis.get("reasoning", ""),
+        "source": entry.get('link', ''),
+        "published": entry.get('published', ''),
+        "tickers": ticker_tagger.tag(text),
+        "tagger_version": TAGGER_VERSION,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def packed_cached_label(text):
+    """Cached label from a packed request, else from the single-article fallback (cached under PROMPT_VERSION)"""
+    cached = get_label_cache().get(text, GROQ_MODEL, PACKED_PROMPT_VERSION)
+    if cached is None:
+        cached = get_label_cache().get(text, GROQ_MODEL, PROMPT_VERSION)
+    return cached
+
+
+def label_packed(new_entries, output_file, existing_urls):
+    """Label RSS title+summary texts PACK_SIZE at a time and append them to the dataset"""
+    processed_count = 0
+    requests_made = 0
+    
+    print(f"📦 Packed mode: {PACK_SIZE} summary-only articles per request")
+    
+    with open(output_file, 'a', encoding='utf-8') as f:
+        # Cached texts are written straight away and never enter a pack
+        uncached = []
+        for entry in new_entries:
+            text = f"{entry.get('title', '')}. {entry.get('summary', '')}"
+            cached = packed_cached_label(text)
+            if cached is None:
+                uncached.append(entry)
+                continue
+            line = json.dumps(build_record(entry, text, cached), ensure_ascii=False) + '\n'
+            f.write(line)
+            f.flush()
+            existing_urls.add(entry.get('link', ''), f.tell(), len(line.encode('utf-8')))
+            processed_count += 1
+        
+        for start in tqdm(range(0, len(uncached), PACK_SIZE), desc="Distilling knowledge (packed)"):
+            pack = uncached[start:start + PACK_SIZE]
+            texts = {str(i + 1): f"{e.get('title', '')}. {e.get('summary', '')}" for i, e in enumerate(pack)}
+            
+            results, requeued = distill_knowledge_packed(texts)
+            requests_made += 1 + requeued
+            
+            size = 0
+            for i, entry in enumerate(pack):
+                article_id = str(i + 1)
+                record = build_record(entry, texts[article_id], results[article_id])
+                line = json.dumps(record, ensure_ascii=False) + '\n'
+                f.write(line)
+                size += len(line.encode('utf-8'))
+                processed_count += 1
+            f.flush()
+            existing_urls.add_many([entry.get('link', '') for entry in pack], f.tell(), size)
+    
+    print(f"📦 {processed_count} labels from {requests_made} requests "
+          f"({processed_count / max(requests_made, 1):.1f} labels/request)")
+    return processed_count
+
+
+def build_training_dataset(entries, packed=False):
     """Process entries and save to JSONL with deduplication"""
     output_file = 'data/testing_data.jsonl'
     
@@ -374,54 +624,66 @@ def build_training_dataset(entries):
         print(f"Total samples in dataset: {initial_count}")
         return output_file
     
-    processed_count = 0
-    
     print(f"\n🔬 Processing {len(new_entries)} NEW entries (skipping {len(entries) - len(new_entries)} duplicates)")
-    print(f"⏱️  Rate limit: {RATE_LIMIT_DELAY}s per request (30 RPM enforcement)")
+    print(f"⏱️  Rate limit: {GROQ_RPM} RPM / {GROQ_TPM} TPM (token bucket)")
     
-    with open(output_file, 'a', encoding='utf-8') as f:
-        for entry in tqdm(new_entries, desc="Distilling knowledge"):
-            title = entry.get('title', '')
-            summary = entry.get('summary', '')
-            link = entry.get('link', '')
-            
-            # Try to get full text
-            full_text = extract_full_text(link)
-            
-            # Fallback to summary if full text extraction fails or is too short
-            if len(full_text) < 100:
-                text = f"{title}. {summary}"
-            else:
-                text = f"{title}. {full_text}"
-            
-            # Get sentiment from Groq
-            analysis = distill_knowledge(text)
-            
-            # Build training record
-            record = {
-                "text": text,
-                "title": title,
-                "sentiment": analysis.get("sentiment", "neutral"),
-                "reasoning": analysis.get("reasoning", ""),
-                "source": link,
-                "published": entry.get('published', ''),
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            f.write(json.dumps(record, ensure_ascii=False) + '\n')
-            processed_count += 1
-            
-            # ENFORCE PHYSICS: Rate limiting
-            time.sleep(RATE_LIMIT_DELAY)
+    if packed:
+        processed_count = label_packed(new_entries, output_file, existing_urls)
+        print(f"\n✓ Added {processed_count} new labeled samples")
+        print(f"✓ Total dataset size: {initial_count + processed_count} samples")
+        return output_file
+    
+    print(f"🧵 {EXTRACT_WORKERS} extraction workers feeding the labeling stage")
+    
+    def extract(entry):
+        title = entry.get('title', '')
+        summary = entry.get('summary', '')
+        
+        # Try to get full text
+        full_text = extract_full_text(entry.get('link', ''))
+        
+        # Fallback to summary if full text extraction fails or is too short
+        if len(full_text) < 100:
+            text = f"{title}. {summary}"
+        else:
+            text = f"{title}. {full_text}"
+        return entry, text
+    
+    def label(item):
+        entry, text = item
+        
+        # Get sentiment from Groq
+        analysis = distill_knowledge(text)
+        return build_record(entry, text, analysis)
+    
+    with open(output_file, 'a', encoding='utf-8') as f, \
+            tqdm(total=len(new_entries), desc="Distilling knowledge") as progress:
+        def write(record):
+            line = json.dumps(record, ensure_ascii=False) + '\n'
+            f.write(line)
+            f.flush()
+            existing_urls.add(record['source'], f.tell(), len(line.encode('utf-8')))
+            progress.update(1)
+        
+        processed_count = run_pipeline(
+            new_entries, extract, label, write,
+            extract_workers=EXTRACT_WORKERS, queue_size=EXTRACT_QUEUE_SIZE
+        )
     
     total_count = initial_count + processed_count
     print(f"\n✓ Added {processed_count} new labeled samples")
+    print(f"⏱️  Time spent waiting on rate limit: {rate_limiter.waited:.1f}s")
     print(f"✓ Total dataset size: {total_count} samples")
     return output_file
 
 
 def main():
     """Execute the daily data ingestion pipeline"""
+    parser = argparse.ArgumentParser(description="EgySentiment daily data pipeline")
+    parser.add_argument("--packed", action="store_true",
+                        help=f"Label RSS summaries {PACK_SIZE} per request instead of extracting full text")
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("EgySentiment Daily Data Pipeline (Enhanced)")
     print("=" * 60)
@@ -439,6 +701,7 @@ def main():
     
     # Combine all entries
     all_entries = rss_entries + scraped_entries
+    get_http_cache().print_stats()
     
     if not all_entries:
         print("✗ No entries fetched. Check sources.")
@@ -451,8 +714,15 @@ def main():
         print("✗ No relevant entries found.")
         return
     
-    # Step 4: Build training dataset
-    output_file = build_training_dataset(filtered)
+    # Step 4: Drop wire stories already seen from another outlet (before any extraction/labeling)
+    near_duplicates = NearDuplicateFilter()
+    filtered = near_duplicates.filter_entries(filtered)
+    near_duplicates.save()
+    
+    # Step 5: Build training dataset
+    output_file = build_training_dataset(filtered, packed=args.packed)
+    
+    get_label_cache().print_stats()
     
     print("\n" + "=" * 60)
     print(f"✓ Pipeline complete! Training data: {output_file}")
@@ -6,19 +6,190 @@ Removes duplicates based on:
 2. Fuzzy title matching (to catch same news from different sources)
 """
 
+import argparse
 import json
 import os
+import random
+import resource
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
 from difflib import SequenceMatcher
+import numpy as np
 from tqdm import tqdm
+from minhash import LSHIndex, MinHasher
+from url_index import UrlIndex
 
 input_file = "data/testing_data.jsonl"
 output_file = "data/testing_data.jsonl.bak"
 SIMILARITY_THRESHOLD = 0.90  # 90% similarity threshold for titles
 
+LSH_BANDS = 32  # 32 bands x 3 rows: ~95% recall at title 3-gram Jaccard 0.45, ~99.7% at 0.55
+LSH_ROWS = 3
+TITLE_NGRAM = 3
+CHAR_BINS = 64  # Character histogram bins for the ratio upper bound
+STREAM_CHUNK_SIZE = 5000  # Records per batch written to the on-disk URL map
+DEDUP_STATE_SUFFIX = ".dedup.sqlite"  # Committed offset, URLs and kept-title LSH buckets for --incremental
+LEGACY_TITLE_INDEX_SUFFIX = ".titles.npz"  # Former whole-index snapshot, removed on rebuild
+
 def similar(a, b):
     """Check similarity ratio between two strings"""
     return SequenceMatcher(None, a, b).ratio()
 
+def more_similar_than(a, b, threshold=SIMILARITY_THRESHOLD):
+    """similar(a, b) > threshold, skipping ratio() when its cheap upper bounds already fail"""
+    matcher = SequenceMatcher(None, a, b)
+    return matcher.real_quick_ratio() > threshold and matcher.quick_ratio() > threshold and \
+        matcher.ratio() > threshold
+
+def title_histogram(title):
+    """Character counts folded into CHAR_BINS bins"""
+    codes = np.frombuffer(title.encode('utf-32-le'), dtype=np.uint32) % CHAR_BINS
+    return np.bincount(codes, minlength=CHAR_BINS)
+
+def shortlist(title, signature, histogram, lengths, histograms, signatures, threshold=SIMILARITY_THRESHOLD):
+    """Positions of every candidate that can still be a duplicate, most likely first"""
+    # Vectorized upper bound on SequenceMatcher.ratio(): characters the two
+    # titles have in common (bins can only over-count), like quick_ratio()
+    common = np.minimum(histograms, histogram).sum(axis=1)
+    bound = 2 * common / (lengths + len(title))
+    positions = np.flatnonzero(bound > threshold)
+    if len(positions) > 1:
+        # Templated headlines pass the bound en masse; a near-duplicate shares the most
+        # MinHash values, so checking those first lets the caller stop at the first match
+        shared = (signatures[positions] == signature).sum(axis=1)
+        positions = positions[np.argsort(-shared, kind='stable')]
+    return positions
+
+class TitleIndex:
+    """Near-duplicate title index: MinHash LSH candidates, exact SequenceMatcher check"""
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm=LSH_BANDS * LSH_ROWS, ngram=TITLE_NGRAM)
+        self.lsh = LSHIndex(LSH_BANDS, LSH_ROWS)
+        self.titles = []
+        self.lengths = np.empty(1024, dtype=np.int64)
+        self.histograms = np.empty((1024, CHAR_BINS), dtype=np.int32)
+        self.signatures = np.empty((1024, self.hasher.num_perm), dtype=np.uint32)  # MinHash values are < 2^31
+
+    histogram = staticmethod(title_histogram)
+
+    def is_duplicate(self, title, signature, histogram=None):
+        """True if a kept title is more than `threshold` similar to this one"""
+        candidates = self.lsh.query(signature)
+        if not candidates:
+            return False
+        if histogram is None:
+            histogram = self.histogram(title)
+        ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        positions = shortlist(title, signature, histogram, self.lengths[ids], self.histograms[ids],
+                              self.signatures[ids], self.threshold)
+        return any(more_similar_than(title, self.titles[i], self.threshold) for i in ids[positions])
+
+    def add(self, title, signature, histogram=None):
+        """Keep a title so later ones are compared against it"""
+        item_id = len(self.titles)
+        if item_id == len(self.lengths):
+            self.lengths = np.resize(self.lengths, 2 * item_id)
+            self.histograms = np.resize(self.histograms, (2 * item_id, CHAR_BINS))
+            self.signatures = np.resize(self.signatures, (2 * item_id, self.hasher.num_perm))
+        self.lengths[item_id] = len(title)
+        self.signatures[item_id] = signature
+        self.histograms[item_id] = self.histogram(title) if histogram is None else histogram
+        self.lsh.insert(item_id, signature)
+        self.titles.append(title)
+
+class StoredTitleIndex:
+    """TitleIndex kept in SQLite: kept titles plus their LSH band keys, appended as titles are added"""
+
+    def __init__(self, conn, threshold=SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm=LSH_BANDS * LSH_ROWS, ngram=TITLE_NGRAM)
+        self._conn = conn
+        self._conn.execute("CREATE TABLE IF NOT EXISTS titles "
+                           "(id INTEGER PRIMARY KEY, title TEXT, histogram BLOB, signature BLOB)")
+        # One row per (band number + band values, title id)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS bands (key BLOB, id INTEGER, PRIMARY KEY (key, id)) WITHOUT ROWID")
+        self._band_query = f"SELECT DISTINCT id FROM bands WHERE key IN ({','.join('?' * LSH_BANDS)})"
+
+    @staticmethod
+    def _band_keys(signature):
+        raw = signature.astype(np.uint64).tobytes()
+        step = 8 * LSH_ROWS
+        return [bytes([band]) + raw[band * step:(band + 1) * step] for band in range(LSH_BANDS)]
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM titles").fetchone()[0]
+
+    def clear(self):
+        self._conn.execute("DELETE FROM titles")
+        self._conn.execute("DELETE FROM bands")
+
+    def is_duplicate(self, title, signature, histogram=None):
+        """True if a kept title is more than `threshold` similar to this one"""
+        ids = [item_id for (item_id,) in self._conn.execute(self._band_query, self._band_keys(signature))]
+        if not ids:
+            return False
+        if histogram is None:
+            histogram = title_histogram(title)
+        rows = self._conn.execute(
+            f"SELECT id, length(title), histogram, signature FROM titles WHERE id IN ({','.join('?' * len(ids))})", ids
+        ).fetchall()
+        positions = shortlist(
+            title, signature, histogram,
+            np.array([row[1] for row in rows], dtype=np.int64),
+            np.array([np.frombuffer(row[2], dtype=np.int32) for row in rows]),
+            np.array([np.frombuffer(row[3], dtype=np.uint32) for row in rows]),
+            self.threshold,
+        )
+        for position in positions:
+            (kept,) = self._conn.execute("SELECT title FROM titles WHERE id = ?", (rows[position][0],)).fetchone()
+            if more_similar_than(title, kept, self.threshold):
+                return True
+        return False
+
+    def add(self, title, signature, histogram=None):
+        """Keep a title so later ones are compared against it (not persisted until commit)"""
+        if histogram is None:
+            histogram = title_histogram(title)
+        cursor = self._conn.execute("INSERT INTO titles (title, histogram, signature) VALUES (?, ?, ?)", (
+            title, histogram.astype(np.int32).tobytes(), signature.astype(np.uint32).tobytes()))
+        self._conn.executemany("INSERT OR IGNORE INTO bands VALUES (?, ?)",
+                               [(key, cursor.lastrowid) for key in self._band_keys(signature)])
+
+def find_title_duplicates(titles, progress=True):
+    """Flag titles that are near-duplicates of an earlier kept title (indexed)"""
+    index = TitleIndex()
+    flags = []
+    for title in tqdm(titles, disable=not progress):
+        if not title:
+            flags.append(False)
+            continue
+        signature = index.hasher.signature(title)
+        histogram = index.histogram(title)
+        is_duplicate = index.is_duplicate(title, signature, histogram)
+        if not is_duplicate:
+            index.add(title, signature, histogram)
+        flags.append(is_duplicate)
+    return flags
+
+def find_title_duplicates_bruteforce(titles, progress=True):
+    """Reference O(n^2) version of find_title_duplicates"""
+    processed_titles = []
+    flags = []
+    for title in tqdm(titles, disable=not progress):
+        if not title:
+            flags.append(False)
+            continue
+        is_duplicate = any(similar(title, existing_title) > SIMILARITY_THRESHOLD for existing_title in processed_titles)
+        if not is_duplicate:
+            processed_titles.append(title)
+        flags.append(is_duplicate)
+    return flags
+
 def deduplicate():
     if not os.path.exists(input_file):
         print(f"✗ File not found: {input_file}")
@@ -57,9 +228,6 @@ def deduplicate():
     print(f"✓ Removed {url_duplicates} exact URL duplicates")
     
     # Step 2: Fuzzy Title Deduplication
-    final_records = []
-    title_duplicates = 0
-    
     # Convert to list for iteration
     candidates = list(unique_urls.values())
     
@@ -68,24 +236,10 @@ def deduplicate():
     
     print("\n🔍 Checking for semantic duplicates (Title Similarity)...")
     
-    processed_titles = []
-    
-    for record in tqdm(candidates):
-        title = record.get('title', '').lower().strip()
-        if not title:
-            final_records.append(record)
-            continue
-            
-        is_duplicate = False
-        for existing_title in processed_titles:
-            if similar(title, existing_title) > SIMILARITY_THRESHOLD:
-                is_duplicate = True
-                title_duplicates += 1
-                break
-        
-        if not is_duplicate:
-            final_records.append(record)
-            processed_titles.append(title)
+    titles = [record.get('title', '').lower().strip() for record in candidates]
+    flags = find_title_duplicates(titles)
+    final_records = [record for record, is_duplicate in zip(candidates, flags) if not is_duplicate]
+    title_duplicates = sum(flags)
 
     print(f"✓ Removed {title_duplicates} semantic duplicates")
     
@@ -101,6 +255,9 @@ def deduplicate():
         for record in final_records:
             f.write(json.dumps(record, ensure_ascii=False) + '\n')
             
+    # The rewrite invalidates stored offsets, so re-index the URLs
+    UrlIndex(input_file).rebuild()
+    
     final_count = len(final_records)
     removed_total = original_count - final_count
     
@@ -111,5 +268,389 @@ def deduplicate():
     print(f"  Removed:  {removed_total} duplicates")
     print("=" * 60)
 
+def replace_with_backup(tmp_file, target_file, backup_file):
+    """Hard-link the current file as the backup, then atomically swap in the new one"""
+    if os.path.exists(backup_file):
+        os.remove(backup_file)
+    if os.path.exists(target_file):
+        shutil.copymode(target_file, tmp_file)
+        try:
+            os.link(target_file, backup_file)
+        except OSError:
+            shutil.copy2(target_file, backup_file)
+    os.replace(tmp_file, target_file)
+
+def deduplicate_streaming(chunk_size=STREAM_CHUNK_SIZE):
+    """Same result as deduplicate(), with the URL map and title index on disk instead of in memory"""
+    if not os.path.exists(input_file):
+        print(f"✗ File not found: {input_file}")
+        return
+
+    directory = os.path.dirname(input_file) or '.'
+    fd, db_path = tempfile.mkstemp(prefix='.dedup-', suffix='.sqlite', dir=directory)
+    os.close(fd)
+    fd, tmp_file = tempfile.mkstemp(prefix='.dedup-', suffix='.jsonl', dir=directory)
+    os.close(fd)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    # first_seen keeps the in-memory version's tie order (dict insertion order)
+    conn.execute("CREATE TABLE best (url TEXT PRIMARY KEY, first_seen INTEGER, offset INTEGER, text_len INTEGER)")
+
+    try:
+        # Step 1: Exact URL Deduplication, one chunk of lines at a time
+        print(f"🔍 Streaming {input_file} in chunks of {chunk_size} records...")
+        original_count = 0
+        with_url = 0
+        chunk = []
+        offset = 0
+        with open(input_file, 'rb') as f:
+            for line in f:
+                original_count += 1
+                try:
+                    record = json.loads(line.strip())
+                    url = record.get('source', '').strip()
+                    if url:
+                        chunk.append((url, offset, offset, len(record.get('text', ''))))
+                except:
+                    pass
+                offset += len(line)
+                if len(chunk) >= chunk_size:
+                    with_url += len(chunk)
+                    upsert_best(conn, chunk)
+                    chunk = []
+        with_url += len(chunk)
+        upsert_best(conn, chunk)
+        conn.execute("CREATE INDEX best_order ON best (text_len DESC, first_seen)")
+        conn.commit()
+
+        unique_count = conn.execute("SELECT COUNT(*) FROM best").fetchone()[0]
+        print(f"📊 Total records: {original_count}")
+        print(f"✓ Removed {with_url - unique_count} exact URL duplicates")
+
+        # Step 2: Fuzzy Title Deduplication over the on-disk length order
+        print("\n🔍 Checking for semantic duplicates (Title Similarity)...")
+        # Kept titles and their LSH band keys go to the same temporary SQLite file, so
+        # memory stays flat however many titles are kept
+        index = StoredTitleIndex(conn)
+        final_count = 0
+        title_duplicates = 0
+        rows = conn.execute("SELECT offset FROM best ORDER BY text_len DESC, first_seen")
+        with open(input_file, 'rb') as src, open(tmp_file, 'w', encoding='utf-8') as out:
+            for (offset,) in tqdm(rows, total=unique_count):
+                src.seek(offset)
+                record = json.loads(src.readline().strip())
+                title = record.get('title', '').lower().strip()
+                if title:
+                    signature = index.hasher.signature(title)
+                    histogram = title_histogram(title)
+                    if index.is_duplicate(title, signature, histogram):
+                        title_duplicates += 1
+                        continue
+                    index.add(title, signature, histogram)
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                final_count += 1
+
+        print(f"✓ Removed {title_duplicates} semantic duplicates")
+        print(f"\n💾 Saving cleaned dataset...")
+        replace_with_backup(tmp_file, input_file, output_file)
+    finally:
+        conn.close()
+        for path in (db_path, tmp_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+    # The rewrite invalidates stored offsets, so re-index the URLs
+    UrlIndex(input_file).rebuild()
+
+    peak_mb = peak_rss_mb()
+    print("=" * 60)
+    print(f"✓ Deduplication Complete (streaming)")
+    print(f"  Original: {original_count}")
+    print(f"  Final:    {final_count}")
+    print(f"  Removed:  {original_count - final_count} duplicates")
+    print(f"  Peak RSS: {peak_mb:.0f} MB")
+    print("=" * 60)
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (ru_maxrss is bytes on macOS, KB on Linux)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def upsert_best(conn, chunk):
+    """Merge a chunk of (url, first_seen, offset, text_len) rows, keeping the longest text per URL"""
+    conn.executemany("""
+        INSERT INTO best VALUES (?, ?, ?, ?)
+        ON CONFLICT(url) DO UPDATE SET offset = excluded.offset, text_len = excluded.text_len
+        WHERE excluded.text_len > best.text_len
+    """, chunk)
+
+class DedupState:
+    """URLs and title index of the already-deduplicated prefix of the dataset, in one SQLite file"""
+
+    def __init__(self, dataset_file):
+        self.dataset_file = dataset_file
+        self._conn = sqlite3.connect(dataset_file + DEDUP_STATE_SUFFIX)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self.index = StoredTitleIndex(self._conn)
+        self._conn.commit()
+        meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        self.offset = meta.get('offset')
+        self.inode = meta.get('inode')
+        # Band keys written with other LSH parameters cannot be queried
+        self.lsh_matches = (meta.get('lsh_bands'), meta.get('lsh_rows')) == (LSH_BANDS, LSH_ROWS)
+
+    def is_valid(self):
+        """True if the state matches the dataset and the file has only been appended to"""
+        if self.offset is None or not self.lsh_matches or not os.path.exists(self.dataset_file):
+            return False
+        stat = os.stat(self.dataset_file)
+        return stat.st_ino == self.inode and stat.st_size >= self.offset
+
+    def __contains__(self, url):
+        return self._conn.execute("SELECT 1 FROM urls WHERE url = ?", (url,)).fetchone() is not None
+
+    def add(self, url, title):
+        """Record a kept record (not persisted until commit)"""
+        if url:
+            self._conn.execute("INSERT OR IGNORE INTO urls VALUES (?)", (url,))
+        if title:
+            self.index.add(title, self.index.hasher.signature(title))
+
+    def build(self):
+        """Index every complete record of the dataset as already deduplicated"""
+        self._conn.execute("DELETE FROM urls")
+        self.index.clear()
+        offset = 0
+        with open(self.dataset_file, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                    self.add(record.get('source', '').strip(), record.get('title', '').lower().strip())
+                except (ValueError, AttributeError):
+                    continue
+        self.commit(offset)
+        legacy_path = self.dataset_file + LEGACY_TITLE_INDEX_SUFFIX
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)
+
+    def commit(self, offset):
+        """Persist the titles and URLs added so far as covering the dataset up to `offset`"""
+        self.offset = offset
+        self.inode = os.stat(self.dataset_file).st_ino
+        self.lsh_matches = True
+        self._conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+            ('offset', self.offset), ('inode', self.inode), ('lsh_bands', LSH_BANDS), ('lsh_rows', LSH_ROWS)])
+        self._conn.commit()
+
+def deduplicate_incremental():
+    """Deduplicate only the records appended since the last run against the persisted state"""
+    if not os.path.exists(input_file):
+        print(f"✗ File not found: {input_file}")
+        return
+
+    state = DedupState(input_file)
+    if not state.is_valid():
+        print("🔄 No usable incremental state, running a full deduplication first")
+        deduplicate()
+        state.build()
+        print(f"🗂️  Dedup state covers {len(state.index)} titles up to byte {state.offset}")
+        return
+
+    new_lines = []
+    end = state.offset
+    with open(input_file, 'rb') as f:
+        f.seek(state.offset)
+        for line in f:
+            # A partially written last line is left for the next run
+            if not line.endswith(b'\n'):
+                break
+            new_lines.append(line)
+            end += len(line)
+
+    if not new_lines:
+        print("✓ No records appended since the last run")
+        return
+    print(f"📊 New records since last run: {len(new_lines)}")
+
+    # Same policy as the full run within the new batch (longest text first,
+    # records without a URL dropped); committed records always win
+    parsed = []
+    for position, line in enumerate(new_lines):
+        try:
+            record = json.loads(line.strip())
+            url = record.get('source', '').strip()
+            if url:
+                parsed.append((len(record.get('text', '')), position, url, record))
+        except:
+            continue
+    parsed.sort(key=lambda item: item[0], reverse=True)
+
+    kept = set()
+    seen_urls = set()
+    url_duplicates = 0
+    title_duplicates = 0
+    for _, position, url, record in parsed:
+        if url in seen_urls or url in state:
+            url_duplicates += 1
+            continue
+        seen_urls.add(url)
+        title = record.get('title', '').lower().strip()
+        if title and state.index.is_duplicate(title, state.index.hasher.signature(title)):
+            title_duplicates += 1
+            continue
+        state.add(url, title)
+        kept.add(position)
+
+    removed = len(new_lines) - len(kept)
+    print(f"✓ Removed {url_duplicates} exact URL duplicates")
+    print(f"✓ Removed {title_duplicates} semantic duplicates")
+
+    if not removed:
+        state.commit(end)
+        print("✓ Nothing removed, dataset left untouched")
+        return
+
+    print(f"\n💾 Rewriting dataset without {removed} new records...")
+    directory = os.path.dirname(input_file) or '.'
+    fd, tmp_file = tempfile.mkstemp(prefix='.dedup-', suffix='.jsonl', dir=directory)
+    try:
+        with open(input_file, 'rb') as src, os.fdopen(fd, 'wb') as out:
+            remaining = state.offset
+            while remaining:
+                block = src.read(min(remaining, 1 << 20))
+                if not block:
+                    break
+                out.write(block)
+                remaining -= len(block)
+            for position, line in enumerate(new_lines):
+                if position in kept:
+                    out.write(line)
+            committed = out.tell()
+            # Records appended while we were working are carried over unchecked
+            src.seek(end)
+            shutil.copyfileobj(src, out)
+        replace_with_backup(tmp_file, input_file, output_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+    state.commit(committed)
+    UrlIndex(input_file).rebuild()
+    print(f"✓ Incremental deduplication complete: kept {len(kept)} of {len(new_lines)} new records")
+
+def synthetic_titles(n, seed=0, duplicate_rate=0.2):
+    """Random headline-like titles, a share of them lightly edited copies of earlier ones"""
+    rng = random.Random(seed)
+    words = []
+    if os.path.exists(input_file):
+        with open(input_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    words.extend(json.loads(line).get('title', '').lower().split())
+                except ValueError:
+                    continue
+    words = sorted(set(words)) or ["egypt", "egx", "bank", "profit", "shares", "inflation", "cib", "rises"]
+    alphabet = "abcdefghijklmnopqrstuvwxyz "
+    
+    titles = []
+    for _ in range(n):
+        if titles and rng.random() < duplicate_rate:
+            chars = list(rng.choice(titles))
+            for _ in range(rng.randint(1, 8)):
+                i = rng.randrange(len(chars))
+                op = rng.random()
+                if op < 0.33:
+                    chars[i] = rng.choice(alphabet)
+                elif op < 0.66:
+                    chars.insert(i, rng.choice(alphabet))
+                elif len(chars) > 1:
+                    del chars[i]
+            titles.append("".join(chars).strip())
+        else:
+            titles.append(" ".join(rng.choice(words) for _ in range(rng.randint(6, 14))))
+    return titles
+
+TEMPLATED_HEADLINES = [
+    "gold prices in egypt today {day}",
+    "gold prices in egypt today {day} {date}",
+    "dollar exchange rate against the egyptian pound today {day} {date}",
+    "euro price today {day} {date} at egyptian banks",
+    "egx30 closes {move} {pct}% on {day}",
+    "cib shares {move} {pct}% in {day} trading",
+]
+WEEKDAYS = ["saturday", "sunday", "monday", "tuesday", "wednesday", "thursday", "friday"]
+
+def templated_titles(n, seed=0, shuffle_rate=0.3):
+    """Recurring daily headlines from a few templates, some with their words shuffled"""
+    rng = random.Random(seed)
+    titles = []
+    for _ in range(n):
+        title = rng.choice(TEMPLATED_HEADLINES).format(
+            day=rng.choice(WEEKDAYS), date=f"{rng.randint(1, 28)}/{rng.randint(1, 12)}/2025",
+            move=rng.choice(["higher", "lower", "up", "down"]), pct=f"{rng.randint(0, 5)}.{rng.randint(0, 99)}")
+        if rng.random() < shuffle_rate:
+            words = title.split()
+            rng.shuffle(words)
+            title = " ".join(words)
+        titles.append(title)
+    return titles
+
+def compare_with_bruteforce(name, sample):
+    """Time both engines on a sample and print how many decisions differ"""
+    start = time.time()
+    expected = find_title_duplicates_bruteforce(sample, progress=False)
+    brute_time = time.time() - start
+
+    start = time.time()
+    actual = find_title_duplicates(sample, progress=False)
+    indexed_time = time.time() - start
+
+    mismatches = sum(a != b for a, b in zip(expected, actual))
+    print(f"{name}: {len(sample)} titles, {sum(expected)} duplicates")
+    print(f"  Brute force: {brute_time:.2f}s")
+    print(f"  Indexed:     {indexed_time:.2f}s")
+    print(f"  Mismatched decisions: {mismatches}")
+    return mismatches
+
+def benchmark(n=100000, reference_n=1000):
+    """Check the indexed engine against the brute-force algorithm and time it"""
+    titles = synthetic_titles(n)
+
+    print("=" * 60)
+    # Without the dataset every title is drawn from 8 words: the near-worst case for the LSH
+    print(f"Vocabulary: {'titles of ' + input_file if os.path.exists(input_file) else 'built-in 8 words'}")
+    mismatches = compare_with_bruteforce("Reference sample", titles[:reference_n])
+    # Recurring daily headlines: many candidates pass the bounds, few are real duplicates
+    mismatches += compare_with_bruteforce("Templated headlines", templated_titles(reference_n))
+
+    start = time.time()
+    flags = find_title_duplicates(titles, progress=False)
+    print(f"Full run: {n} titles, {sum(flags)} duplicates in {time.time() - start:.2f}s (indexed)")
+    print("=" * 60)
+    return mismatches
+
 if __name__ == "__main__":
-    deduplicate()
+    parser = argparse.ArgumentParser(description="Deduplicate the EgySentiment dataset")
+    parser.add_argument("--benchmark", type=int, nargs="?", const=100000, metavar="N",
+                        help="Compare indexed vs brute-force title dedup on N synthetic titles")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Bounded-memory mode for datasets that do not fit in RAM")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only check records appended since the last run")
+    parser.add_argument("--chunk-size", type=int, default=STREAM_CHUNK_SIZE,
+                        help="Records per chunk in streaming mode")
+    args = parser.parse_args()
+    
+    if args.benchmark:
+        benchmark(args.benchmark)
+    elif args.incremental:
+        deduplicate_incremental()
+    elif args.streaming:
+        deduplicate_streaming(args.chunk_size)
+    else:
+        deduplicate()
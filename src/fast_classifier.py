@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+EgySentiment Fast Classifier
+Hashed word uni/bigram features + multinomial logistic regression in NumPy,
+trained offline on the LLM labels in data/testing_data.jsonl. It is the first
+tier of a cascade: confident predictions are kept, everything else is sent
+to the LLM.
+
+Usage:
+  python src/fast_classifier.py train [--threshold 0.8]   # fit, save, report
+  python src/fast_classifier.py report [--threshold 0.8]  # cross-validated report only
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+DATASET_FILE = "data/testing_data.jsonl"
+MODEL_FILE = "data/fast_classifier.npz"
+CLASSES = ("negative", "neutral", "positive")
+N_FEATURES = 1 << 18  # Hashed feature space
+CONFIDENCE_THRESHOLD = 0.8  # Minimum class probability to skip the LLM
+EPOCHS = 40
+LEARNING_RATE = 0.5  # Adagrad step size
+L2 = 1e-4
+BATCH_SIZE = 16
+REPORT_THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9)
+TOKEN = re.compile(r'\w+')
+
+
+def featurize(text, n_features=N_FEATURES):
+    """Sparse (indices, values) of L2-normalized log counts of hashed word uni/bigrams"""
+    tokens = TOKEN.findall(str(text or '').lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    if not grams:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    hashes = np.fromiter((zlib.crc32(g.encode('utf-8')) for g in grams), dtype=np.int64, count=len(grams))
+    indices, counts = np.unique(hashes % n_features, return_counts=True)
+    values = np.log1p(counts).astype(np.float32)
+    return indices, values / np.linalg.norm(values)
+
+
+def stack(features):
+    """Concatenate per-document features into (indices, values, row ids)"""
+    indices = np.concatenate([f[0] for f in features]) if features else np.empty(0, dtype=np.int64)
+    values = np.concatenate([f[1] for f in features]) if features else np.empty(0, dtype=np.float32)
+    rows = np.repeat(np.arange(len(features)), [len(f[0]) for f in features])
+    return indices, values, rows
+
+
+def softmax(logits):
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class FastClassifier:
+    """Multinomial logistic regression over hashed n-gram features"""
+
+    def __init__(self, n_features=N_FEATURES):
+        self.n_features = n_features
+        self.weights = np.zeros((n_features, len(CLASSES)), dtype=np.float32)
+        self.bias = np.zeros(len(CLASSES), dtype=np.float32)
+
+    def _logits(self, indices, values, rows, count):
+        logits = np.tile(self.bias, (count, 1))
+        np.add.at(logits, rows, values[:, None] * self.weights[indices])
+        return logits
+
+    def predict_proba(self, texts):
+        """Class probabilities, one row per text, columns in CLASSES order"""
+        features = [featurize(t, self.n_features) for t in texts]
+        return softmax(self._logits(*stack(features), len(features)))
+
+    def predict(self, text):
+        """(sentiment, confidence) for one text"""
+        proba = self.predict_proba([text])[0]
+        best = int(proba.argmax())
+        return CLASSES[best], float(proba[best])
+
+    def fit(self, texts, labels, epochs=EPOCHS, seed=0):
+        """Train with minibatch Adagrad on cross-entropy + L2"""
+        features = [featurize(t, self.n_features) for t in texts]
+        targets = np.array([CLASSES.index(label) for label in labels])
+        # Inverse-frequency weights so the positive-heavy label mix does not swamp the rest
+        counts = np.bincount(targets, minlength=len(CLASSES)).astype(np.float32)
+        class_weights = counts.sum() / (len(CLASSES) * np.maximum(counts, 1))
+        grad_sq_w = np.full_like(self.weights, 1e-8)
+        grad_sq_b = np.full_like(self.bias, 1e-8)
+        rng = np.random.RandomState(seed)
+
+        for _ in range(epochs):
+            order = rng.permutation(len(features))
+            for start in range(0, len(order), BATCH_SIZE):
+                batch = order[start:start + BATCH_SIZE]
+                indices, values, rows = stack([features[i] for i in batch])
+                error = softmax(self._logits(indices, values, rows, len(batch)))
+                error[np.arange(len(batch)), targets[batch]] -= 1
+                error *= class_weights[targets[batch], None] / len(batch)
+
+                grad_w = values[:, None] * error[rows]
+                touched, inverse = np.unique(indices, return_inverse=True)
+                grad = np.zeros((len(touched), len(CLASSES)), dtype=np.float32)
+                np.add.at(grad, inverse, grad_w)
+                grad += L2 * self.weights[touched]
+                grad_sq_w[touched] += grad ** 2
+                self.weights[touched] -= LEARNING_RATE * grad / np.sqrt(grad_sq_w[touched])
+
+                grad_b = error.sum(axis=0)
+                grad_sq_b += grad_b ** 2
+                self.bias -= LEARNING_RATE * grad_b / np.sqrt(grad_sq_b)
+        return self
+
+    def save(self, path=MODEL_FILE):
+        """Store the weights (sparse: only rows that were ever updated)"""
+        rows = np.flatnonzero(np.abs(self.weights).sum(axis=1))
+        np.savez_compressed(path, rows=rows, weights=self.weights[rows], bias=self.bias,
+                            n_features=np.int64(self.n_features))
+
+    @classmethod
+    def load(cls, path=MODEL_FILE):
+        with np.load(path) as saved:
+            model = cls(int(saved['n_features']))
+            model.weights[saved['rows']] = saved['weights']
+            model.bias = saved['bias']
+        return model
+
+
+class Cascade:
+    """Fast classifier first; texts below the confidence threshold go to `fallback`"""
+
+    def __init__(self, classifier, fallback, threshold=CONFIDENCE_THRESHOLD):
+        self.classifier = classifier
+        self.fallback = fallback
+        self.threshold = threshold
+        self.fast = 0
+        self.deferred = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, text):
+        """Return (sentiment, reasoning) like analyze_text"""
+        sentiment, confidence = self.classifier.predict(text)
+        if confidence >= self.threshold:
+            with self._lock:
+                self.fast += 1
+            return sentiment, f"fast classifier (p={confidence:.2f})"
+        with self._lock:
+            self.deferred += 1
+        return self.fallback(text)
+
+    def summary(self):
+        # Read both counters together; worker threads may be updating them
+        with self._lock:
+            fast, deferred = self.fast, self.deferred
+        total = fast + deferred
+        share = (fast / total * 100) if total else 0.0
+        return (f"Cascade: {fast}/{total} articles ({share:.0f}%) labeled by the fast classifier "
+                f"at p >= {self.threshold}, {deferred} sent to the LLM")
+
+    def print_stats(self):
+        print(f"⚡ {self.summary()}")
+
+
+def load_labeled(path=DATASET_FILE):
+    """Texts and LLM sentiment labels from the dataset"""
+    texts, labels = [], []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('sentiment') in CLASSES and record.get('text'):
+                texts.append(record['text'])
+                labels.append(record['sentiment'])
+    return texts, labels
+
+
+def report(texts, labels, thresholds=REPORT_THRESHOLDS, folds=5, seed=0):
+    """Cross-validated agreement with the LLM labels and throughput, per confidence threshold"""
+    order = list(range(len(texts)))
+    random.Random(seed).shuffle(order)
+    proba = np.zeros((len(texts), len(CLASSES)))
+    for fold in range(folds):
+        test = order[fold::folds]
+        held_out = set(test)
+        train = [i for i in order if i not in held_out]
+        model = FastClassifier().fit([texts[i] for i in train], [labels[i] for i in train])
+        proba[test] = model.predict_proba([texts[i] for i in test])
+
+    start = time.time()
+    model.predict_proba(texts)
+    elapsed = time.time() - start
+
+    predicted = proba.argmax(axis=1)
+    confidence = proba.max(axis=1)
+    truth = np.array([CLASSES.index(label) for label in labels])
+    correct = predicted == truth
+
+    print("=" * 60)
+    print(f"Fast classifier vs LLM labels ({len(texts)} articles, {folds}-fold CV)")
+    print(f"  Accuracy, all articles: {correct.mean():.1%}")
+    print(f"  Throughput: {len(texts) / elapsed:,.0f} articles/sec ({elapsed / len(texts) * 1e6:.0f} µs/article)")
+    print(f"  {'threshold':>9}  {'fast share':>10}  {'fast accuracy':>13}  {'cascade agreement':>17}")
+    for threshold in thresholds:
+        confident = confidence >= threshold
+        fast_accuracy = correct[confident].mean() if confident.any() else float('nan')
+        # Deferred articles get the LLM label, so they agree by construction
+        agreement = (correct[confident].sum() + (~confident).sum()) / len(texts)
+        print(f"  {threshold:>9.2f}  {confident.mean():>10.1%}  {fast_accuracy:>13.1%}  {agreement:>17.1%}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or evaluate the fast sentiment classifier")
+    parser.add_argument("command", choices=["train", "report"])
+    parser.add_argument("--dataset", default=DATASET_FILE)
+    parser.add_argument("--model", default=MODEL_FILE)
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="Extra confidence threshold to include in the report")
+    args = parser.parse_args()
+
+    texts, labels = load_labeled(args.dataset)
+    if not texts:
+        print(f"✗ No labeled articles in {args.dataset}")
+        return
+    thresholds = sorted(set(REPORT_THRESHOLDS + ((args.threshold,) if args.threshold else ())))
+
+    if args.command == "train":
+        start = time.time()
+        FastClassifier().fit(texts, labels).save(args.model)
+        print(f"✓ Trained on {len(texts)} articles in {time.time() - start:.1f}s, saved to {args.model}")
+    report(texts, labels, thresholds)
+
+
+if __name__ == "__main__":
+    main()
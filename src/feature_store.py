@@ -0,0 +1,199 @@
+"""
+EgySentiment Feature Store
+Scored articles stored as Parquet files partitioned by date
+(data/features/date=YYYY-MM-DD/part-*.parquet), keyed by a content hash of the
+article text instead of the text itself. A small SQLite index of the hashes
+answers "already scored?" without reading any Parquet data, and remembers how
+far each input file has been processed.
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import uuid
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from label_cache import normalize_text
+
+FEATURES_DIR = "data/features"
+HASH_INDEX = "hashes.sqlite"  # Lives inside FEATURES_DIR
+LEGACY_CSV = "data/forecast_features.csv"
+# Bump when the meaning of stored rows changes; older stores are cleared and
+# re-scored from the dataset (cheap, labels come from the label cache).
+# 2: rows are partitioned by publication date instead of scoring date
+STORE_VERSION = 2
+SCHEMA = pa.schema([
+    ("content_hash", pa.string()),
+    ("sentiment", pa.string()),
+    ("sentiment_score", pa.int8()),
+    ("reasoning", pa.string()),
+    ("tickers", pa.list_(pa.string())),
+])
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+
+def content_hash(text):
+    """Stable key of an article: hash of its normalized text"""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+def partition_date(value):
+    """YYYY-MM-DD partition key for a record date, or None if missing or unparseable"""
+    try:
+        return datetime.strptime(str(value)[:10], '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+class FeatureStore:
+    """Append-only, date-partitioned Parquet store with a hash index"""
+
+    def __init__(self, root=FEATURES_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(root, HASH_INDEX))
+        self._conn.execute("CREATE TABLE IF NOT EXISTS hashes (hash TEXT PRIMARY KEY, date TEXT)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS inputs (path TEXT PRIMARY KEY, offset INTEGER, inode INTEGER)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS failures (hash TEXT PRIMARY KEY, attempts INTEGER)")
+        if self._get_meta('version') != STORE_VERSION:
+            if self._get_meta('version') is not None or len(self) or \
+                    self._conn.execute("SELECT 1 FROM inputs").fetchone():
+                self._clear()
+                print(f"🔄 Cleared feature store {root} written by an older version; articles will be re-scored")
+            self._set_meta('version', STORE_VERSION)
+        if self._get_meta('generation') is None:
+            self._set_meta('generation', uuid.uuid4().hex)
+        self._conn.commit()
+
+    def _get_meta(self, key, default=None):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def _clear(self):
+        for part in os.listdir(self.root):
+            if part.startswith("date="):
+                shutil.rmtree(os.path.join(self.root, part))
+        self._conn.execute("DELETE FROM hashes")
+        self._conn.execute("DELETE FROM inputs")
+        self._conn.execute("DELETE FROM failures")
+        self._conn.execute("DELETE FROM meta")
+        # The legacy CSV carries scoring dates too; its articles are re-scored from the dataset instead
+        self._set_meta('legacy_imported', 1)
+
+    @property
+    def generation(self):
+        """Token that changes whenever the store is cleared, so incremental consumers know to rebuild"""
+        return self._get_meta('generation')
+
+    def __contains__(self, key):
+        return self._conn.execute("SELECT 1 FROM hashes WHERE hash = ?", (key,)).fetchone() is not None
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+
+    def input_offset(self, path):
+        """Byte offset of `path` already processed, or 0 if the file was replaced or truncated"""
+        row = self._conn.execute("SELECT offset, inode FROM inputs WHERE path = ?", (path,)).fetchone()
+        if row is None or not os.path.exists(path):
+            return 0
+        stat = os.stat(path)
+        offset, inode = row
+        if stat.st_ino != inode or stat.st_size < offset:
+            return 0
+        return offset
+
+    def set_input_offset(self, path, offset):
+        """Record that `path` has been processed up to `offset`"""
+        self._conn.execute("INSERT OR REPLACE INTO inputs VALUES (?, ?, ?)", (path, offset, os.stat(path).st_ino))
+        self._conn.commit()
+
+    def failed_attempts(self, key):
+        """Runs that failed to label the article with this content hash"""
+        row = self._conn.execute("SELECT attempts FROM failures WHERE hash = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def record_failure(self, key):
+        """Count one more failed attempt at an article; returns the attempts so far"""
+        self._conn.execute("INSERT INTO failures VALUES (?, 1) ON CONFLICT(hash) DO UPDATE SET attempts = attempts + 1",
+                           (key,))
+        self._conn.commit()
+        return self.failed_attempts(key)
+
+    def append(self, rows):
+        """Write rows (dicts with date, content_hash, sentiment, sentiment_score, reasoning[, tickers]); returns rows added"""
+        fresh = {}
+        for row in rows:
+            # Rows without a valid date are left out rather than filed under an invented one
+            date = partition_date(row.get('date'))
+            if date and row['content_hash'] not in self and row['content_hash'] not in fresh:
+                fresh[row['content_hash']] = dict(row, date=date, tickers=row.get('tickers'))
+        if not fresh:
+            return 0
+
+        df = pd.DataFrame(list(fresh.values()))
+        for date, group in df.groupby('date'):
+            partition = os.path.join(self.root, f"date={date}")
+            os.makedirs(partition, exist_ok=True)
+            table = pa.Table.from_pandas(group[SCHEMA.names], schema=SCHEMA, preserve_index=False)
+            # Write under a temp name so readers never see a half-written file
+            path = os.path.join(partition, f"part-{uuid.uuid4().hex}.parquet")
+            pq.write_table(table, path + ".tmp")
+            os.replace(path + ".tmp", path)
+
+        # Index after the data is on disk; a crash in between only re-scores those rows
+        self._conn.executemany("INSERT OR IGNORE INTO hashes VALUES (?, ?)",
+                               [(key, row['date']) for key, row in fresh.items()])
+        self._conn.commit()
+        return len(fresh)
+
+    def dates_since(self, rowid):
+        """(max rowid, sorted dates) of hashes indexed after `rowid`, for incremental consumers"""
+        last = self._conn.execute("SELECT MAX(rowid) FROM hashes").fetchone()[0] or 0
+        dates = self._conn.execute(
+            "SELECT DISTINCT date FROM hashes WHERE rowid > ? AND rowid <= ? ORDER BY date", (rowid, last)
+        ).fetchall()
+        return last, [d for (d,) in dates]
+
+    def read(self, columns=None, start=None, end=None, dates=None):
+        """Load features as a DataFrame, optionally only dates in [start, end] or in `dates`"""
+        parts = [d for d in os.listdir(self.root) if d.startswith("date=")]
+        if dates is not None:
+            wanted = set(dates)
+            parts = [d for d in parts if d[5:] in wanted]
+        if start:
+            parts = [d for d in parts if d[5:] >= start]
+        if end:
+            parts = [d for d in parts if d[5:] <= end]
+        files = [os.path.join(self.root, d, f) for d in sorted(parts)
+                 for f in sorted(os.listdir(os.path.join(self.root, d))) if f.endswith(".parquet")]
+        if not files:
+            return pd.DataFrame(columns=list(dict.fromkeys((columns or SCHEMA.names) + ['date'])))
+        # The explicit schema lets files written before a column existed read it as null
+        dataset = ds.dataset(files, schema=pa.unify_schemas([SCHEMA, PARTITIONING.schema]), format="parquet",
+                             partitioning=PARTITIONING, partition_base_dir=self.root)
+        return dataset.to_table(columns=columns).to_pandas()
+
+    def import_csv(self, csv_file=LEGACY_CSV, tag=None):
+        """One-time migration of the old text-keyed features CSV; `tag(text)` fills the tickers column"""
+        if len(self) or self._get_meta('legacy_imported') or not os.path.exists(csv_file):
+            return 0
+        df = pd.read_csv(csv_file)
+        df['content_hash'] = df['text'].astype(str).map(content_hash)
+        if tag is not None:
+            df['tickers'] = df['text'].astype(str).map(tag)
+        df['sentiment_score'] = df['sentiment_score'].fillna(0).astype(int)
+        added = self.append(df.drop(columns=['text']).to_dict('records'))
+        self._set_meta('legacy_imported', 1)
+        self._conn.commit()
+        print(f"📦 Imported {added} scored articles from {csv_file} into {self.root}")
+        return added
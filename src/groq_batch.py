@@ -0,0 +1,160 @@
+"""
+EgySentiment Groq Batch Labeling
+Writes chat-completion prompts into a batch request file, submits it to the
+Groq Batch API, polls for completion and maps the results back by custom_id.
+Point GROQ_BASE_URL (or --base-url) at a local stand-in server for testing.
+"""
+
+import json
+import os
+import time
+
+from structured_output import VALID_SENTIMENTS
+
+BATCH_DIR = "data/batch"
+REQUESTS_FILE = os.path.join(BATCH_DIR, "batch_requests.jsonl")
+PENDING_FILE = os.path.join(BATCH_DIR, "pending_records.jsonl")
+STATE_FILE = os.path.join(BATCH_DIR, "batch_state.json")
+POLL_INTERVAL = 30  # Seconds between status checks
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def build_request(custom_id, model, system_prompt, prompt, max_tokens, temperature=0.3):
+    """Build one /v1/chat/completions line of a batch request file"""
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+    }
+
+
+def unique_by_url(records):
+    """Drop records whose `source` URL repeats (their custom_id, a hash of it, would collide), keeping the first"""
+    seen = set()
+    unique = []
+    for record in records:
+        if record["source"] not in seen:
+            seen.add(record["source"])
+            unique.append(record)
+    return unique
+
+
+def write_jsonl(path, rows):
+    """Write rows to a JSONL file, replacing any previous content"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+def read_jsonl(path):
+    """Read all rows of a JSONL file"""
+    rows = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                rows.append(json.loads(line))
+    return rows
+
+
+def save_state(state):
+    """Persist the in-flight batch so an interrupted run can resume polling"""
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    with open(STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+
+
+def load_state():
+    """Load the in-flight batch state, if any"""
+    if not os.path.exists(STATE_FILE):
+        return None
+    with open(STATE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def clear_state():
+    """Remove the batch state and its working files after a successful merge"""
+    for path in (STATE_FILE, REQUESTS_FILE, PENDING_FILE):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def submit_batch(client, requests_file=REQUESTS_FILE, completion_window="24h"):
+    """Upload a batch request file and create the batch job"""
+    with open(requests_file, 'rb') as f:
+        uploaded = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        completion_window=completion_window,
+        endpoint="/v1/chat/completions",
+        input_file_id=uploaded.id
+    )
+    print(f"📤 Submitted batch {batch.id} ({batch.status})")
+    return batch
+
+
+def wait_for_batch(client, batch_id, poll_interval=POLL_INTERVAL):
+    """Poll a batch until it reaches a terminal status"""
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        progress = f"{counts.completed}/{counts.total}" if counts else "?"
+        print(f"⏳ Batch {batch_id}: {batch.status} ({progress} requests)")
+        if batch.status in TERMINAL_STATUSES:
+            return batch
+        time.sleep(poll_interval)
+
+
+def download_results(client, batch):
+    """Return {custom_id: {"sentiment", "reasoning"}} for the successful requests of a batch"""
+    if not batch.output_file_id:
+        return {}
+    return parse_results(client.files.content(batch.output_file_id).read().decode('utf-8'))
+
+
+def parse_results(content):
+    """Map a batch output file's lines to {custom_id: analysis}; failed requests are left out"""
+    results = {}
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        response = row.get("response") or {}
+        if row.get("error") or response.get("status_code") != 200:
+            continue
+        try:
+            message = response["body"]["choices"][0]["message"]["content"]
+            analysis = json.loads(message)
+            if analysis.get("sentiment") not in VALID_SENTIMENTS:
+                raise ValueError(f"unexpected sentiment {analysis.get('sentiment')!r}")
+            results[row["custom_id"]] = analysis
+        except (KeyError, IndexError, TypeError, AttributeError, ValueError):
+            results[row["custom_id"]] = {"sentiment": "neutral", "reasoning": "parsing_error"}
+    return results
+
+
+def merge_results(pending, results, output_file):
+    """Append labeled pending records to the dataset by custom_id; return the unlabeled ones"""
+    unlabeled = []
+    merged = 0
+    with open(output_file, 'a', encoding='utf-8') as f:
+        for record in pending:
+            analysis = results.get(record["custom_id"])
+            if analysis is None:
+                unlabeled.append(record)
+                continue
+            record = {k: v for k, v in record.items() if k != "custom_id"}
+            record["sentiment"] = analysis.get("sentiment", "neutral")
+            record["reasoning"] = analysis.get("reasoning", "")
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            merged += 1
+    print(f"✓ Merged {merged} batch labels into {output_file}")
+    return unlabeled
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+EgySentiment Groq Stub Server
+Local stand-in for the parts of the Groq API the collectors use: chat
+completions, file upload/download and the Batch API. Batches complete as
+soon as they are created, and every prompt gets a deterministic keyword-based
+label, so --batch runs and tests work offline and without an API key.
+
+Usage:
+  python src/groq_stub.py --port 8765
+  python src/historical_scraper.py --batch --base-url http://127.0.0.1:8765
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+POSITIVE_WORDS = {"profit", "profits", "growth", "rises", "rise", "gains", "record", "expands", "ارتفاع", "أرباح", "نمو"}
+NEGATIVE_WORDS = {"loss", "losses", "falls", "fall", "decline", "drops", "debt", "انخفاض", "خسائر", "تراجع"}
+WORD = re.compile(r'\w+')
+
+
+def stub_label(prompt):
+    """Deterministic {"sentiment", "reasoning"} for a prompt from its positive/negative keywords"""
+    words = set(WORD.findall(str(prompt).lower()))
+    score = len(words & POSITIVE_WORDS) - len(words & NEGATIVE_WORDS)
+    sentiment = "positive" if score > 0 else "negative" if score < 0 else "neutral"
+    return {"sentiment": sentiment, "reasoning": f"stub label (keyword score {score})"}
+
+
+def chat_completion(body):
+    """OpenAI-style chat completion answering the last user message with stub_label()"""
+    prompt = next((m.get("content", "") for m in reversed(body.get("messages", [])) if m.get("role") == "user"), "")
+    content = json.dumps(stub_label(prompt), ensure_ascii=False)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                  "total_tokens": (len(prompt) + len(content)) // 4},
+    }
+
+
+def run_batch(requests_content):
+    """Output file content for a batch input file: one chat completion per request line"""
+    lines = []
+    for line in requests_content.decode('utf-8').splitlines():
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        lines.append(json.dumps({
+            "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+            "custom_id": request["custom_id"],
+            "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": chat_completion(request["body"])},
+            "error": None,
+        }, ensure_ascii=False))
+    return ("\n".join(lines) + "\n").encode('utf-8'), len(lines)
+
+
+class StubState:
+    """Uploaded files and created batches, shared by the request handler threads"""
+
+    def __init__(self):
+        self.files = {}
+        self.batches = {}
+        self.lock = threading.Lock()
+
+    def add_file(self, content, filename, purpose):
+        file_id = f"file_{uuid.uuid4().hex[:24]}"
+        with self.lock:
+            self.files[file_id] = content
+        return {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                "filename": filename, "purpose": purpose}
+
+    def add_batch(self, body):
+        with self.lock:
+            content = self.files.get(body.get("input_file_id"))
+        if content is None:
+            return None
+        output, total = run_batch(content)
+        output_file_id = self.add_file(output, "batch_output.jsonl", "batch_output")["id"]
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex[:24]}",
+            "object": "batch",
+            "endpoint": body.get("endpoint", "/v1/chat/completions"),
+            "input_file_id": body["input_file_id"],
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "completed",
+            "output_file_id": output_file_id,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "completed_at": int(time.time()),
+            "request_counts": {"total": total, "completed": total, "failed": 0},
+        }
+        with self.lock:
+            self.batches[batch["id"]] = batch
+        return batch
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Routes /openai/v1/... (the Groq SDK paths) and /v1/... requests"""
+
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _path(self):
+        path = self.path.split('?')[0]
+        return path[len("/openai"):] if path.startswith("/openai/") else path
+
+    def _send(self, status, payload, content_type="application/json"):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self):
+        self._send(404, {"error": {"message": f"unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        path = self._path()
+        body = self._body()
+        if path == "/v1/chat/completions":
+            self._send(200, chat_completion(json.loads(body)))
+        elif path == "/v1/files":
+            # multipart/form-data with `file` and `purpose` parts
+            message = BytesParser(policy=HTTP).parsebytes(
+                f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode('latin-1') + body)
+            parts = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+            upload = parts["file"]
+            purpose = parts["purpose"].get_content() if "purpose" in parts else "batch"
+            self._send(200, self.state.add_file(upload.get_payload(decode=True), upload.get_filename(), purpose))
+        elif path == "/v1/batches":
+            batch = self.state.add_batch(json.loads(body))
+            if batch is None:
+                self._send(400, {"error": {"message": "unknown input_file_id", "type": "invalid_request_error"}})
+            else:
+                self._send(200, batch)
+        else:
+            self._not_found()
+
+    def do_GET(self):
+        parts = self._path().strip('/').split('/')
+        if len(parts) == 3 and parts[:2] == ["v1", "batches"] and parts[2] in self.state.batches:
+            self._send(200, self.state.batches[parts[2]])
+        elif len(parts) == 4 and parts[:2] == ["v1", "files"] and parts[3] == "content" \
+                and parts[2] in self.state.files:
+            self._send(200, self.state.files[parts[2]], "application/octet-stream")
+        else:
+            self._not_found()
+
+
+def start_server(host="127.0.0.1", port=0):
+    """Serve the stub from a background thread; returns (server, base_url)"""
+    handler = type("Handler", (StubHandler,), {"state": StubState()})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="groq-stub", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Groq chat/files/batches API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.host, args.port)
+    print(f"🧪 Groq stub listening on {base_url} (pass --base-url {base_url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
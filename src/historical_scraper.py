@@ -5,19 +5,35 @@ One-time use bulk data collection from Egyptian financial news archives
 Collects historical articles for fine-tuning Llama 3.1-8B
 """
 
+import argparse
+import hashlib
 import requests
 from bs4 import BeautifulSoup
 import json
+import threading
 import time
 import os
 from datetime import datetime
-from groq import Groq
+from groq import Groq, RateLimitError
 from tqdm import tqdm
 from dotenv import load_dotenv
 from fake_useragent import UserAgent
 from urllib.parse import urljoin
 from newspaper import Article
 import nltk
+from http_cache import HttpCache
+from keyword_matcher import KeywordMatcher
+from rate_limiter import RateLimiter, estimate_tokens
+from work_pipeline import run_pipeline
+from label_cache import LabelCache
+from structured_output import VALID_SENTIMENTS
+from url_index import UrlIndex
+from stock_data import TAGGER_VERSION, TickerTagger
+from groq_batch import (
+    PENDING_FILE, REQUESTS_FILE, build_request, clear_state, download_results,
+    load_state, merge_results, read_jsonl, save_state, submit_batch,
+    unique_by_url, wait_for_batch, write_jsonl
+)
 
 # Download necessary NLTK data
 try:
@@ -31,11 +47,48 @@ load_dotenv()
 # Initialize
 ua = UserAgent()
 client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+session = requests.Session()
 
 # Configuration
 GROQ_MODEL = "llama-3.3-70b-versatile"
-RATE_LIMIT_DELAY = 2.5  # 30 RPM compliance
+GROQ_RPM = 30  # 30 RPM compliance
+GROQ_TPM = 12000  # Tokens per minute for GROQ_MODEL
+MAX_COMPLETION_TOKENS = 150
+MAX_RETRIES = 3  # Attempts per article when Groq answers 429
+SYSTEM_PROMPT = "You are a financial sentiment analysis expert. Always respond with valid JSON only."
 MAX_ARTICLES_PER_SOURCE = 200  # Increased limit for aggressive scraping
+EXTRACT_WORKERS = 6  # Concurrent newspaper3k downloads
+EXTRACT_QUEUE_SIZE = 32  # Extracted articles buffered ahead of the labeling stage
+rate_limiter = RateLimiter(GROQ_RPM, GROQ_TPM)
+PROMPT_VERSION = "groq-sentiment-v1"  # Same prompt as data_pipeline, so labels are shared
+ticker_tagger = TickerTagger()  # Tags each record with the EGX tickers it mentions
+
+
+_http_cache = None
+_http_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    """Open the HTTP cache on first use, so importing this module touches no files"""
+    global _http_cache
+    with _http_cache_lock:
+        if _http_cache is None:
+            _http_cache = HttpCache()
+        return _http_cache
+
+
+_label_cache = None
+_label_cache_lock = threading.Lock()
+
+
+def get_label_cache():
+    """Open the label cache on first use, so importing this module touches no files"""
+    global _label_cache
+    with _label_cache_lock:
+        if _label_cache is None:
+            _label_cache = LabelCache()
+        return _label_cache
+
 
 # Keywords for filtering
 KEYWORDS = [
@@ -47,6 +100,7 @@ KEYWORDS = [
     "البورصة", "المصرية", "أسهم", "أرباح", "توزيعات", "استثمار",
     "اقتصاد", "بنك", "مالي", "تداول"
 ]
+keyword_matcher = KeywordMatcher(KEYWORDS)
 
 # Egyptian Financial News Sources with Archive URLs
 SOURCES = {
@@ -113,22 +167,27 @@ def fetch_article_urls(source_name, config):
     
     print(f"\n📰 Scraping {source_name} archives...")
     
+    def parse_archive_page(response):
+        if response.status_code != 200:
+            return []
+        
+        soup = BeautifulSoup(response.content, 'lxml')
+        page_urls = []
+        for link in soup.select(selector):
+            href = link.get('href', '')
+            if href:
+                page_urls.append(urljoin(base_url, href))
+        return page_urls
+    
     for page in tqdm(range(1, pages + 1), desc=f"  Pages from {source_name}"):
         try:
             url = pattern.format(page=page)
-            response = requests.get(url, headers=get_headers(), timeout=15)
+            page_urls = get_http_cache().fetch(session, url, parse_archive_page, headers=get_headers(), timeout=15)
             
-            if response.status_code != 200:
+            if not page_urls:
                 continue
             
-            soup = BeautifulSoup(response.content, 'lxml')
-            links = soup.select(selector)
-            
-            for link in links:
-                href = link.get('href', '')
-                if href:
-                    full_url = urljoin(base_url, href)
-                    urls.append(full_url)
+            urls.extend(page_urls)
             
             time.sleep(1)  # Polite scraping delay
             
@@ -155,53 +214,167 @@ def filter_relevant(title, content):
     """Check if article is relevant based on keywords"""
     if not title or not content:
         return False
-    text = f"{title} {content}".lower()
-    return any(keyword.lower() in text for keyword in KEYWORDS)
+    return keyword_matcher.search(f"{title} {content}")
 
 
-def distill_knowledge(text):
-    """Get sentiment from Groq"""
-    prompt = f"""Analyze the sentiment of this Egyptian financial news article.
+def build_prompt(text):
+    """Build the sentiment prompt for one article"""
+    return f"""Analyze the sentiment of this Egyptian financial news article.
 
 Article: {text[:2000]}
 
 Respond ONLY with valid JSON in this exact format:
 {{"sentiment": "positive/negative/neutral", "reasoning": "brief explanation"}}"""
 
-    try:
-        response = client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a financial sentiment analysis expert. Always respond with valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=150
-        )
+
+def distill_knowledge(text):
+    """Get sentiment from Groq"""
+    cached = get_label_cache().get(text, GROQ_MODEL, PROMPT_VERSION)
+    if cached is not None:
+        return cached
+    
+    prompt = build_prompt(text)
+    estimated = estimate_tokens(SYSTEM_PROMPT + prompt, MAX_COMPLETION_TOKENS)
+    
+    for _ in range(MAX_RETRIES):
+        # Block only when the RPM/TPM budget is actually exhausted
+        rate_limiter.acquire(estimated)
+        try:
+            raw = client.chat.completions.with_raw_response.create(
+                model=GROQ_MODEL,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.3,
+                max_tokens=MAX_COMPLETION_TOKENS
+            )
+            rate_limiter.sync(raw.headers)
+            response = raw.parse()
+            rate_limiter.settle(estimated, response.usage.total_tokens if response.usage else None)
+            
+            result = json.loads(response.choices[0].message.content)
+            if not isinstance(result, dict) or result.get("sentiment") not in VALID_SENTIMENTS:
+                # Left out of the cache so the next run asks again
+                return {"sentiment": "neutral", "reasoning": "parsing_error"}
+            get_label_cache().put(text, GROQ_MODEL, PROMPT_VERSION, result)
+            return result
         
-        result = json.loads(response.choices[0].message.content)
-        return result
+        except RateLimitError as e:
+            rate_limiter.sync(e.response.headers)
+        except:
+            return {"sentiment": "neutral", "reasoning": "parsing_error"}
     
-    except:
-        return {"sentiment": "neutral", "reasoning": "parsing_error"}
+    return {"sentiment": "neutral", "reasoning": "error: rate limited"}
 
 
 def load_existing_urls(output_file):
-    """Load existing URLs to avoid duplicates"""
-    existing = set()
-    if os.path.exists(output_file):
-        with open(output_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    record = json.loads(line.strip())
-                    existing.add(record.get('source', ''))
-                except:
-                    continue
-    return existing
+    """Open the URL index to avoid duplicates (catches up with appended lines)"""
+    return UrlIndex(output_file)
+
+
+def finish_batch(batch_id, output_file):
+    """Wait for a submitted batch and merge its labels into the dataset"""
+    batch = wait_for_batch(client, batch_id)
+    if batch.status != "completed":
+        # An expired or cancelled batch may still carry partial output; the rest is labeled below
+        print(f"✗ Batch {batch_id} ended as '{batch.status}'. Its pending records are labeled individually")
+    
+    results = download_results(client, batch)
+    pending = read_jsonl(PENDING_FILE)
+    for record in pending:
+        analysis = results.get(record["custom_id"])
+        if analysis is not None and analysis.get("reasoning") != "parsing_error" \
+                and analysis.get("sentiment") in VALID_SENTIMENTS:
+            get_label_cache().put(record["text"], GROQ_MODEL, PROMPT_VERSION, analysis)
+    unlabeled = merge_results(pending, results, output_file)
+    merged = len(pending) - len(unlabeled)
+    
+    # Requests that failed inside the batch fall back to individual calls
+    if unlabeled:
+        print(f"⚠️  {len(unlabeled)} articles had no batch result, labeling individually...")
+        labels = {r["custom_id"]: distill_knowledge(r["text"]) for r in tqdm(unlabeled, desc="Labeling leftovers")}
+        merge_results(unlabeled, labels, output_file)
+        merged += len(unlabeled)
+    
+    clear_state()
+    return merged
+
+
+def run_batch_mode(all_articles, output_file):
+    """Extract articles and label them with one Groq Batch API job"""
+    pending = []
+    
+    def extract(item):
+        source_name, url = item
+        title, content = extract_article_text(url)
+        
+        # Skip failed extractions and irrelevant articles
+        if not title or not content or not filter_relevant(title, content):
+            return None
+        text = f"{title}. {content[:1500]}"
+        return {
+            "custom_id": hashlib.sha1(url.encode('utf-8')).hexdigest()[:16],
+            "text": text,
+            "title": title,
+            "sentiment": None,
+            "reasoning": None,
+            "source": url,
+            "source_name": source_name,
+            "published": "",
+            "tickers": ticker_tagger.tag(text),
+            "tagger_version": TAGGER_VERSION,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    with tqdm(total=len(all_articles), desc="Extracting") as progress:
+        def collect(record):
+            pending.append(record)
+            progress.update(1)
+        
+        # Labeling is deferred to the batch job, so the label stage passes records through
+        run_pipeline(all_articles, extract, lambda record: record, collect, extract_workers=EXTRACT_WORKERS)
+    
+    # The same article listed by several sources would share a custom_id
+    pending = unique_by_url(pending)
+    
+    # Articles whose text was labeled before never enter the batch
+    cached = {r["custom_id"]: get_label_cache().get(r["text"], GROQ_MODEL, PROMPT_VERSION) for r in pending}
+    cached = {custom_id: analysis for custom_id, analysis in cached.items() if analysis is not None}
+    if cached:
+        merge_results([r for r in pending if r["custom_id"] in cached], cached, output_file)
+        pending = [r for r in pending if r["custom_id"] not in cached]
+    
+    if not pending:
+        print("✓ No uncached articles to label.")
+        return len(cached)
+    
+    write_jsonl(REQUESTS_FILE, [
+        build_request(r["custom_id"], GROQ_MODEL, SYSTEM_PROMPT, build_prompt(r["text"]), MAX_COMPLETION_TOKENS)
+        for r in pending
+    ])
+    write_jsonl(PENDING_FILE, pending)
+    print(f"📝 Wrote {len(pending)} prompts to {REQUESTS_FILE}")
+    
+    batch = submit_batch(client)
+    save_state({"batch_id": batch.id, "submitted_at": datetime.now().isoformat(), "requests": len(pending)})
+    return len(cached) + finish_batch(batch.id, output_file)
 
 
 def main():
     """Run historical scraper"""
+    global client
+    
+    parser = argparse.ArgumentParser(description="EgySentiment historical scraper")
+    parser.add_argument("--batch", action="store_true",
+                        help="Label through one Groq Batch API job instead of rate-limited calls")
+    parser.add_argument("--base-url", default=None,
+                        help="Groq API base URL (e.g. a local stand-in server for testing)")
+    args = parser.parse_args()
+    
+    if args.base_url:
+        client = Groq(api_key=os.getenv("GROQ_API_KEY"), base_url=args.base_url)
+    
     print("=" * 70)
     print("EgySentiment Historical Scraper")
     print("Bulk Data Collection for Llama 3.1-8B Fine-tuning")
@@ -212,8 +385,17 @@ def main():
     # Ensure data directory exists
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
     
+    # Resume a batch submitted by an interrupted run before collecting more
+    state = load_state() if args.batch else None
+    if state:
+        print(f"\n🔁 Resuming batch {state['batch_id']} submitted at {state['submitted_at']}")
+        merged = finish_batch(state['batch_id'], output_file)
+        print(f"✓ Merged {merged} labeled articles from the resumed batch")
+        return
+    
     existing_urls = load_existing_urls(output_file)
-    print(f"\n📊 Existing dataset: {len(existing_urls)} samples")
+    initial_count = len(existing_urls)
+    print(f"\n📊 Existing dataset: {initial_count} samples")
     
     all_articles = []
     
@@ -224,62 +406,71 @@ def main():
         new_urls = [u for u in urls if u not in existing_urls]
         all_articles.extend([(source_name, u) for u in new_urls[:MAX_ARTICLES_PER_SOURCE]])
     
+    get_http_cache().print_stats()
     print(f"\n📦 Total new articles to process: {len(all_articles)}")
     
     if not all_articles:
         print("✓ No new articles found. Historical collection complete!")
         return
     
-    # Step 2: Process articles
-    processed = 0
-    skipped = 0
+    if args.batch:
+        processed = run_batch_mode(all_articles, output_file)
+        print(f"\n✓ Batch labeling complete: {processed} new articles")
+        return
     
+    # Step 2: Process articles (extraction overlaps with the rate-limited labeling)
     print(f"\n🔬 Processing articles through Groq...")
-    print(f"⏱️  Rate limit: {RATE_LIMIT_DELAY}s per request")
-    print(f"⏳ Estimated time: {len(all_articles) * RATE_LIMIT_DELAY / 60:.1f} minutes\n")
+    print(f"⏱️  Rate limit: {GROQ_RPM} RPM / {GROQ_TPM} TPM (token bucket)")
+    print(f"⏳ Estimated time: {len(all_articles) / GROQ_RPM:.1f} minutes\n")
     
-    with open(output_file, 'a', encoding='utf-8') as f:
-        for source_name, url in tqdm(all_articles, desc="Extracting & labeling"):
-            # Extract article
-            title, content = extract_article_text(url)
-            
-            if not title or not content:
-                skipped += 1
-                continue
-            
-            # Filter relevance
-            if not filter_relevant(title, content):
-                skipped += 1
-                continue
-            
-            # Get sentiment
-            text = f"{title}. {content[:1500]}"
-            analysis = distill_knowledge(text)
-            
-            # Save record
-            record = {
-                "text": text,
-                "title": title,
-                "sentiment": analysis.get("sentiment", "neutral"),
-                "reasoning": analysis.get("reasoning", ""),
-                "source": url,
-                "source_name": source_name,
-                "published": "",
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    def extract(item):
+        source_name, url = item
+        title, content = extract_article_text(url)
+        
+        # Skip failed extractions and irrelevant articles
+        if not title or not content or not filter_relevant(title, content):
+            return None
+        return source_name, url, title, f"{title}. {content[:1500]}"
+    
+    def label(item):
+        source_name, url, title, text = item
+        analysis = distill_knowledge(text)
+        
+        return {
+            "text": text,
+            "title": title,
+            "sentiment": analysis.get("sentiment", "neutral"),
+            "reasoning": analysis.get("reasoning", ""),
+            "source": url,
+            "source_name": source_name,
+            "published": "",
+            "tickers": ticker_tagger.tag(text),
+            "tagger_version": TAGGER_VERSION,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    with open(output_file, 'a', encoding='utf-8') as f, \
+            tqdm(total=len(all_articles), desc="Extracting & labeling") as progress:
+        def write(record):
+            line = json.dumps(record, ensure_ascii=False) + '\n'
+            f.write(line)
             f.flush()  # Save immediately
-            processed += 1
-            
-            # Rate limiting
-            time.sleep(RATE_LIMIT_DELAY)
+            existing_urls.add(record['source'], f.tell(), len(line.encode('utf-8')))
+            progress.update(1)
+        
+        processed = run_pipeline(
+            all_articles, extract, label, write,
+            extract_workers=EXTRACT_WORKERS, queue_size=EXTRACT_QUEUE_SIZE
+        )
+    skipped = len(all_articles) - processed
     
-    total = len(existing_urls) + processed
+    total = initial_count + processed
     print(f"\n{'=' * 70}")
     print(f"✓ Historical scraping complete!")
     print(f"  New articles processed: {processed}")
     print(f"  Skipped (irrelevant/error): {skipped}")
+    print(f"  Time spent waiting on rate limit: {rate_limiter.waited:.1f}s")
+    get_label_cache().print_stats()
     print(f"  Total dataset size: {total} samples")
     print(f"{'=' * 70}")
 
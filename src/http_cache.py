@@ -0,0 +1,128 @@
+"""
+EgySentiment HTTP Cache
+On-disk cache for feeds and listing pages using ETag/Last-Modified revalidation.
+A 304 response returns the previously parsed payload, skipping both the
+download and the feedparser/BeautifulSoup parse. A fetch given a deadline
+streams the body and gives up once it passes, since a request timeout only
+bounds each socket read and a trickling server can outlast it.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+import urllib3
+
+CACHE_DIR = "data/http_cache"
+READ_CHUNK = 65536  # Most bytes taken per read of a streamed body
+
+
+def read_body(response, deadline):
+    """Read a streamed response body, raising requests' Timeout once `deadline` (time.monotonic()) passes"""
+    # read1 returns whatever has arrived instead of waiting for a full chunk; requests leaves gzip undecoded
+    read = getattr(response.raw, 'read1', response.raw.read)
+    chunks = []
+    try:
+        while True:
+            if time.monotonic() >= deadline:
+                raise requests.exceptions.Timeout(f"Deadline passed while reading {response.url}")
+            try:
+                chunk = read(READ_CHUNK, decode_content=True)
+            except urllib3.exceptions.ReadTimeoutError as e:
+                raise requests.exceptions.ReadTimeout(e)
+            except urllib3.exceptions.ProtocolError as e:
+                raise requests.exceptions.ChunkedEncodingError(e)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        response.close()
+    # Where requests itself keeps a consumed body, so .content/.text work as usual
+    response._content = b''.join(chunks)
+
+
+class HttpCache:
+    """Conditional-request cache storing validators and parsed payloads per URL"""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url):
+        digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def _load(self, url):
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            return entry if entry.get('url') == url else None
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, url, response, payload):
+        entry = {
+            "url": url,
+            "etag": response.headers.get('ETag'),
+            "last_modified": response.headers.get('Last-Modified'),
+            "size": len(response.content),
+            "payload": payload,
+        }
+        tmp_path = self._path(url) + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self._path(url))
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️  Could not cache {url}: {e}")
+
+    def fetch(self, session, url, parse, headers=None, deadline=None, **kwargs):
+        """GET a URL with conditional headers and return parse(response), cached on 304
+
+        `parse` must return a JSON-serializable payload. Only 200 responses
+        carrying an ETag or Last-Modified validator are stored. With a
+        `deadline` (a time.monotonic() value) the whole download must finish
+        before it, or requests.exceptions.Timeout is raised.
+        """
+        cached = self._load(url)
+        request_headers = dict(headers or {})
+        if cached:
+            if cached.get('etag'):
+                request_headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                request_headers['If-Modified-Since'] = cached['last_modified']
+
+        if deadline is None:
+            response = session.get(url, headers=request_headers, **kwargs)
+        else:
+            if time.monotonic() >= deadline:
+                raise requests.exceptions.Timeout(f"Deadline passed before fetching {url}")
+            response = session.get(url, headers=request_headers, stream=True, **kwargs)
+            read_body(response, deadline)
+
+        if response.status_code == 304 and cached:
+            with self._lock:
+                self.hits += 1
+                self.bytes_saved += cached.get('size', 0)
+            return cached['payload']
+
+        with self._lock:
+            self.misses += 1
+        payload = parse(response)
+        if response.status_code == 200 and (response.headers.get('ETag') or response.headers.get('Last-Modified')):
+            self._store(url, response, payload)
+        return payload
+
+    def print_stats(self):
+        """Print hit/miss counters for the run"""
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total else 0.0
+        print(f"🗄️  HTTP cache: {self.hits} hits, {self.misses} misses "
+              f"({hit_rate:.0f}% hit rate), {self.bytes_saved / 1024:.1f} KB saved")
@@ -0,0 +1,126 @@
+"""
+EgySentiment Keyword Matcher
+Aho-Corasick automaton for case-insensitive multi-keyword matching.
+Compiled once, then scans each text in a single pass regardless of
+how many English/Arabic keywords are loaded. With whole_words=True,
+keywords only match as whole tokens ("CIB" does not match "CIBC"), Arabic
+keywords may carry the attached prefixes و/ب/ل/ف/ك/ال ("والبنك"), and
+all-caps keywords such as tickers and acronyms match case-sensitively
+("EFG" does not match "efg").
+"""
+
+# Proclitics that attach to the Arabic word they precede
+ARABIC_PREFIXES = {
+    "و", "ف", "ب", "ل", "ك", "ال", "لل",
+    "وال", "فال", "بال", "كال", "ولل", "فلل", "وب", "ول", "فب", "فل",
+}
+
+
+def is_word(ch):
+    return ch.isalnum() or ch == '_'
+
+
+def is_acronym(keyword):
+    """All-caps Latin keyword (ticker or acronym), matched case-sensitively"""
+    return keyword.isascii() and any(ch.isalpha() for ch in keyword) and keyword == keyword.upper()
+
+
+def lower(text):
+    """Lowercase without changing the length, so match positions index the original text"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return ''.join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+
+
+class KeywordMatcher:
+    """Match many keywords against a text in one pass (substring semantics by default)"""
+
+    def __init__(self, keywords, whole_words=False):
+        keywords = [k.strip() for k in keywords if k and k.strip()]
+        self.keywords = list(dict.fromkeys(k.lower() for k in keywords))
+        self.whole_words = whole_words
+        # Exact spelling of keywords only ever given in capitals; any other spelling makes them case-insensitive
+        self._exact = {}
+        if whole_words:
+            insensitive = {k.lower() for k in keywords if not is_acronym(k)}
+            for k in keywords:
+                if is_acronym(k) and k.lower() not in insensitive:
+                    self._exact.setdefault(k.lower(), set()).add(k)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        self._build()
+
+    def _build(self):
+        # Trie of all keywords
+        for keyword in self.keywords:
+            state = 0
+            for ch in keyword:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = next_state
+            self._out[state] = self._out[state] + (keyword,)
+
+        # Breadth-first failure links; outputs inherit from their failure state
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def _scan(self, text):
+        goto, fail, out = self._goto, self._fail, self._out
+        lowered = lower(text)
+        state = 0
+        for end, ch in enumerate(lowered):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                if not self.whole_words:
+                    yield out[state]
+                    continue
+                bounded = tuple(k for k in out[state] if self._accept(text, k, end - len(k) + 1, end))
+                if bounded:
+                    yield bounded
+
+    def _accept(self, text, keyword, start, end):
+        exact = self._exact.get(keyword)
+        if exact is not None and text[start:end + 1] not in exact:
+            return False
+        return self._bounded(text, start, end)
+
+    @staticmethod
+    def _bounded(text, start, end):
+        """True if text[start:end + 1] is a whole token, allowing an attached Arabic prefix before it"""
+        if end + 1 < len(text) and is_word(text[end + 1]):
+            return False
+        glued = start
+        while glued > 0 and is_word(text[glued - 1]):
+            glued -= 1
+        if glued == start:
+            return True
+        return not text[start].isascii() and text[glued:start] in ARABIC_PREFIXES
+
+    def search(self, text):
+        """Return True if any keyword occurs in the text"""
+        for _ in self._scan(text or ""):
+            return True
+        return False
+
+    def findall(self, text):
+        """Return the set of keywords occurring in the text"""
+        matched = set()
+        for keywords in self._scan(text or ""):
+            matched.update(keywords)
+        return matched
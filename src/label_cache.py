@@ -0,0 +1,105 @@
+"""
+EgySentiment Label Cache
+Persistent SQLite cache of sentiment labels keyed by a hash of the normalized
+article text plus the model and prompt version that produced the label.
+Shared by the Groq labelers and the Ollama scorers so repeated text costs a
+lookup instead of an inference. Least-recently-used rows are evicted once
+the cache grows past MAX_ENTRIES.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = "data/label_cache.sqlite"
+MAX_ENTRIES = 200000  # Size cap before least-recently-used labels are evicted
+EVICT_FRACTION = 0.1  # Share of the cache dropped per eviction pass
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """Collapse whitespace and case so trivially different copies share a key"""
+    return WHITESPACE.sub(' ', str(text or '')).strip().lower()
+
+
+def cache_key(text, model, prompt_version):
+    """Hash of normalized text + model + prompt version"""
+    payload = f"{model}\x00{prompt_version}\x00{normalize_text(text)}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LabelCache:
+    """SQLite-backed label cache safe to share between threads"""
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS labels (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                prompt_version TEXT,
+                result TEXT,
+                created REAL,
+                last_used REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS labels_last_used ON labels (last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM labels").fetchone()[0]
+
+    def get(self, text, model, prompt_version):
+        """Return the cached label dict for this text, or None"""
+        key = cache_key(text, model, prompt_version)
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM labels WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE labels SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, text, model, prompt_version, result):
+        """Store a label dict for this text"""
+        key = cache_key(text, model, prompt_version)
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, prompt_version, json.dumps(result, ensure_ascii=False), now, now)
+            )
+            self._count += cursor.rowcount
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        self._count = self._conn.execute("SELECT COUNT(*) FROM labels").fetchone()[0]
+        excess = self._count - self.max_entries
+        if excess <= 0:
+            return
+        drop = max(excess, int(self.max_entries * EVICT_FRACTION))
+        self._conn.execute(
+            "DELETE FROM labels WHERE key IN (SELECT key FROM labels ORDER BY last_used LIMIT ?)", (drop,)
+        )
+        self._count -= drop
+
+    def print_stats(self):
+        """Print hit/miss counters for the run"""
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total else 0.0
+        print(f"🏷️  Label cache: {self.hits} hits, {self.misses} misses ({hit_rate:.0f}% hit rate)")
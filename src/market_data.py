@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+EgySentiment Market Data
+Local daily OHLCV store for the STOCK_DATA tickers, one Parquet file per
+ticker under data/market/. Each update only downloads the bars since the
+last stored one (the last bar itself is re-fetched, since it may have been
+an intraday snapshot). Set MARKET_DATA_SOURCE=synthetic to use a
+deterministic offline stand-in for Yahoo Finance. Updating many tickers at
+once uses a single batched download.
+
+Usage: python src/market_data.py [--synthetic] [TICKER ...]   # update all tickers by default
+"""
+
+import argparse
+import os
+import time
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from stock_data import STOCK_DATA
+
+MARKET_DIR = "data/market"
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+INITIAL_HISTORY_DAYS = 365  # Backfill for a ticker with no stored bars
+REFRESH_SECONDS = 15 * 60  # A store file younger than this is served without a network call
+EGX_WEEKMASK = "Sun Mon Tue Wed Thu"  # EGX trading days
+
+
+class YahooSource:
+    """Daily bars from Yahoo Finance"""
+
+    def fetch(self, ticker, start, end):
+        """OHLCV bars dated in [start, end)"""
+        import yfinance as yf
+        return yf.Ticker(ticker).history(start=start, end=end, auto_adjust=False)
+
+    def fetch_many(self, tickers, start, end):
+        """{ticker: bars} for several tickers from one batched download"""
+        import yfinance as yf
+        data = yf.download(list(tickers), start=start, end=end, group_by="ticker", auto_adjust=False,
+                           threads=True, progress=False)
+        if data.empty:
+            return {}
+        available = set(data.columns.get_level_values(0))
+        return {ticker: data[ticker].dropna(how="all") for ticker in tickers if ticker in available}
+
+
+class SyntheticSource:
+    """Deterministic random-walk bars per ticker, for offline runs and tests"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def fetch(self, ticker, start, end):
+        self.calls += 1
+        return self._bars(ticker, start, end)
+
+    def fetch_many(self, tickers, start, end):
+        self.calls += 1
+        return {ticker: self._bars(ticker, start, end) for ticker in tickers}
+
+    def _bars(self, ticker, start, end):
+        # Generate from a fixed origin so overlapping requests agree on every bar
+        days = pd.bdate_range("2020-01-01", end, freq="C", weekmask=EGX_WEEKMASK, inclusive="left")
+        rng = np.random.RandomState(zlib.crc32(ticker.encode('utf-8')))
+        close = 20 * np.exp(np.cumsum(rng.normal(0, 0.015, len(days))))
+        spread = np.abs(rng.normal(0, 0.01, len(days)))
+        bars = pd.DataFrame({
+            "Open": close * (1 + rng.normal(0, 0.005, len(days))),
+            "High": close * (1 + spread),
+            "Low": close * (1 - spread),
+            "Close": close,
+            "Volume": rng.randint(100_000, 5_000_000, len(days)),
+        }, index=days)
+        bars["High"] = bars[["Open", "High", "Close"]].max(axis=1)
+        bars["Low"] = bars[["Open", "Low", "Close"]].min(axis=1)
+        return bars[bars.index >= pd.Timestamp(start)]
+
+
+def get_source(name=None):
+    """Data source named by MARKET_DATA_SOURCE ("yahoo" or "synthetic")"""
+    name = name or os.getenv("MARKET_DATA_SOURCE", "yahoo")
+    return SyntheticSource() if name == "synthetic" else YahooSource()
+
+
+def normalize_bars(bars):
+    """Naive-date-indexed OHLCV frame, one row per day"""
+    if bars is None or bars.empty:
+        return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], name="Date"))
+    bars = bars[COLUMNS].copy()
+    index = pd.DatetimeIndex(bars.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    bars.index = index.normalize().rename("Date")
+    return bars[~bars.index.duplicated(keep="last")].sort_index()
+
+
+class MarketDataStore:
+    """Per-ticker Parquet OHLCV files, topped up incrementally from a data source"""
+
+    def __init__(self, root=MARKET_DIR, source=None, refresh_seconds=REFRESH_SECONDS):
+        self.root = root
+        self.source = source or get_source()
+        self.refresh_seconds = refresh_seconds
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, ticker):
+        return os.path.join(self.root, f"{ticker}.parquet")
+
+    def load(self, ticker):
+        """Stored bars for a ticker, empty if none"""
+        path = self.path(ticker)
+        return normalize_bars(pd.read_parquet(path)) if os.path.exists(path) else normalize_bars(None)
+
+    def is_fresh(self, ticker):
+        path = self.path(ticker)
+        return os.path.exists(path) and time.time() - os.path.getmtime(path) < self.refresh_seconds
+
+    @staticmethod
+    def _start(stored):
+        """First date to fetch: the last stored bar, or the initial backfill window"""
+        if not stored.empty:
+            return stored.index[-1].date()
+        return datetime.now().date() - timedelta(days=INITIAL_HISTORY_DAYS)
+
+    def _merge(self, ticker, stored, start, fetched):
+        fresh = normalize_bars(fetched)
+        fresh = fresh[fresh.index >= pd.Timestamp(start)]
+        kept = stored[stored.index < pd.Timestamp(start)]
+        # Leave out an empty side: concatenating it would turn the OHLCV columns into object dtype
+        bars = stored if fresh.empty else fresh if kept.empty else pd.concat([kept, fresh])
+        self.save(ticker, bars)
+        return bars
+
+    def update(self, ticker):
+        """Fetch the bars missing since the last stored one; returns all stored bars"""
+        stored = self.load(ticker)
+        if self.is_fresh(ticker):
+            return stored
+        start = self._start(stored)
+        end = (datetime.now().date() + timedelta(days=1)).isoformat()
+        return self._merge(ticker, stored, start, self.source.fetch(ticker, start.isoformat(), end))
+
+    def update_many(self, tickers):
+        """Top up every stale ticker with a single batched download; returns {ticker: bars}"""
+        bars = {ticker: self.load(ticker) for ticker in tickers}
+        stale = [ticker for ticker in tickers if not self.is_fresh(ticker)]
+        if stale:
+            starts = {ticker: self._start(bars[ticker]) for ticker in stale}
+            end = (datetime.now().date() + timedelta(days=1)).isoformat()
+            fetched = self.source.fetch_many(stale, min(starts.values()).isoformat(), end)
+            for ticker in stale:
+                bars[ticker] = self._merge(ticker, bars[ticker], starts[ticker], fetched.get(ticker))
+        return bars
+
+    def save(self, ticker, bars):
+        # Rewrite even when nothing new arrived, so the mtime marks the check as fresh
+        tmp_path = self.path(ticker) + ".tmp"
+        bars.to_parquet(tmp_path)
+        os.replace(tmp_path, self.path(ticker))
+
+    def history(self, ticker, days=90):
+        """Up-to-date bars for the last `days` calendar days"""
+        bars = self.update(ticker)
+        return bars[bars.index >= pd.Timestamp(datetime.now().date() - timedelta(days=days))]
+
+
+def wide_frame(bars_by_ticker, field):
+    """Date x ticker frame of one OHLCV field"""
+    columns = {ticker: bars[field] for ticker, bars in bars_by_ticker.items() if not bars.empty}
+    if not columns:
+        return pd.DataFrame()
+    return pd.concat(columns, axis=1).sort_index()
+
+
+def market_overview(bars_by_ticker, stock_data=STOCK_DATA):
+    """Per-ticker sector, last close, daily change (%) and volume from the wide Close/Volume frames"""
+    close = wide_frame(bars_by_ticker, "Close").ffill()
+    volume = wide_frame(bars_by_ticker, "Volume")
+    companies = pd.DataFrame(
+        [{"ticker": info["ticker"], "name": name, "sector": info.get("sector", "Others")}
+         for name, info in stock_data.items()]
+    ).set_index("ticker")
+    if close.empty:
+        return companies.assign(close=np.nan, change_pct=np.nan, volume=np.nan)
+    last = pd.DataFrame({
+        "close": close.iloc[-1],
+        "change_pct": close.pct_change(fill_method=None).iloc[-1] * 100,
+        "volume": volume.iloc[-1],
+    })
+    return companies.join(last)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update the local OHLCV store")
+    parser.add_argument("tickers", nargs="*", help="Tickers to update (default: every STOCK_DATA ticker)")
+    parser.add_argument("--synthetic", action="store_true", help="Use the offline synthetic source")
+    args = parser.parse_args()
+
+    store = MarketDataStore(source=get_source("synthetic" if args.synthetic else None), refresh_seconds=0)
+    tickers = args.tickers or [info["ticker"] for info in STOCK_DATA.values()]
+    start = time.time()
+    bars_by_ticker = store.update_many(tickers)
+    for ticker, bars in bars_by_ticker.items():
+        last = bars.index[-1].date() if not bars.empty else "-"
+        print(f"📈 {ticker:<10} {len(bars):>4} bars, last {last}")
+    print(f"⏱️  Updated {len(tickers)} tickers in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+EgySentiment MinHash
+Vectorized MinHash signatures over character n-grams, used to spot the same
+story published by several outlets with slightly different wording.
+"""
+
+import re
+import zlib
+
+import numpy as np
+
+PRIME = (1 << 31) - 1  # Keeps a * h + b inside uint64 for 32-bit shingle hashes
+NON_WORD = re.compile(r'[^\w\s]')
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = NON_WORD.sub(' ', str(text or '').lower())
+    return WHITESPACE.sub(' ', text).strip()
+
+
+class MinHasher:
+    """MinHash signatures of character n-gram sets"""
+
+    def __init__(self, num_perm=64, ngram=5, seed=1):
+        self.num_perm = num_perm
+        self.ngram = ngram
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, PRIME, size=num_perm).astype(np.uint64)
+
+    def shingles(self, text):
+        """Set of 32-bit hashes of the character n-grams of the normalized text"""
+        text = normalize(text)
+        if len(text) <= self.ngram:
+            return {zlib.crc32(text.encode('utf-8'))} if text else set()
+        return {zlib.crc32(text[i:i + self.ngram].encode('utf-8')) for i in range(len(text) - self.ngram + 1)}
+
+    def signature(self, text):
+        """MinHash signature (uint64 array of length num_perm) of a text"""
+        hashes = np.fromiter(self.shingles(text), dtype=np.uint64)
+        if hashes.size == 0:
+            return np.full(self.num_perm, PRIME, dtype=np.uint64)
+        permuted = (np.outer(hashes, self._a) + self._b) % PRIME
+        return permuted.min(axis=0)
+
+    def signatures(self, texts):
+        """Stacked signatures, one row per text"""
+        return np.vstack([self.signature(text) for text in texts]) if texts else \
+            np.empty((0, self.num_perm), dtype=np.uint64)
+
+
+def similarity(signature, signatures):
+    """Estimated Jaccard similarity of one signature against each row of a matrix"""
+    if len(signatures) == 0:
+        return np.empty(0)
+    return (signatures == signature).mean(axis=1)
+
+
+class LSHIndex:
+    """Banded locality-sensitive hashing over MinHash signatures"""
+
+    def __init__(self, bands, rows):
+        self.bands = bands
+        self.rows = rows
+        self._buckets = [{} for _ in range(bands)]
+
+    def _keys(self, signature):
+        raw = signature.tobytes()
+        step = signature.itemsize * self.rows
+        for band in range(self.bands):
+            yield band, raw[band * step:(band + 1) * step]
+
+    def insert(self, item_id, signature):
+        """Add an item under each of its band keys"""
+        for band, key in self._keys(signature):
+            self._buckets[band].setdefault(key, []).append(item_id)
+
+    def query(self, signature):
+        """Ids sharing at least one band with the signature"""
+        candidates = set()
+        for band, key in self._keys(signature):
+            bucket = self._buckets[band].get(key)
+            if bucket:
+                candidates.update(bucket)
+        return candidates
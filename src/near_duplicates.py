@@ -0,0 +1,156 @@
+"""
+EgySentiment Near-Duplicate Suppression
+Pre-labeling check that drops wire stories already seen from another outlet.
+Each relevant entry's title+summary MinHash signature is compared against a
+rolling window of recently ingested articles; near-duplicates are recorded as
+aliases of the first article instead of being extracted and labeled again.
+Only articles from another host count, so an outlet's own recurring headlines
+("Gold prices in Egypt today Sunday") are never suppressed, and aliases expire
+with the window.
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+import numpy as np
+
+from minhash import MinHasher, similarity
+
+WINDOW_FILE = "data/recent_minhash.npz"
+ALIASES_FILE = "data/aliases.jsonl"
+NEAR_DUP_THRESHOLD = 0.6  # Estimated Jaccard of title+summary 5-gram sets
+SHORT_TEXT_SHINGLES = 60  # Below this many 5-grams (a bare headline) the stricter threshold applies
+SHORT_TEXT_THRESHOLD = 0.9
+WINDOW_SIZE = 3000  # Most recent articles kept for comparison
+WINDOW_DAYS = 7  # Articles older than this drop out of the window
+
+
+def entry_text(entry):
+    """Text used to fingerprint a feed entry"""
+    return f"{entry.get('title', '')} {entry.get('summary', '')}"
+
+
+def url_host(url):
+    """Host of a URL without a leading www."""
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class NearDuplicateFilter:
+    """Rolling-window MinHash filter with a persistent alias log"""
+
+    def __init__(self, window_file=WINDOW_FILE, aliases_file=ALIASES_FILE, threshold=NEAR_DUP_THRESHOLD):
+        self.window_file = window_file
+        self.aliases_file = aliases_file
+        self.threshold = threshold
+        self.hasher = MinHasher()
+        self.urls = []
+        self.times = np.empty(0)
+        self.signatures = np.empty((0, self.hasher.num_perm), dtype=np.uint64)
+        self.aliases = set()
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.window_file):
+            try:
+                with np.load(self.window_file) as window:
+                    if window['signatures'].shape[1] == self.hasher.num_perm:
+                        self.urls = window['urls'].tolist()
+                        self.times = window['times']
+                        self.signatures = window['signatures']
+            except (OSError, KeyError, ValueError) as e:
+                print(f"⚠️  Could not load near-duplicate window: {e}")
+        if os.path.exists(self.aliases_file):
+            # Aliases last as long as the window; same-host ones predate the cross-outlet rule
+            cutoff = (datetime.now() - timedelta(days=WINDOW_DAYS)).isoformat()
+            with open(self.aliases_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        alias = json.loads(line)
+                        if alias['timestamp'] >= cutoff and url_host(alias['url']) != url_host(alias['canonical']):
+                            self.aliases.add(alias['url'])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+
+    def save(self):
+        """Trim the window to WINDOW_SIZE / WINDOW_DAYS and persist it"""
+        keep = self.times >= time.time() - WINDOW_DAYS * 86400
+        keep[:-WINDOW_SIZE] = False
+        os.makedirs(os.path.dirname(self.window_file) or '.', exist_ok=True)
+        tmp_file = self.window_file + ".tmp.npz"
+        np.savez(
+            tmp_file,
+            urls=np.array([u for u, k in zip(self.urls, keep) if k], dtype=str),
+            times=self.times[keep],
+            signatures=self.signatures[keep]
+        )
+        os.replace(tmp_file, self.window_file)
+
+    def filter_entries(self, entries):
+        """Return entries that are not near-duplicates of a recent article, logging the rest as aliases"""
+        kept = []
+        new_aliases = []
+        known = {url: i for i, url in enumerate(self.urls)}
+        hosts = [url_host(url) for url in self.urls]
+        added_urls, added_times, added_sigs = [], [], []
+
+        for entry in entries:
+            url = entry.get('link', '')
+            if url in self.aliases:
+                continue
+            if url in known:
+                # Same article seen again; the URL index decides whether it is new
+                kept.append(entry)
+                continue
+
+            text = entry_text(entry)
+            shingles = self.hasher.shingles(text)
+            if not shingles:
+                kept.append(entry)
+                continue
+            signature = self.hasher.signature(text)
+            host = url_host(url)
+            # A headline alone shares most of its 5-grams with the next day's edition of the same story
+            threshold = self.threshold if len(shingles) >= SHORT_TEXT_SHINGLES else \
+                max(self.threshold, SHORT_TEXT_THRESHOLD)
+
+            window = self.signatures if not added_sigs else np.vstack([self.signatures] + added_sigs)
+            scores = similarity(signature, window)
+            if scores.size:
+                scores[np.array(hosts) == host] = 0
+            best = int(scores.argmax()) if scores.size else -1
+            if best >= 0 and scores[best] >= threshold:
+                canonical = (self.urls + added_urls)[best]
+                new_aliases.append({
+                    "url": url,
+                    "canonical": canonical,
+                    "similarity": round(float(scores[best]), 3),
+                    "title": entry.get('title', ''),
+                    "timestamp": datetime.now().isoformat()
+                })
+                self.aliases.add(url)
+                continue
+
+            known[url] = len(self.urls) + len(added_urls)
+            added_urls.append(url)
+            hosts.append(host)
+            added_times.append(time.time())
+            added_sigs.append(signature[np.newaxis, :])
+            kept.append(entry)
+
+        if added_sigs:
+            self.urls = self.urls + added_urls
+            self.times = np.concatenate([self.times, np.array(added_times)])
+            self.signatures = np.vstack([self.signatures] + added_sigs)
+
+        if new_aliases:
+            with open(self.aliases_file, 'a', encoding='utf-8') as f:
+                for alias in new_aliases:
+                    f.write(json.dumps(alias, ensure_ascii=False) + '\n')
+
+        print(f"🧬 Suppressed {len(new_aliases)} near-duplicates across outlets "
+              f"({len(kept)} of {len(entries)} entries kept)")
+        return kept
@@ -0,0 +1,115 @@
+"""
+EgySentiment Rate Limiter
+Token-bucket limiter for requests-per-minute and tokens-per-minute budgets.
+Callers only block when a budget is actually exhausted, and the buckets are
+kept in sync with the x-ratelimit-* headers returned by Groq.
+"""
+
+import re
+import threading
+import time
+
+DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parse_duration(value):
+    """Parse Groq reset durations such as '7.66s', '2m59.56s' or '500ms' into seconds"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PATTERN.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def estimate_tokens(text, max_tokens=0):
+    """Rough token estimate for a prompt plus its completion budget"""
+    return len(text) // 4 + max_tokens
+
+
+class RateLimiter:
+    """Thread-safe token buckets for RPM and TPM limits"""
+
+    def __init__(self, rpm, tpm=None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = float(rpm)
+        self.tokens = float(tpm) if tpm else None
+        self.blocked_until = 0.0
+        self.waited = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+
+    def acquire(self, tokens=0):
+        """Block until one request and `tokens` tokens are available, then consume them"""
+        if self.tpm:
+            tokens = min(tokens, self.tpm)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait_for = self.blocked_until - now
+                if wait_for <= 0:
+                    request_deficit = 1 - self.requests
+                    token_deficit = (tokens - self.tokens) if self.tpm else 0
+                    if request_deficit <= 0 and token_deficit <= 0:
+                        self.requests -= 1
+                        if self.tpm:
+                            self.tokens -= tokens
+                        return
+                    wait_for = max(
+                        request_deficit * 60 / self.rpm,
+                        token_deficit * 60 / self.tpm if self.tpm else 0,
+                    )
+                self.waited += wait_for
+            time.sleep(wait_for)
+
+    def settle(self, estimated, used):
+        """Correct the token bucket once the real usage of a request is known"""
+        if not self.tpm or used is None:
+            return
+        with self._lock:
+            self.tokens = min(self.tpm, self.tokens + estimated - used)
+
+    def sync(self, headers):
+        """Align the buckets with the x-ratelimit-* / retry-after headers of a response"""
+        if not headers:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            # Groq reports tokens per minute; never assume more than the server does
+            remaining_tokens = headers.get('x-ratelimit-remaining-tokens')
+            if self.tpm and remaining_tokens is not None:
+                try:
+                    self.tokens = min(self.tokens, float(remaining_tokens))
+                except ValueError:
+                    pass
+
+            # Requests are reported per day; only the exhausted case matters here
+            remaining_requests = headers.get('x-ratelimit-remaining-requests')
+            reset_requests = parse_duration(headers.get('x-ratelimit-reset-requests'))
+            if remaining_requests is not None and reset_requests is not None:
+                try:
+                    if float(remaining_requests) < 1:
+                        self.blocked_until = max(self.blocked_until, now + reset_requests)
+                except ValueError:
+                    pass
+
+            retry_after = parse_duration(headers.get('retry-after'))
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
@@ -0,0 +1,260 @@
+"""
+EgySentiment Stock Universe
+EGX 30 companies with their Yahoo Finance tickers and the English/Arabic
+keywords used to link news articles to them. Shared by the dashboard,
+the scoring job and the feature builders. Keywords must name the company
+unambiguously: all-caps keywords match case-sensitively and every keyword
+must match a whole word, but everyday words ("WE", "east", "فوري" =
+"immediate") still belong in a longer phrase.
+"""
+
+from keyword_matcher import KeywordMatcher
+
+# Bump when the keywords or matching rules change: stored `tickers` from an
+# older version are re-tagged, and indexes built from them are rebuilt
+TAGGER_VERSION = 2
+
+# --- Comprehensive Stock Mapping (EGX 30) ---
+# Format: "Display Name": {"ticker": "TICKER.CA", "sector": "Sector", "keywords": ["list", "of", "keywords"]}
+STOCK_DATA = {
+    # --- Banking Sector ---
+    "Commercial International Bank (CIB)": {
+        "ticker": "COMI.CA",
+        "sector": "Banking",
+        "keywords": ["CIB", "COMI", "Commercial International Bank", "البنك التجاري الدولي", "التجاري الدولي", "CIB Egypt"]
+    },
+    "QNB Alahli": {
+        "ticker": "QNBA.CA",
+        "sector": "Banking",
+        "keywords": ["QNB", "QNBA", "Qatar National Bank", "بنك قطر الوطني", "قطر الوطني", "QNB Alahli", "بنك قطر الوطني الأهلي"]
+    },
+    "Crédit Agricole Egypt": {
+        "ticker": "CIEB.CA",
+        "sector": "Banking",
+        "keywords": ["Credit Agricole", "CIEB", "Crédit Agricole", "كريدي أجريكول", "بنك كريدي أجريكول"]
+    },
+    "Housing & Development Bank": {
+        "ticker": "HDBK.CA",
+        "sector": "Banking",
+        "keywords": ["HDBK", "Housing & Development Bank", "Housing and Development Bank", "بنك التعمير والإسكان", "التعمير والإسكان"]
+    },
+    "Faisal Islamic Bank of Egypt": {
+        "ticker": "FAIT.CA",
+        "sector": "Banking",
+        "keywords": ["Faisal Islamic Bank", "FAIT", "FAITA", "بنك فيصل الإسلامي", "فيصل الإسلامي"]
+    },
+    "Abu Dhabi Islamic Bank (ADIB)": {
+        "ticker": "ADIB.CA",
+        "sector": "Banking",
+        "keywords": ["ADIB", "Abu Dhabi Islamic Bank", "مصرف أبوظبي الإسلامي", "أبوظبي الإسلامي", "ADIB Egypt"]
+    },
+    "Al Baraka Bank Egypt": {
+        "ticker": "SAUD.CA",
+        "sector": "Banking",
+        "keywords": ["Al Baraka", "SAUD", "Al Baraka Bank", "بنك البركة", "البركة مصر"]
+    },
+    "Egyptian Gulf Bank (EGBANK)": {
+        "ticker": "EGBE.CA",
+        "sector": "Banking",
+        "keywords": ["EGBANK", "EGBE", "Egyptian Gulf Bank", "البنك المصري الخليجي", "المصري الخليجي"]
+    },
+    "Export Development Bank of Egypt (EBank)": {
+        "ticker": "EXPA.CA",
+        "sector": "Banking",
+        "keywords": ["EBank", "EXPA", "Export Development Bank", "البنك المصري لتنمية الصادرات", "بنك تنمية الصادرات"]
+    },
+
+    # --- Non-Bank Financial Services ---
+    "EFG Hermes": {
+        "ticker": "HRHO.CA",
+        "sector": "Non-Bank Financials",
+        "keywords": ["EFG Hermes", "HRHO", "EFG", "EFG Holding", "المجموعة المالية هيرميس", "هيرميس", "هيرميس القابضة"]
+    },
+    "E-Finance": {
+        "ticker": "EFIH.CA",
+        "sector": "Non-Bank Financials",
+        "keywords": ["E-Finance", "EFIH", "e-finance", "إي فاينانس", "اي فاينانس", "e-finance for Digital and Financial Investments"]
+    },
+    "Fawry": {
+        "ticker": "FWRY.CA",
+        "sector": "Non-Bank Financials",
+        "keywords": ["Fawry", "FWRY", "Fawry for Banking Technology", "شركة فوري", "فوري للمدفوعات", "فوري لتكنولوجيا البنوك"]
+    },
+    "Belton Financial": {
+        "ticker": "BTFH.CA",
+        "sector": "Non-Bank Financials",
+        "keywords": ["Belton", "BTFH", "Belton Financial", "بلتون", "بلتون المالية", "بلتون القابضة"]
+    },
+    "CI Capital": {
+        "ticker": "CICH.CA",
+        "sector": "Non-Bank Financials",
+        "keywords": ["CI Capital", "CICH", "سي آي كابيتال", "سي اي كابيتال"]
+    },
+
+    # --- Real Estate & Construction ---
+    "Talaat Moustafa Group (TMG)": {
+        "ticker": "TMGH.CA",
+        "sector": "Real Estate & Construction",
+        "keywords": ["Talaat Moustafa", "TMGH", "TMG", "TMG Holding", "طلعت مصطفى", "مجموعة طلعت مصطفى", "Madinaty", "Rehab City", "مدينة مدينتي", "مدينة الرحاب"]
+    },
+    "Palm Hills Developments": {
+        "ticker": "PHDC.CA",
+        "sector": "Real Estate & Construction",
+        "keywords": ["Palm Hills", "PHDC", "Palm Hills Developments", "بالم هيلز", "بالم هيلز للتعمير", "Badya"]
+    },
+    "Sixth of October Development & Investment (SODIC)": {
+        "ticker": "OCDI.CA",
+        "sector": "Real Estate & Construction",
+        "keywords": ["SODIC", "OCDI", "Sixth of October Development", "سوديك", "السادس من أكتوبر للتنمية"]
+    },
+    "Madinet Masr (MNHD)": {
+        "ticker": "MASR.CA",
+        "sector": "Real Estate & Construction",
+        "keywords": ["Madinet Masr", "MASR", "Madinet Nasr", "MNHD", "مدينة مصر", "مدينة نصر للإسكان", "Taj City", "تاج سيتي"]
+    },
+    "Heliopolis Housing": {
+        "ticker": "HELI.CA",
+        "sector": "Real Estate & Construction",
+        "keywords": ["Heliopolis Housing", "HELI", "Heliopolis Company for Housing", "مصر الجديدة للإسكان", "مصر الجديدة للاسكان والتعمير"]
+    },
+    "Orascom Construction": {
+        "ticker": "ORAS.CA",
+        "sector": "Real Estate & Construction",
+        "keywords": ["Orascom Construction", "ORAS", "Orascom", "أوراسكوم للإنشاءات", "أوراسكوم كونستراكشون"]
+    },
+    "Emaar Misr": {
+        "ticker": "EMFD.CA",
+        "sector": "Real Estate & Construction",
+        "keywords": ["Emaar", "EMFD", "Emaar Misr", "إعمار مصر", "Marassi"]
+    },
+
+    # --- Industrial & Basic Resources ---
+    "Elsewedy Electric": {
+        "ticker": "SWDY.CA",
+        "sector": "Industrials & Basic Resources",
+        "keywords": ["Elsewedy", "SWDY", "El Sewedy", "Elsewedy Electric", "السويدي", "السويدي إليكتريك", "السويدي للكابلات"]
+    },
+    "Ezz Steel": {
+        "ticker": "ESRS.CA",
+        "sector": "Industrials & Basic Resources",
+        "keywords": ["Ezz Steel", "ESRS", "Al Ezz Dekheila", "حديد عز", "عز الدخيلة", "مجموعة عز"]
+    },
+    "Abu Qir Fertilizers": {
+        "ticker": "ABUK.CA",
+        "sector": "Industrials & Basic Resources",
+        "keywords": ["Abu Qir", "ABUK", "Abu Qir Fertilizers", "أبو قير", "أبو قير للأسمدة", "ابوقير"]
+    },
+    "Misr Fertilizers Production (MOPCO)": {
+        "ticker": "MFPC.CA",
+        "sector": "Industrials & Basic Resources",
+        "keywords": ["MOPCO", "MFPC", "Misr Fertilizers", "موبكو", "مصر لإنتاج الأسمدة"]
+    },
+    "Sidi Kerir Petrochemicals (SIDPEC)": {
+        "ticker": "SKPC.CA",
+        "sector": "Industrials & Basic Resources",
+        "keywords": ["Sidi Kerir", "SKPC", "Sidpec", "سيدي كرير", "سيدبك", "سيدي كرير للبتروكيماويات"]
+    },
+    "Alexandria Mineral Oils (AMOC)": {
+        "ticker": "AMOC.CA",
+        "sector": "Industrials & Basic Resources",
+        "keywords": ["AMOC", "Alexandria Mineral Oils", "أموك", "الاسكندرية للزيوت المعدنية"]
+    },
+    "Kima": {
+        "ticker": "KIMA.CA",
+        "sector": "Industrials & Basic Resources",
+        "keywords": ["Kima", "KIMA", "Egyptian Chemical Industries", "كيما", "الصناعات الكيماوية المصرية"]
+    },
+
+    # --- Telecom & Technology ---
+    "Telecom Egypt (WE)": {
+        "ticker": "ETEL.CA",
+        "sector": "Telecom & Technology",
+        "keywords": ["Telecom Egypt", "ETEL", "WE Telecom", "المصرية للاتصالات", "تي إي داتا"]
+    },
+
+    # --- Consumer & Healthcare ---
+    "Eastern Company": {
+        "ticker": "EAST.CA",
+        "sector": "Consumer & Healthcare",
+        "keywords": ["Eastern Company", "EAST.CA", "Eastern Tobacco", "الشرقية للدخان", "ايسترن كومباني"]
+    },
+    "Juhayna Food Industries": {
+        "ticker": "JUFO.CA",
+        "sector": "Consumer & Healthcare",
+        "keywords": ["Juhayna", "JUFO", "جهينة", "جهينه", "جهينة للصناعات الغذائية"]
+    },
+    "Edita Food Industries": {
+        "ticker": "EFID.CA",
+        "sector": "Consumer & Healthcare",
+        "keywords": ["Edita", "EFID", "إيديتا", "ايديتا", "إيديتا للصناعات الغذائية"]
+    },
+    "Ibnsina Pharma": {
+        "ticker": "ISPH.CA",
+        "sector": "Consumer & Healthcare",
+        "keywords": ["Ibnsina", "ISPH", "Ibnsina Pharma", "ابن سينا", "ابن سينا فارما"]
+    },
+    "Cleopatra Hospitals": {
+        "ticker": "CLHO.CA",
+        "sector": "Consumer & Healthcare",
+        "keywords": ["Cleopatra", "CLHO", "Cleopatra Hospitals Group", "CHG", "مستشفيات كليوباترا", "مجموعة كليوباترا"]
+    },
+    "GB Corp (Ghabbour)": {
+        "ticker": "GBCO.CA",
+        "sector": "Consumer & Healthcare",
+        "keywords": ["GB Corp", "GBCO", "GB Auto", "Ghabbour", "جي بي أوتو", "غبور", "جي بي كورب"]
+    },
+
+    # --- Others ---
+    "Egypt Kuwait Holding": {
+        "ticker": "EKHO.CA",
+        "sector": "Others",
+        "keywords": ["Egypt Kuwait Holding", "EKHO", "EKH", "القابضة المصرية الكويتية", "المصرية الكويتية"]
+    },
+    "Qalaa Holdings": {
+        "ticker": "CCAP.CA",
+        "sector": "Others",
+        "keywords": ["Qalaa", "CCAP", "Citadel Capital", "القلعة القابضة", "القلعة للاستشارات المالية"]
+    },
+    "Egyptian Satellites (NileSat)": {
+        "ticker": "EGSA.CA",
+        "sector": "Others",
+        "keywords": ["NileSat", "EGSA", "Egyptian Satellites", "نايل سات", "المصرية للأقمار الصناعية"]
+    }
+}
+
+TICKER_NAMES = {info["ticker"]: name for name, info in STOCK_DATA.items()}
+
+
+class TickerTagger:
+    """Tag texts with the tickers whose keywords they mention"""
+
+    def __init__(self, stock_data=STOCK_DATA):
+        self._tickers = {}
+        keywords = []
+        for info in stock_data.values():
+            for keyword in info["keywords"]:
+                keywords.append(keyword)
+                self._tickers.setdefault(keyword.strip().lower(), set()).add(info["ticker"])
+        # Original spellings, so all-caps keywords stay case-sensitive
+        self._matcher = KeywordMatcher(keywords, whole_words=True)
+
+    def tag(self, text):
+        """Sorted list of tickers mentioned in the text"""
+        tickers = set()
+        for keyword in self._matcher.findall(text):
+            tickers.update(self._tickers[keyword])
+        return sorted(tickers)
+
+    def record_tickers(self, record):
+        """A record's stored `tickers` if tagged by this TAGGER_VERSION, else tagged from its title and text"""
+        if record.get('tickers') is not None and is_current_tag(record.get('tagger_version')):
+            return list(record['tickers'])
+        return self.tag(f"{record.get('title', '')} {record.get('text', '')}")
+
+
+def is_current_tag(version):
+    """True if a stored `tagger_version` (int, or text/float after a CSV round trip) is TAGGER_VERSION"""
+    try:
+        return int(float(version)) == TAGGER_VERSION
+    except (TypeError, ValueError):
+        return False
@@ -0,0 +1,134 @@
+"""
+EgySentiment Structured Output
+JSON schema passed as Ollama's `format` option, so the local egysentiment model
+can only decode {"sentiment": <label>, "reasoning": <short text>}, plus the
+strict parser and retry loop shared by the dashboard and auto_score, and an
+incremental reader for streamed responses.
+"""
+
+import json
+import re
+import threading
+
+VALID_SENTIMENTS = ("positive", "negative", "neutral")
+REASONING_MAX_CHARS = 300
+NUM_PREDICT = 160  # Token cap: the schema's JSON overhead plus REASONING_MAX_CHARS of text
+MAX_PARSE_RETRIES = 2  # Extra generations allowed per article when the output does not parse
+PARSE_ERROR = "parsing_error"
+SENTIMENT_FIELD = re.compile(r'"sentiment"\s*:\s*"(positive|negative|neutral)"')
+REASONING_FIELD = re.compile(r'"reasoning"\s*:\s*"((?:[^"\\]|\\.)*)')
+
+SENTIMENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "sentiment": {"type": "string", "enum": list(VALID_SENTIMENTS)},
+        "reasoning": {"type": "string", "maxLength": REASONING_MAX_CHARS}
+    },
+    "required": ["sentiment", "reasoning"]
+}
+
+
+class ParseError(ValueError):
+    """Model output that does not match SENTIMENT_SCHEMA"""
+
+
+def parse_label(content):
+    """Strictly parse a schema-constrained response into (sentiment, reasoning)"""
+    try:
+        result = json.loads(content)
+    except (TypeError, ValueError) as e:
+        raise ParseError(f"invalid JSON: {e}") from e
+    if not isinstance(result, dict):
+        raise ParseError("response is not a JSON object")
+    sentiment = result.get("sentiment")
+    reasoning = result.get("reasoning", "")
+    if sentiment not in VALID_SENTIMENTS:
+        raise ParseError(f"unexpected sentiment {sentiment!r}")
+    if not isinstance(reasoning, str):
+        raise ParseError("reasoning is not a string")
+    return sentiment, reasoning[:REASONING_MAX_CHARS]
+
+
+def parse_label_lenient(content):
+    """parse_label(), tolerating prose or code fences around the JSON object; raises ParseError"""
+    try:
+        return parse_label(content)
+    except ParseError:
+        start, end = str(content).find("{"), str(content).rfind("}")
+        if start == -1 or end <= start:
+            raise
+        return parse_label(content[start:end + 1])
+
+
+class ParseStats:
+    """Thread-safe counters of labels requested, retried and failed"""
+
+    def __init__(self):
+        self.labels = 0
+        self.retries = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def record(self, retries, failed):
+        with self._lock:
+            self.labels += 1
+            self.retries += retries
+            self.failures += int(failed)
+
+    def print_stats(self):
+        """Print the parse-failure rate for the run"""
+        rate = (self.failures / self.labels * 100) if self.labels else 0.0
+        print(f"🧩 Structured output: {self.failures}/{self.labels} parse failures ({rate:.1f}%), "
+              f"{self.retries} retries")
+
+
+parse_stats = ParseStats()
+
+
+def label_with_retries(generate, retries=MAX_PARSE_RETRIES, stats=parse_stats):
+    """Call generate() -> raw content until it parses, at most 1 + retries times; raises ParseError"""
+    error = None
+    for attempt in range(retries + 1):
+        try:
+            label = parse_label(generate())
+        except ParseError as e:
+            error = e
+            continue
+        stats.record(attempt, failed=False)
+        return label
+    stats.record(retries, failed=True)
+    raise error
+
+
+class StreamingLabel:
+    """Fields of a schema-constrained response readable while it is still streaming"""
+
+    def __init__(self):
+        self.content = ""
+
+    def feed(self, delta):
+        self.content += delta
+
+    @property
+    def sentiment(self):
+        """The label once its closing quote has arrived, else None"""
+        match = SENTIMENT_FIELD.search(self.content)
+        return match.group(1) if match else None
+
+    @property
+    def reasoning(self):
+        """The reasoning text decoded so far"""
+        match = REASONING_FIELD.search(self.content)
+        if not match:
+            return ""
+        partial = match.group(1)
+        # Drop a trailing escape sequence that has not fully arrived yet
+        partial = re.sub(r'\\(u[0-9a-fA-F]{0,3})?$', '', partial)
+        try:
+            return json.loads(f'"{partial}"')
+        except ValueError:
+            return partial
+
+    def result(self):
+        """Parse the complete response, tolerating text around the JSON object; raises ParseError"""
+        return parse_label_lenient(self.content)
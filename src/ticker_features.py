@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+EgySentiment Ticker Features
+Per-ticker daily sentiment features materialized from the feature store:
+article count, mean score, an EWMA and rolling 7/30-day windows on a
+calendar-day grid. Runs after auto_score.py and only recomputes the days
+touched by newly scored articles, plus the later days whose windows depend
+on them.
+
+Usage: python src/ticker_features.py [--rebuild]
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from feature_store import FeatureStore
+
+OUTPUT_FILE = "data/ticker_daily_features.parquet"
+STATE_FILE = "data/ticker_features_state.json"  # Last feature-store row folded in, and the store generation
+EWM_HALFLIFE_DAYS = 3  # Days for the sentiment EWMA to lose half its weight
+EWM_ALPHA = 1 - 0.5 ** (1 / EWM_HALFLIFE_DAYS)
+ROLLING_WINDOWS = (7, 30)
+BASE_COLUMNS = ["ticker", "date", "article_count", "score_sum"]
+
+
+def daily_counts(features):
+    """(ticker, date) article counts and score sums from feature-store rows"""
+    tagged = features.dropna(subset=["tickers"])
+    tagged = tagged[tagged["tickers"].map(len) > 0].explode("tickers")
+    if tagged.empty:
+        return pd.DataFrame(columns=BASE_COLUMNS)
+    grouped = tagged.groupby(["tickers", "date"])["sentiment_score"].agg(["count", "sum"]).reset_index()
+    grouped.columns = BASE_COLUMNS
+    return grouped
+
+
+def shift_day(date, days):
+    return (pd.Timestamp(date) + pd.Timedelta(days=days)).strftime('%Y-%m-%d')
+
+
+def derive(base, start, head):
+    """Feature rows for every ticker and calendar day from `start` on; `head` holds the rows before it"""
+    end = base["date"].max()
+    tickers = sorted(base["ticker"].unique())
+    context_start = shift_day(start, -(max(ROLLING_WINDOWS) - 1))
+    days = pd.date_range(context_start, end, freq='D').strftime('%Y-%m-%d')
+
+    window = base[base["date"] >= context_start]
+    counts = window.pivot_table(index="date", columns="ticker", values="article_count", aggfunc="sum")
+    counts = counts.reindex(index=days, columns=tickers).fillna(0)
+    sums = window.pivot_table(index="date", columns="ticker", values="score_sum", aggfunc="sum")
+    sums = sums.reindex(index=days, columns=tickers).fillna(0)
+
+    features = {
+        "article_count": counts,
+        "score_sum": sums,
+        "mean_score": sums / counts.where(counts > 0),
+    }
+    for days_back in ROLLING_WINDOWS:
+        rolling_counts = counts.rolling(days_back, min_periods=1).sum()
+        features[f"article_count_{days_back}d"] = rolling_counts
+        features[f"mean_score_{days_back}d"] = sums.rolling(days_back, min_periods=1).sum() / \
+            rolling_counts.where(rolling_counts > 0)
+
+    # EWMA of the daily mean, decaying toward neutral (0) on days without news,
+    # continued from each ticker's last value before `start`
+    seed = pd.Series(0.0, index=tickers)
+    if not head.empty:
+        last = head.sort_values("date").groupby("ticker").last()
+        gap = (pd.Timestamp(shift_day(start, -1)) - pd.to_datetime(last["date"])).dt.days
+        seed = seed.add(last["ewm_score"] * (1 - EWM_ALPHA) ** gap, fill_value=0).reindex(tickers).fillna(0)
+    recent = {name: frame.loc[days >= start] for name, frame in features.items()}
+    with_seed = pd.concat([seed.to_frame().T, recent["mean_score"].fillna(0)])
+    recent["ewm_score"] = with_seed.ewm(alpha=EWM_ALPHA, adjust=False).mean().iloc[1:]
+
+    tail = pd.concat(recent, axis=1)
+    tail = tail.stack(level=1, future_stack=True).reset_index()
+    tail.columns = ["date", "ticker"] + list(tail.columns[2:])
+
+    # Each ticker's grid starts at its first article
+    first_day = base.groupby("ticker")["date"].min()
+    tail = tail[tail["date"] >= tail["ticker"].map(first_day)]
+    for column in ["article_count"] + [f"article_count_{days_back}d" for days_back in ROLLING_WINDOWS]:
+        tail[column] = tail[column].astype(np.int64)
+    return tail
+
+
+def latest_scores(path=OUTPUT_FILE, window=7):
+    """Each ticker's latest EWMA score, `window`-day mean score and article count"""
+    columns = ["ticker", "date", "ewm_score", f"mean_score_{window}d", f"article_count_{window}d"]
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=columns).set_index("ticker")
+    features = pd.read_parquet(path, columns=columns)
+    return features.sort_values("date").groupby("ticker").last()
+
+
+def load_state(generation):
+    """Last folded-in row, or 0 if the feature store was cleared and re-scored since"""
+    if not os.path.exists(STATE_FILE) or not os.path.exists(OUTPUT_FILE):
+        return 0
+    with open(STATE_FILE, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    return state.get("rowid", 0) if state.get("generation") == generation else 0
+
+
+def save_state(rowid, generation):
+    with open(STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump({"rowid": rowid, "generation": generation}, f)
+
+
+def update(store=None, rebuild=False):
+    """Fold articles scored since the last run into the per-ticker daily features"""
+    store = store or FeatureStore()
+    since = 0 if rebuild else load_state(store.generation)
+    last, touched = store.dates_since(since)
+    if not touched:
+        print("✅ Ticker features up to date.")
+        return
+
+    existing = pd.read_parquet(OUTPUT_FILE) if since and os.path.exists(OUTPUT_FILE) else pd.DataFrame()
+    fresh = daily_counts(store.read(columns=["date", "sentiment_score", "tickers"], dates=touched))
+    kept = existing[~existing["date"].isin(touched)][BASE_COLUMNS] if not existing.empty \
+        else pd.DataFrame(columns=BASE_COLUMNS)
+    base = pd.concat([kept, fresh], ignore_index=True)
+    base = base[base["article_count"] > 0]
+
+    if base.empty:
+        result = existing.iloc[0:0]
+    else:
+        # Also fill the quiet days between the previous end of the grid and the new dates
+        start = min(touched[0], shift_day(existing["date"].max(), 1)) if not existing.empty else touched[0]
+        head = existing[existing["date"] < start] if not existing.empty else existing
+        result = pd.concat([head, derive(base, start, head)], ignore_index=True)
+        result = result.sort_values(["ticker", "date"]).reset_index(drop=True)
+
+    tmp_file = OUTPUT_FILE + ".tmp"
+    result.to_parquet(tmp_file, index=False)
+    os.replace(tmp_file, OUTPUT_FILE)
+    save_state(last, store.generation)
+    print(f"📈 Ticker features: {len(touched)} days touched since {touched[0]}, "
+          f"{result['ticker'].nunique() if not result.empty else 0} tickers, {len(result)} rows in {OUTPUT_FILE}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materialize per-ticker daily sentiment features")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute from the whole feature store")
+    args = parser.parse_args()
+    update(rebuild=args.rebuild)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+EgySentiment Ticker Index
+Sidecar SQLite inverted index from each EGX ticker to the dataset articles
+that mention it, stored as the byte offset of the article's JSONL line plus
+its publication date. Tickers come from the `tickers` field written at
+ingest; records without it, or tagged by an older TAGGER_VERSION, are
+tagged from the STOCK_DATA keywords while indexing. Like the URL index it
+catches up from the last indexed offset, and a rewritten dataset or a new
+TAGGER_VERSION triggers a full rebuild.
+
+Usage:
+  python src/ticker_index.py CIB --since 2025-07-01 --until 2025-09-30
+  python src/ticker_index.py COMI.CA --last-days 90 [--count]
+  python src/ticker_index.py --rebuild
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+
+from stock_data import STOCK_DATA, TAGGER_VERSION, TICKER_NAMES, TickerTagger
+
+DATASET_FILE = "data/testing_data.jsonl"
+INDEX_SUFFIX = ".tickers.sqlite"
+
+
+def article_date(record):
+    """YYYY-MM-DD publication date of a record, falling back to its scrape timestamp"""
+    published = str(record.get('published') or '').strip()
+    if published:
+        try:
+            return datetime.strptime(published[:10], '%Y-%m-%d').strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+        try:
+            return parsedate_to_datetime(published).strftime('%Y-%m-%d')
+        except (TypeError, ValueError):
+            pass
+    return str(record.get('timestamp') or '')[:10] or None
+
+
+def resolve_ticker(query):
+    """Ticker for a ticker symbol, display name or keyword (e.g. "CIB" -> "COMI.CA"), or None"""
+    query = query.strip().lower()
+    for name, info in STOCK_DATA.items():
+        if query in (info["ticker"].lower(), info["ticker"].lower().split('.')[0], name.lower()):
+            return info["ticker"]
+    for info in STOCK_DATA.values():
+        if query in (keyword.lower() for keyword in info["keywords"]):
+            return info["ticker"]
+    return None
+
+
+class TickerIndex:
+    """Persistent ticker -> article offsets index kept in sync with the JSONL file"""
+
+    def __init__(self, dataset_file=DATASET_FILE, index_path=None):
+        self.dataset_file = dataset_file
+        self.index_path = index_path or dataset_file + INDEX_SUFFIX
+        self._lock = threading.Lock()
+        self._tagger = None
+        directory = os.path.dirname(self.index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.index_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS mentions (ticker TEXT, date TEXT, offset INTEGER, PRIMARY KEY (ticker, offset))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS mentions_by_date ON mentions (ticker, date)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self._conn.commit()
+        self.sync()
+
+    def _get_meta(self, key, default=None):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def sync(self):
+        """Catch up with records appended since the last indexed offset, or rebuild if rewritten"""
+        with self._lock:
+            if not os.path.exists(self.dataset_file):
+                if self._get_meta('offset', 0):
+                    self._reset()
+                    self._conn.commit()
+                return
+            stat = os.stat(self.dataset_file)
+            offset = self._get_meta('offset', 0)
+            if stat.st_ino != self._get_meta('inode') or stat.st_size < offset \
+                    or self._get_meta('tagger_version') != TAGGER_VERSION:
+                self._reset()
+                offset = 0
+            if stat.st_size > offset:
+                self._index_from(offset)
+            self._set_meta('inode', stat.st_ino)
+            self._set_meta('tagger_version', TAGGER_VERSION)
+            self._conn.commit()
+
+    def rebuild(self):
+        """Drop the index and re-scan the whole dataset"""
+        with self._lock:
+            self._reset()
+            self._conn.commit()
+        self.sync()
+        print(f"🏷️  Rebuilt ticker index: {len(self)} mentions from {self.dataset_file}")
+
+    def _reset(self):
+        self._conn.execute("DELETE FROM mentions")
+        self._conn.execute("DELETE FROM meta")
+
+    def _tickers(self, record):
+        if self._tagger is None:
+            self._tagger = TickerTagger()
+        return self._tagger.record_tickers(record)
+
+    def _index_from(self, offset):
+        mentions = []
+        with open(self.dataset_file, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                # Stop at a partially written last line; it is picked up next time
+                if not line.endswith(b'\n'):
+                    break
+                line_offset = offset
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                    tickers = self._tickers(record)
+                except (ValueError, AttributeError):
+                    continue
+                date = article_date(record)
+                mentions.extend((ticker, date, line_offset) for ticker in tickers)
+        self._conn.executemany("INSERT OR IGNORE INTO mentions VALUES (?, ?, ?)", mentions)
+        self._set_meta('offset', offset)
+
+    def lookup(self, ticker, start=None, end=None):
+        """Byte offsets of the articles mentioning `ticker`, optionally dated within [start, end]"""
+        query = "SELECT offset FROM mentions WHERE ticker = ?"
+        params = [ticker]
+        if start:
+            query += " AND date >= ?"
+            params.append(start)
+        if end:
+            query += " AND date <= ?"
+            params.append(end)
+        with self._lock:
+            return [offset for (offset,) in self._conn.execute(query + " ORDER BY date, offset", params)]
+
+    def articles(self, ticker, start=None, end=None):
+        """Yield the records mentioning `ticker`, read directly at their offsets"""
+        yield from self._read(self.lookup(ticker, start, end))
+
+    def recent(self, ticker, limit=5):
+        """The `limit` most recently published records mentioning `ticker`, newest first"""
+        query = "SELECT offset FROM mentions WHERE ticker = ? ORDER BY date DESC, offset DESC LIMIT ?"
+        with self._lock:
+            offsets = [offset for (offset,) in self._conn.execute(query, (ticker, limit))]
+        return list(self._read(offsets))
+
+    def _read(self, offsets):
+        with open(self.dataset_file, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                yield json.loads(f.readline())
+
+    def counts(self):
+        """{ticker: number of articles} over the whole dataset"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT ticker, COUNT(*) FROM mentions GROUP BY ticker"))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM mentions").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or maintain the ticker -> article index")
+    parser.add_argument("stock", nargs="?", help="Ticker, company name or keyword (e.g. COMI.CA or CIB)")
+    parser.add_argument("--dataset", default=DATASET_FILE)
+    parser.add_argument("--since", help="First publication date, YYYY-MM-DD")
+    parser.add_argument("--until", help="Last publication date, YYYY-MM-DD")
+    parser.add_argument("--last-days", type=int, help="Only articles from the last N days")
+    parser.add_argument("--count", action="store_true", help="Print the number of matches only")
+    parser.add_argument("--rebuild", action="store_true", help="Re-scan the whole dataset")
+    args = parser.parse_args()
+
+    index = TickerIndex(args.dataset)
+    if args.rebuild:
+        index.rebuild()
+    if not args.stock:
+        for ticker, count in sorted(index.counts().items(), key=lambda item: -item[1]):
+            print(f"{ticker:<10} {count:>6}  {TICKER_NAMES.get(ticker, '')}")
+        return
+
+    ticker = resolve_ticker(args.stock)
+    if ticker is None:
+        print(f"❌ Unknown stock {args.stock!r}")
+        return
+    since = args.since
+    if args.last_days:
+        since = (datetime.now() - timedelta(days=args.last_days)).strftime('%Y-%m-%d')
+
+    if args.count:
+        print(len(index.lookup(ticker, since, args.until)))
+        return
+    found = 0
+    for record in index.articles(ticker, since, args.until):
+        found += 1
+        print(f"{article_date(record) or '?':<10}  {record.get('sentiment') or '-':<8}  "
+              f"{record.get('title') or str(record.get('text', ''))[:80]}")
+    print(f"🏷️  {found} articles mentioning {TICKER_NAMES.get(ticker, ticker)} ({ticker})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+EgySentiment Upload Reader
+Chunked, Arrow-backed parsing of Batch tab uploads (CSV or JSONL). Only the
+selected columns are materialized, one block of input at a time, so a large
+news dump is filtered and handed to the batch job without ever building a
+DataFrame of the whole file.
+"""
+
+import io
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.json as pa_json
+
+BLOCK_SIZE = 8 << 20  # Bytes of input parsed per chunk
+PREVIEW_BLOCK_SIZE = 1 << 20
+LIST_COLUMNS = ("tickers",)  # Read as list<string>; everything else is read as text
+
+
+def file_kind(name):
+    return "csv" if name.lower().endswith(".csv") else "jsonl"
+
+
+def _schema(columns):
+    return pa.schema([(c, pa.list_(pa.string()) if c in LIST_COLUMNS else pa.string()) for c in columns])
+
+
+def _csv_chunks(file, columns, block_size):
+    convert_options = pa_csv.ConvertOptions(include_columns=columns or [],
+                                            column_types={c: pa.string() for c in columns or []})
+    reader = pa_csv.open_csv(file, read_options=pa_csv.ReadOptions(block_size=block_size),
+                             parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                             convert_options=convert_options)
+    for batch in reader:
+        yield batch.to_pandas()
+
+
+def _line_blocks(file, block_size):
+    """Yield byte blocks of whole lines"""
+    rest = b''
+    while True:
+        data = file.read(block_size)
+        if not data:
+            if rest.strip():
+                yield rest + b'\n'
+            return
+        data = rest + data
+        cut = data.rfind(b'\n') + 1
+        rest = data[cut:]
+        if cut:
+            yield data[:cut]
+
+
+def _jsonl_chunks(file, columns, block_size):
+    parse_options = pa_json.ParseOptions(explicit_schema=_schema(columns), unexpected_field_behavior="ignore") \
+        if columns else None
+    for block in _line_blocks(file, block_size):
+        try:
+            yield pa_json.read_json(io.BytesIO(block), parse_options=parse_options).to_pandas()
+        except pa.ArrowInvalid:
+            # A column whose JSON type varies across rows: parse this block with the json module
+            records = [json.loads(line) for line in block.splitlines() if line.strip()]
+            if columns:
+                records = [{c: record.get(c) for c in columns} for record in records]
+            yield pd.DataFrame(records, columns=columns)
+
+
+def read_chunks(file, kind, columns=None, block_size=BLOCK_SIZE):
+    """Yield DataFrames of `columns` (all if None), one per ~block_size bytes of the upload"""
+    file.seek(0)
+    chunks = _csv_chunks if kind == "csv" else _jsonl_chunks
+    yield from chunks(file, columns, block_size)
+
+
+def read_preview(file, kind, rows=5):
+    """First rows of the upload, parsed from its first block only"""
+    for chunk in read_chunks(file, kind, block_size=PREVIEW_BLOCK_SIZE):
+        return chunk.head(rows)
+    return pd.DataFrame()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+EgySentiment URL Index
+Sidecar SQLite index of the `source` URLs already stored in the dataset.
+Writers add URLs as they append records; readers open the index instead of
+re-parsing the whole JSONL. Records appended by other tools are picked up
+from the last indexed byte offset, and a rewritten dataset (e.g. after
+deduplicate_data.py) triggers a full rebuild.
+
+Usage: python src/url_index.py --rebuild [dataset.jsonl]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+
+DATASET_FILE = "data/testing_data.jsonl"
+INDEX_SUFFIX = ".urls.sqlite"
+
+
+class UrlIndex:
+    """Persistent set of dataset URLs kept in sync with the JSONL file"""
+
+    def __init__(self, dataset_file=DATASET_FILE, index_path=None):
+        self.dataset_file = dataset_file
+        self.index_path = index_path or dataset_file + INDEX_SUFFIX
+        self._lock = threading.Lock()
+        directory = os.path.dirname(self.index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.index_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self._conn.commit()
+        self.sync()
+
+    def _get_meta(self, key, default=None):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def sync(self):
+        """Catch up with records appended since the last indexed offset, or rebuild if rewritten"""
+        with self._lock:
+            if not os.path.exists(self.dataset_file):
+                if self._get_meta('offset', 0):
+                    self._reset()
+                    self._conn.commit()
+                return
+            stat = os.stat(self.dataset_file)
+            offset = self._get_meta('offset', 0)
+            if stat.st_ino != self._get_meta('inode') or stat.st_size < offset:
+                self._reset()
+                offset = 0
+            if stat.st_size > offset:
+                self._index_from(offset)
+            self._set_meta('inode', stat.st_ino)
+            self._conn.commit()
+
+    def rebuild(self):
+        """Drop the index and re-scan the whole dataset"""
+        with self._lock:
+            self._reset()
+            self._conn.commit()
+        self.sync()
+        print(f"🗂️  Rebuilt URL index: {len(self)} URLs from {self.dataset_file}")
+
+    def _reset(self):
+        self._conn.execute("DELETE FROM urls")
+        self._conn.execute("DELETE FROM meta")
+
+    def _index_from(self, offset):
+        urls = []
+        with open(self.dataset_file, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                # Stop at a partially written last line; it is picked up next time
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                try:
+                    url = json.loads(line).get('source', '')
+                except (ValueError, AttributeError):
+                    continue
+                if url:
+                    urls.append((url,))
+        self._conn.executemany("INSERT OR IGNORE INTO urls VALUES (?)", urls)
+        self._set_meta('offset', offset)
+
+    def add(self, url, end_offset=None, size=None):
+        """Record a URL just appended by a writer; `end_offset` is the file position after its line of `size` bytes"""
+        self.add_many([url], end_offset, size)
+
+    def add_many(self, urls, end_offset=None, size=None):
+        """Record URLs whose lines a writer just appended as one contiguous block of `size` bytes"""
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO urls VALUES (?)", [(url,) for url in urls if url])
+            # Only step over this writer's own lines; if another writer appended
+            # before them, the next sync scans those from the stored offset
+            if end_offset is not None and size is not None and end_offset - size == self._get_meta('offset', 0):
+                self._set_meta('offset', end_offset)
+            self._conn.commit()
+
+    def __contains__(self, url):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM urls WHERE url = ?", (url,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the dataset URL index")
+    parser.add_argument("dataset", nargs="?", default=DATASET_FILE)
+    parser.add_argument("--rebuild", action="store_true", help="Re-scan the whole dataset")
+    args = parser.parse_args()
+
+    index = UrlIndex(args.dataset)
+    if args.rebuild:
+        index.rebuild()
+    else:
+        print(f"🗂️  URL index up to date: {len(index)} URLs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+EgySentiment Work Pipeline
+Producer/consumer pipeline for extract -> label -> write processing.
+A pool of extraction workers fills a bounded queue, the (rate-limited)
+labeling stage drains it, and a single writer consumes the results on the
+calling thread, so network-bound extraction overlaps with the LLM window.
+"""
+
+import queue
+import threading
+
+_DONE = object()
+
+
+def run_pipeline(items, extract, label, write, extract_workers=4, label_workers=1, queue_size=16):
+    """Run items through extract, label and write stages concurrently
+
+    `extract` and `label` may return None to drop an item. `write` is only
+    ever called from the calling thread. Returns the number of written items.
+    """
+    todo = queue.Queue()
+    for item in items:
+        todo.put(item)
+
+    # Bounded queues give backpressure: extraction never runs far ahead of labeling
+    extracted = queue.Queue(maxsize=queue_size)
+    labeled = queue.Queue(maxsize=queue_size)
+
+    def extractor():
+        while True:
+            try:
+                item = todo.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                result = extract(item)
+            except Exception as e:
+                print(f"⚠️  Extraction failed: {e}")
+                continue
+            if result is not None:
+                extracted.put(result)
+
+    def labeler():
+        while True:
+            item = extracted.get()
+            if item is _DONE:
+                return
+            try:
+                result = label(item)
+            except Exception as e:
+                print(f"⚠️  Labeling failed: {e}")
+                continue
+            if result is not None:
+                labeled.put(result)
+
+    def start(target, count):
+        threads = [threading.Thread(target=target, daemon=True) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def close_after(threads, out_queue, sentinels):
+        for thread in threads:
+            thread.join()
+        for _ in range(sentinels):
+            out_queue.put(_DONE)
+
+    extractors = start(extractor, extract_workers)
+    labelers = start(labeler, label_workers)
+    threading.Thread(target=close_after, args=(extractors, extracted, label_workers), daemon=True).start()
+    threading.Thread(target=close_after, args=(labelers, labeled, 1), daemon=True).start()
+
+    written = 0
+    while True:
+        record = labeled.get()
+        if record is _DONE:
+            break
+        write(record)
+        written += 1
+    return written
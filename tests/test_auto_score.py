@@ -0,0 +1,90 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import auto_score
+from feature_store import FeatureStore, content_hash
+from structured_output import PARSE_ERROR
+
+
+class ResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.input_file = os.path.join(self.dir, "data.jsonl")
+        self.store_dir = os.path.join(self.dir, "features")
+        self.failing = set()
+        self.labeled = []
+        self._patched = (auto_score.INPUT_FILE, auto_score.analyze_text, auto_score.FeatureStore)
+        auto_score.INPUT_FILE = self.input_file
+        auto_score.analyze_text = self.label
+        auto_score.FeatureStore = lambda: FeatureStore(self.store_dir)
+
+    def tearDown(self):
+        auto_score.INPUT_FILE, auto_score.analyze_text, auto_score.FeatureStore = self._patched
+        shutil.rmtree(self.dir)
+
+    def label(self, text):
+        self.labeled.append(text)
+        if text in self.failing:
+            return None, PARSE_ERROR
+        return "positive", "ok"
+
+    def write(self, *texts):
+        with open(self.input_file, 'a', encoding='utf-8') as f:
+            for text in texts:
+                f.write(json.dumps({"text": text, "published": "2025-07-01", "tickers": []}) + '\n')
+
+    def run_main(self):
+        self.labeled = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            auto_score.main(workers=2, chunk_size=2)
+
+    def test_offset_stops_at_failed_row(self):
+        self.write("first", "second", "third", "fourth", "fifth")
+        self.failing = {"second"}
+        self.run_main()
+        store = FeatureStore(self.store_dir)
+        self.assertEqual(len(store), 4)
+        with open(self.input_file, 'rb') as f:
+            second_row = len(f.readline())
+        self.assertEqual(store.input_offset(self.input_file), second_row)
+
+        # The next run retries only the failed row and then moves to the end
+        self.failing = set()
+        self.run_main()
+        self.assertEqual(self.labeled, ["second"])
+        store = FeatureStore(self.store_dir)
+        self.assertIn(content_hash("second"), store)
+        self.assertEqual(store.input_offset(self.input_file), os.path.getsize(self.input_file))
+
+    def test_row_that_never_parses_is_given_up(self):
+        self.write("first", "broken", "third")
+        self.failing = {"broken"}
+        for _ in range(auto_score.MAX_ROW_ATTEMPTS):
+            self.run_main()
+            self.assertIn("broken", self.labeled)
+        # The last failed attempt releases the offset, and later runs skip the row
+        store = FeatureStore(self.store_dir)
+        self.assertEqual(store.input_offset(self.input_file), os.path.getsize(self.input_file))
+        self.write("fourth")
+        self.run_main()
+        self.assertEqual(self.labeled, ["fourth"])
+        self.assertEqual(store.failed_attempts(content_hash("broken")), auto_score.MAX_ROW_ATTEMPTS)
+
+    def test_new_rows_after_success(self):
+        self.write("first", "second")
+        self.run_main()
+        self.write("third")
+        self.run_main()
+        self.assertEqual(self.labeled, ["third"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from batch_jobs import RESULTS_FILE, BatchJob, JobRunner
+from fast_classifier import Cascade
+
+
+class FixedClassifier:
+    def predict(self, text):
+        return "positive", 0.9 if "sure" in text else 0.1
+
+
+class BatchJobTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        records = [{"text": f"article {i}"} for i in range(6)]
+        self.job = BatchJob.create(records, {"text_col": "text"}, self.root)
+        self.results_path = os.path.join(self.job.dir, RESULTS_FILE)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def run_job(self, label):
+        runner = JobRunner(self.job, label, workers=2)
+        runner._thread.join()
+        return runner
+
+    def test_reading_leaves_partial_line(self):
+        with open(self.results_path, 'w', encoding='utf-8') as f:
+            f.write('{"row": 0, "sentiment": "neutral", "reasoning": "ok"}\n{"row": 1, "sent')
+        size = os.path.getsize(self.results_path)
+        self.assertEqual(list(self.job.results()), [0])
+        # A reader must not cut the line a runner is still writing
+        self.assertEqual(os.path.getsize(self.results_path), size)
+
+    def test_runner_repairs_and_resumes(self):
+        with open(self.results_path, 'w', encoding='utf-8') as f:
+            f.write('{"row": 0, "sentiment": "neutral", "reasoning": "ok"}\n{"row": 1, "sent')
+        labeled = []
+        runner = self.run_job(lambda text: labeled.append(text) or ("positive", "ok"))
+        self.assertEqual(sorted(labeled), [f"article {i}" for i in range(1, 6)])
+        status = runner.status()
+        self.assertEqual((status["state"], status["done"], status["total"]), ("finished", 6, 6))
+        self.assertEqual(sorted(self.job.results()), list(range(6)))
+
+    def test_cascade_counts_from_threads(self):
+        cascade = Cascade(FixedClassifier(), lambda text: ("neutral", "llm"), threshold=0.5)
+        threads = [threading.Thread(target=lambda: [cascade(t) for t in ["sure", "maybe"] * 500]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((cascade.fast, cascade.deferred), (2000, 2000))
+        self.assertIn("2000/4000", cascade.summary())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from http_cache import HttpCache
+from label_cache import LabelCache
+
+try:
+    import data_pipeline
+    from data_pipeline import parse_packed_response
+except ImportError:  # groq, newspaper, nltk, ... not installed
+    data_pipeline = parse_packed_response = None
+
+
+@unittest.skipIf(parse_packed_response is None, "data_pipeline dependencies not installed")
+class PackedResponseTest(unittest.TestCase):
+    IDS = {"1", "2"}
+
+    def test_plain_array(self):
+        content = '[{"id": "1", "sentiment": "Positive", "reasoning": "growth"}, {"id": 2, "sentiment": "negative"}]'
+        self.assertEqual(parse_packed_response(content, self.IDS), {
+            "1": {"sentiment": "positive", "reasoning": "growth"},
+            "2": {"sentiment": "negative", "reasoning": ""},
+        })
+
+    def test_prose_and_wrapper_object(self):
+        self.assertEqual(list(parse_packed_response('Results: [{"id": "1", "sentiment": "neutral"}] done', self.IDS)),
+                         ["1"])
+        self.assertEqual(list(parse_packed_response('{"results": [{"id": "2", "sentiment": "neutral"}]}', self.IDS)),
+                         ["2"])
+
+    def test_invalid_items_are_dropped(self):
+        content = ('[{"id": "1", "sentiment": "bullish"}, {"id": "3", "sentiment": "neutral"}, "x", '
+                   '{"id": "2", "sentiment": "neutral"}, {"id": "2", "sentiment": "positive"}]')
+        self.assertEqual(parse_packed_response(content, self.IDS), {"2": {"sentiment": "neutral", "reasoning": ""}})
+
+    def test_unparseable(self):
+        self.assertEqual(parse_packed_response("no json here", self.IDS), {})
+        self.assertEqual(parse_packed_response("[{broken", self.IDS), {})
+
+
+@unittest.skipIf(data_pipeline is None, "data_pipeline dependencies not installed")
+class PackedCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self._cache = data_pipeline._label_cache
+        data_pipeline._label_cache = LabelCache(os.path.join(self.dir, "labels.sqlite"))
+
+    def tearDown(self):
+        data_pipeline._label_cache = self._cache
+        shutil.rmtree(self.dir)
+
+    def test_fallback_labels_are_found_by_packed_mode(self):
+        cache = data_pipeline.get_label_cache()
+        self.assertIsNone(data_pipeline.packed_cached_label("CIB profit rises"))
+        # Left out of a packed answer, then labeled on its own
+        cache.put("CIB profit rises", data_pipeline.GROQ_MODEL, data_pipeline.PROMPT_VERSION,
+                  {"sentiment": "positive", "reasoning": "single"})
+        self.assertEqual(data_pipeline.packed_cached_label("CIB profit rises")["reasoning"], "single")
+        cache.put("CIB profit rises", data_pipeline.GROQ_MODEL, data_pipeline.PACKED_PROMPT_VERSION,
+                  {"sentiment": "positive", "reasoning": "packed"})
+        self.assertEqual(data_pipeline.packed_cached_label("CIB profit rises")["reasoning"], "packed")
+
+
+class TricklingFeedHandler(BaseHTTPRequestHandler):
+    FEED = b"<rss><channel><item><title>CIB profit rises</title></item></channel></rss>"
+
+    def do_GET(self):
+        self.send_response(200)
+        repeats = 100 if self.path == "/slow" else 1
+        self.send_header("Content-Length", str(len(self.FEED) * repeats))
+        self.end_headers()
+        try:
+            # /slow never goes quiet long enough for the per-read timeout to fire
+            for _ in range(repeats):
+                self.wfile.write(self.FEED)
+                self.wfile.flush()
+                time.sleep(0.1 if self.path == "/slow" else 0)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@unittest.skipIf(data_pipeline is None, "data_pipeline dependencies not installed")
+class FetchDeadlineTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), TricklingFeedHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._patched = (data_pipeline.RSS_FEEDS, data_pipeline._http_cache)
+        data_pipeline.RSS_FEEDS = [f"{base_url}/slow", f"{base_url}/fast"]
+        data_pipeline._http_cache = HttpCache(self.dir)
+
+    def tearDown(self):
+        data_pipeline.RSS_FEEDS, data_pipeline._http_cache = self._patched
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.dir)
+
+    def test_slow_feed_does_not_overrun_deadline(self):
+        start = time.monotonic()
+        with contextlib.redirect_stdout(io.StringIO()):
+            entries = data_pipeline.fetch_rss_entries(deadline=1)
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual([e.title for e in entries], ["CIB profit rises"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import deduplicate_data
+from deduplicate_data import (
+    DedupState, find_title_duplicates, find_title_duplicates_bruteforce, synthetic_titles, templated_titles
+)
+
+
+def record(url, title, text="body"):
+    return {"source": url, "title": title, "text": text}
+
+
+class TitleDuplicatesTest(unittest.TestCase):
+    def test_matches_bruteforce(self):
+        titles = synthetic_titles(300, seed=3)
+        self.assertEqual(find_title_duplicates(titles, progress=False),
+                         find_title_duplicates_bruteforce(titles, progress=False))
+
+    def test_templated_headlines_match_bruteforce(self):
+        # Recurring headlines give many candidates past the bounds; every one must be checked
+        for seed in range(3):
+            titles = templated_titles(300, seed=seed)
+            self.assertEqual(find_title_duplicates(titles, progress=False),
+                             find_title_duplicates_bruteforce(titles, progress=False), f"seed {seed}")
+
+
+class DedupStateTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.dataset = os.path.join(self.dir, "data.jsonl")
+        self._paths = (deduplicate_data.input_file, deduplicate_data.output_file)
+        deduplicate_data.input_file = self.dataset
+        deduplicate_data.output_file = self.dataset + ".bak"
+
+    def tearDown(self):
+        deduplicate_data.input_file, deduplicate_data.output_file = self._paths
+        shutil.rmtree(self.dir)
+
+    def append(self, *records):
+        with open(self.dataset, 'a', encoding='utf-8') as f:
+            for r in records:
+                f.write(json.dumps(r) + '\n')
+
+    def titles(self):
+        with open(self.dataset, encoding='utf-8') as f:
+            return [json.loads(line)["title"] for line in f]
+
+    def run_incremental(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            deduplicate_data.deduplicate_incremental()
+
+    def test_incremental_runs(self):
+        self.append(record("https://a", "CIB reports record quarterly profit"),
+                    record("https://b", "EGX30 closes higher on banking gains"))
+        self.run_incremental()
+        state = DedupState(self.dataset)
+        self.assertTrue(state.is_valid())
+        self.assertEqual(len(state.index), 2)
+
+        self.append(record("https://a", "Same URL again"),
+                    record("https://c", "CIB reports record quarterly profits"),
+                    record("https://d", "Fawry expands into Saudi Arabia"))
+        self.run_incremental()
+        self.assertEqual(self.titles(), ["CIB reports record quarterly profit",
+                                         "EGX30 closes higher on banking gains",
+                                         "Fawry expands into Saudi Arabia"])
+
+        # Only the kept title was appended to the stored index
+        state = DedupState(self.dataset)
+        self.assertTrue(state.is_valid())
+        self.assertEqual(len(state.index), 3)
+        self.assertIn("https://d", state)
+
+    def test_incremental_matches_full_run_on_templated_headlines(self):
+        # Longer texts first, so a full run checks the titles in file order
+        titles = templated_titles(300, seed=2)
+        records = [record(f"https://news/{i}", title, "x" * (1000 - i)) for i, title in enumerate(titles)]
+        flags = find_title_duplicates_bruteforce(titles, progress=False)
+        expected = [title for title, is_duplicate in zip(titles, flags) if not is_duplicate]
+
+        self.append(*records)
+        with contextlib.redirect_stdout(io.StringIO()):
+            deduplicate_data.deduplicate()
+        self.assertEqual(self.titles(), expected)
+
+        os.remove(self.dataset)
+        for start in range(0, len(records), 100):
+            self.append(*records[start:start + 100])
+            self.run_incremental()
+        self.assertEqual(self.titles(), expected)
+
+    def test_streaming_matches_full_run(self):
+        titles = synthetic_titles(150, seed=4) + templated_titles(150, seed=4)
+        records = [record(f"https://news/{i % 280}", title, "x" * (i * 7 % 500)) for i, title in enumerate(titles)]
+        self.append(*records)
+        with contextlib.redirect_stdout(io.StringIO()):
+            deduplicate_data.deduplicate()
+        with open(self.dataset, encoding='utf-8') as f:
+            expected = f.read()
+
+        os.remove(self.dataset)
+        self.append(*records)
+        with contextlib.redirect_stdout(io.StringIO()):
+            deduplicate_data.deduplicate_streaming(chunk_size=50)
+        with open(self.dataset, encoding='utf-8') as f:
+            self.assertEqual(f.read(), expected)
+        # The temporary URL map and title index are cleaned up
+        self.assertEqual(sorted(name for name in os.listdir(self.dir) if name.startswith('.dedup-')), [])
+
+    def test_uncommitted_titles_are_dropped(self):
+        self.append(record("https://a", "CIB reports record quarterly profit"))
+        self.run_incremental()
+        state = DedupState(self.dataset)
+        state.add("https://b", "a title that was never committed")
+        state._conn.close()
+
+        state = DedupState(self.dataset)
+        self.assertEqual(len(state.index), 1)
+        self.assertNotIn("https://b", state)
+
+    def test_rewritten_dataset_invalidates_state(self):
+        self.append(record("https://a", "CIB reports record quarterly profit"))
+        self.run_incremental()
+        replacement = self.dataset + ".new"
+        with open(replacement, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(record("https://z", "Other")) + '\n')
+        os.replace(replacement, self.dataset)
+        self.assertFalse(DedupState(self.dataset).is_valid())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from feature_store import FeatureStore, content_hash
+
+
+def row(text, date="2025-07-01", tickers=None):
+    return {"date": date, "content_hash": content_hash(text), "sentiment": "positive", "sentiment_score": 1,
+            "reasoning": "ok", "tickers": tickers or []}
+
+
+class FeatureStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.store = FeatureStore(os.path.join(self.dir, "features"))
+        self.input_file = os.path.join(self.dir, "data.jsonl")
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            f.write('{"text": "a"}\n{"text": "b"}\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_offset_roundtrip(self):
+        self.assertEqual(self.store.input_offset(self.input_file), 0)
+        self.store.set_input_offset(self.input_file, 14)
+        self.assertEqual(FeatureStore(self.store.root).input_offset(self.input_file), 14)
+
+    def test_offset_resets_on_truncate_and_replace(self):
+        self.store.set_input_offset(self.input_file, 28)
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            f.write('{"text": "a"}\n')
+        self.assertEqual(self.store.input_offset(self.input_file), 0)
+
+        self.store.set_input_offset(self.input_file, 14)
+        replacement = self.input_file + ".new"
+        with open(replacement, 'w', encoding='utf-8') as f:
+            f.write('{"text": "c"}\n{"text": "d"}\n')
+        os.replace(replacement, self.input_file)
+        self.assertEqual(self.store.input_offset(self.input_file), 0)
+
+    def test_append_skips_known_hashes(self):
+        self.assertEqual(self.store.append([row("a"), row("b", "2025-07-02"), row("a")]), 2)
+        self.assertEqual(self.store.append([row("a"), row("c", "2025-07-02", ["COMI.CA"])]), 1)
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store.dates_since(0), (3, ["2025-07-01", "2025-07-02"]))
+        self.assertEqual(self.store.dates_since(2), (3, ["2025-07-02"]))
+        features = self.store.read(dates=["2025-07-02"])
+        self.assertEqual(sorted(features["content_hash"]), sorted([content_hash("b"), content_hash("c")]))
+
+
+if __name__ == "__main__":
+    unittest.main()
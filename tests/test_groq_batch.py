@@ -0,0 +1,97 @@
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from groq_batch import (
+    build_request, download_results, merge_results, parse_results, read_jsonl, submit_batch,
+    unique_by_url, wait_for_batch, write_jsonl
+)
+from groq_stub import run_batch, start_server
+
+HAS_GROQ = importlib.util.find_spec("groq") is not None
+
+
+def pending_record(url, text):
+    return {"custom_id": url.rsplit('/', 1)[-1], "text": text, "source": url, "sentiment": None, "reasoning": None}
+
+
+class GroqBatchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.base_url = start_server()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def requests_file(self, records):
+        path = os.path.join(self.dir, "requests.jsonl")
+        write_jsonl(path, [build_request(r["custom_id"], "stub", "system", r["text"], 100) for r in records])
+        return path
+
+    def test_unique_by_url(self):
+        records = [pending_record("https://x/a", "first"), pending_record("https://x/b", "other"),
+                   pending_record("https://x/a", "same article from another source")]
+        self.assertEqual([r["text"] for r in unique_by_url(records)], ["first", "other"])
+
+    def test_parse_results(self):
+        records = [pending_record("https://x/a", "CIB profit rises"), pending_record("https://x/b", "losses widen")]
+        with open(self.requests_file(records), 'rb') as f:
+            output, total = run_batch(f.read())
+        lines = output.decode('utf-8').splitlines()
+        lines.append(json.dumps({"custom_id": "failed", "response": {"status_code": 500}, "error": None}))
+        bad = json.loads(lines[0])
+        bad["custom_id"] = "bad"
+        bad["response"]["body"]["choices"][0]["message"]["content"] = '{"sentiment": "bullish"}'
+        lines.append(json.dumps(bad))
+
+        results = parse_results("\n".join(lines))
+        self.assertEqual(total, 2)
+        self.assertEqual(results["a"]["sentiment"], "positive")
+        self.assertEqual(results["b"]["sentiment"], "negative")
+        self.assertEqual(results["bad"], {"sentiment": "neutral", "reasoning": "parsing_error"})
+        self.assertNotIn("failed", results)
+
+    def test_stub_server_batch_flow(self):
+        path = self.requests_file([pending_record("https://x/a", "CIB profit rises")])
+        with open(path, 'rb') as f:
+            uploaded = requests.post(f"{self.base_url}/openai/v1/files", files={"file": f},
+                                     data={"purpose": "batch"}).json()
+        batch = requests.post(f"{self.base_url}/openai/v1/batches", json={
+            "input_file_id": uploaded["id"], "endpoint": "/v1/chat/completions", "completion_window": "24h"}).json()
+        self.assertEqual(batch["status"], "completed")
+        self.assertEqual(batch["request_counts"]["completed"], 1)
+        content = requests.get(f"{self.base_url}/openai/v1/files/{batch['output_file_id']}/content").text
+        self.assertEqual(parse_results(content)["a"]["sentiment"], "positive")
+
+    @unittest.skipUnless(HAS_GROQ, "groq SDK not installed")
+    def test_groq_client_against_stub(self):
+        from groq import Groq
+        client = Groq(api_key="test", base_url=self.base_url)
+        records = [pending_record("https://x/a", "CIB profit rises"), pending_record("https://x/b", "EGX falls")]
+        batch = wait_for_batch(client, submit_batch(client, self.requests_file(records)).id, poll_interval=0)
+        results = download_results(client, batch)
+
+        dataset = os.path.join(self.dir, "data.jsonl")
+        self.assertEqual(merge_results(records, results, dataset), [])
+        self.assertEqual([(r["source"], r["sentiment"]) for r in read_jsonl(dataset)],
+                         [("https://x/a", "positive"), ("https://x/b", "negative")])
+
+
+if __name__ == "__main__":
+    unittest.main()
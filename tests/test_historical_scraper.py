@@ -0,0 +1,59 @@
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import groq_batch
+from groq_batch import read_jsonl, save_state, write_jsonl
+
+try:
+    import historical_scraper
+except ImportError:  # groq, newspaper, nltk, ... not installed
+    historical_scraper = None
+
+
+@unittest.skipIf(historical_scraper is None, "historical_scraper dependencies not installed")
+class FinishBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.output_file = os.path.join(self.dir, "data.jsonl")
+        self._patched = (groq_batch.STATE_FILE, groq_batch.REQUESTS_FILE, groq_batch.PENDING_FILE,
+                         groq_batch.BATCH_DIR, historical_scraper.PENDING_FILE,
+                         historical_scraper.wait_for_batch, historical_scraper.distill_knowledge)
+        groq_batch.BATCH_DIR = self.dir
+        groq_batch.STATE_FILE = os.path.join(self.dir, "batch_state.json")
+        groq_batch.REQUESTS_FILE = os.path.join(self.dir, "batch_requests.jsonl")
+        groq_batch.PENDING_FILE = historical_scraper.PENDING_FILE = os.path.join(self.dir, "pending_records.jsonl")
+
+    def tearDown(self):
+        (groq_batch.STATE_FILE, groq_batch.REQUESTS_FILE, groq_batch.PENDING_FILE,
+         groq_batch.BATCH_DIR, historical_scraper.PENDING_FILE,
+         historical_scraper.wait_for_batch, historical_scraper.distill_knowledge) = self._patched
+        shutil.rmtree(self.dir)
+
+    def test_failed_batch_labels_pending_and_clears_state(self):
+        pending = [{"custom_id": "a", "text": "CIB profit rises", "source": "https://x/a"},
+                   {"custom_id": "b", "text": "EGX falls", "source": "https://x/b"}]
+        write_jsonl(groq_batch.PENDING_FILE, pending)
+        write_jsonl(groq_batch.REQUESTS_FILE, [])
+        save_state({"batch_id": "batch_1", "submitted_at": "2025-07-01T00:00:00", "requests": 2})
+        labeled = []
+        historical_scraper.wait_for_batch = lambda client, batch_id: types.SimpleNamespace(
+            id=batch_id, status="failed", output_file_id=None)
+        historical_scraper.distill_knowledge = lambda text: labeled.append(text) or {
+            "sentiment": "neutral", "reasoning": "individual"}
+
+        self.assertEqual(historical_scraper.finish_batch("batch_1", self.output_file), 2)
+        self.assertEqual(labeled, ["CIB profit rises", "EGX falls"])
+        self.assertEqual([r["source"] for r in read_jsonl(self.output_file)], ["https://x/a", "https://x/b"])
+        # A later run starts a fresh collection instead of resuming the dead batch
+        self.assertIsNone(groq_batch.load_state())
+        self.assertFalse(os.path.exists(groq_batch.PENDING_FILE))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from http_cache import HttpCache
+
+BODY = b"<rss><channel><item><title>CIB profit rises</title></item></channel></rss>"
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = gzip.compress(BODY) if self.path == "/gzip" else BODY
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body) * (200 if self.path == "/slow" else 1)))
+        self.send_header("ETag", '"v1"')
+        if self.path == "/gzip":
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        try:
+            if self.path == "/slow":
+                # A few bytes at a time, never idle long enough to hit the read timeout
+                for _ in range(200):
+                    self.wfile.write(body)
+                    self.wfile.flush()
+                    time.sleep(0.05)
+            else:
+                self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+def start_feed_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class DeadlineFetchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.base_url = start_feed_server()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = HttpCache(self.dir)
+        self.session = requests.Session()
+
+    def tearDown(self):
+        self.session.close()
+        shutil.rmtree(self.dir)
+
+    def fetch(self, path, deadline):
+        return self.cache.fetch(self.session, self.base_url + path, lambda r: r.content.decode(),
+                                deadline=deadline, timeout=5)
+
+    def test_trickling_body_stops_at_deadline(self):
+        start = time.monotonic()
+        with self.assertRaises(requests.exceptions.Timeout):
+            self.fetch("/slow", start + 0.5)
+        self.assertLess(time.monotonic() - start, 1.5)
+
+    def test_body_within_deadline(self):
+        self.assertEqual(self.fetch("/feed", time.monotonic() + 5), BODY.decode())
+        self.assertEqual(self.fetch("/gzip", time.monotonic() + 5), BODY.decode())
+        # Stored like an unstreamed response
+        self.assertEqual(self.cache._load(self.base_url + "/feed")["size"], len(BODY))
+
+    def test_passed_deadline(self):
+        with self.assertRaises(requests.exceptions.Timeout):
+            self.fetch("/feed", time.monotonic())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from keyword_matcher import KeywordMatcher
+from stock_data import TickerTagger
+
+
+class KeywordMatcherTest(unittest.TestCase):
+    def test_substring_mode_is_case_insensitive(self):
+        matcher = KeywordMatcher(["CIB", "Fawry"])
+        self.assertTrue(matcher.search("cibc rallies"))
+        self.assertEqual(matcher.findall("FAWRY and CIB"), {"fawry", "cib"})
+
+    def test_whole_words_rejects_glued_latin_words(self):
+        matcher = KeywordMatcher(["CIB"], whole_words=True)
+        self.assertFalse(matcher.search("CIBC rallies"))
+        self.assertTrue(matcher.search("CIB's profit"))
+
+    def test_all_caps_keywords_are_case_sensitive(self):
+        matcher = KeywordMatcher(["EFG", "Edita"], whole_words=True)
+        self.assertFalse(matcher.search("the efg results"))
+        self.assertTrue(matcher.search("EFG results"))
+        self.assertTrue(matcher.search("EDITA results"))
+
+    def test_mixed_case_spelling_makes_an_acronym_insensitive(self):
+        matcher = KeywordMatcher(["KIMA", "Kima"], whole_words=True)
+        self.assertTrue(matcher.search("kima shares"))
+
+    def test_arabic_keywords_need_token_boundaries(self):
+        matcher = KeywordMatcher(["فوري"], whole_words=True)
+        self.assertTrue(matcher.search("أسهم فوري ترتفع"))
+        self.assertFalse(matcher.search("أسهم فوريكس"))
+
+    def test_arabic_prefixes_are_allowed(self):
+        matcher = KeywordMatcher(["المصرية للاتصالات", "جهينة"], whole_words=True)
+        self.assertTrue(matcher.search("والمصرية للاتصالات تعلن"))
+        self.assertTrue(matcher.search("أرباح لجهينة"))
+        self.assertTrue(matcher.search("وبجهينة"))
+        self.assertFalse(matcher.search("مجهينة"))
+
+
+class TickerTaggerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tagger = TickerTagger()
+
+    def test_company_mentions(self):
+        self.assertEqual(self.tagger.tag("CIB reports record profit"), ["COMI.CA"])
+        self.assertEqual(self.tagger.tag("CIB and EFG Hermes"), ["COMI.CA", "HRHO.CA"])
+        self.assertEqual(self.tagger.tag("Telecom Egypt (WE) said"), ["ETEL.CA"])
+        self.assertEqual(self.tagger.tag("والمصرية للاتصالات تعلن"), ["ETEL.CA"])
+        self.assertEqual(self.tagger.tag("أعلنت شركة فوري عن نتائجها"), ["FWRY.CA"])
+
+    def test_everyday_english_words(self):
+        self.assertEqual(self.tagger.tag("We expect growth in the east of the country"), [])
+        self.assertEqual(self.tagger.tag("WE WILL SEE GROWTH IN THE MIDDLE EAST"), [])
+        self.assertEqual(self.tagger.tag("Masr today"), [])
+
+    def test_everyday_arabic_words(self):
+        self.assertEqual(self.tagger.tag("تطوير البنية التحتية"), [])
+        self.assertEqual(self.tagger.tag("نتائج قوية"), [])
+        self.assertEqual(self.tagger.tag("قرار فوري من البنك المركزي"), [])
+        self.assertEqual(self.tagger.tag("إعادة إعمار غزة"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
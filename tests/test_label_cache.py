@@ -0,0 +1,32 @@
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+def has_modules(*names):
+    return all(importlib.util.find_spec(name) is not None for name in names)
+
+
+class ImportSideEffectsTest(unittest.TestCase):
+    def assert_import_creates_no_files(self, module):
+        with tempfile.TemporaryDirectory() as cwd:
+            subprocess.run([sys.executable, "-c", f"import sys; sys.path.insert(0, {os.path.abspath(SRC)!r}); "
+                            f"import {module}"], cwd=cwd, check=True, capture_output=True)
+            self.assertEqual(os.listdir(cwd), [])
+
+    def test_auto_score(self):
+        self.assert_import_creates_no_files("auto_score")
+
+    @unittest.skipUnless(has_modules("groq", "newspaper", "nltk", "fake_useragent"), "collector dependencies not installed")
+    def test_collectors(self):
+        self.assert_import_creates_no_files("data_pipeline")
+        self.assert_import_creates_no_files("historical_scraper")
+
+
+if __name__ == "__main__":
+    unittest.main()
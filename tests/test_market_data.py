@@ -0,0 +1,57 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pandas as pd
+
+from market_data import INITIAL_HISTORY_DAYS, MarketDataStore, SyntheticSource
+
+
+class MarketDataStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.source = SyntheticSource()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def store(self, refresh_seconds=3600):
+        return MarketDataStore(self.root, self.source, refresh_seconds)
+
+    def test_backfill_then_fresh(self):
+        store = self.store()
+        bars = store.update("COMI.CA")
+        self.assertEqual(self.source.calls, 1)
+        self.assertFalse(bars.empty)
+        self.assertTrue(bars.index.is_monotonic_increasing)
+        self.assertGreaterEqual(bars.index[0], pd.Timestamp.now().normalize() - pd.Timedelta(days=INITIAL_HISTORY_DAYS))
+
+        # A fresh file is served without asking the source
+        pd.testing.assert_frame_equal(store.update("COMI.CA"), bars)
+        self.assertEqual(self.source.calls, 1)
+
+    def test_incremental_update_keeps_history(self):
+        store = self.store(refresh_seconds=0)
+        bars = store.update("COMI.CA")
+        # Drop the newest bars as if they had not been published yet
+        store.save("COMI.CA", bars.iloc[:-5])
+        updated = store.update("COMI.CA")
+        self.assertEqual(self.source.calls, 2)
+        pd.testing.assert_frame_equal(updated, bars)
+
+    def test_update_many_is_one_download(self):
+        store = self.store()
+        store.update("COMI.CA")
+        bars = store.update_many(["COMI.CA", "HRHO.CA", "FWRY.CA"])
+        self.assertEqual(self.source.calls, 2)
+        self.assertEqual(sorted(bars), ["COMI.CA", "FWRY.CA", "HRHO.CA"])
+        self.assertTrue(all(not frame.empty for frame in bars.values()))
+        self.assertTrue(os.path.exists(store.path("FWRY.CA")))
+
+
+if __name__ == "__main__":
+    unittest.main()
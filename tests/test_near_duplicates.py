@@ -0,0 +1,68 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from near_duplicates import WINDOW_DAYS, NearDuplicateFilter
+
+SUMMARY = ("The Commercial International Bank reported a 40% rise in net profit for the second quarter, "
+           "driven by higher interest income and strong growth in retail lending across Egypt.")
+
+
+def entry(url, title, summary=""):
+    return {"link": url, "title": title, "summary": summary}
+
+
+class NearDuplicateFilterTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.window_file = os.path.join(self.dir, "window.npz")
+        self.aliases_file = os.path.join(self.dir, "aliases.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def filter(self, entries):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return [e["link"] for e in NearDuplicateFilter(self.window_file, self.aliases_file).filter_entries(entries)]
+
+    def test_wire_story_from_another_outlet(self):
+        kept = self.filter([entry("https://www.ahram.org.eg/1", "CIB profit jumps 40% in Q2", SUMMARY),
+                            entry("https://dailynewsegypt.com/2", "CIB profit jumps 40% in Q2.", SUMMARY)])
+        self.assertEqual(kept, ["https://www.ahram.org.eg/1"])
+
+    def test_same_outlet_recurring_headlines(self):
+        entries = [entry("https://ahram.org.eg/gold-sunday", "Gold prices in Egypt today Sunday"),
+                   entry("https://www.ahram.org.eg/gold-monday", "Gold prices in Egypt today Monday"),
+                   entry("https://ahram.org.eg/usd-1", "US dollar exchange rate against the Egyptian pound today",
+                         "The dollar traded at 48.50 pounds at the Central Bank of Egypt."),
+                   entry("https://ahram.org.eg/usd-2", "US dollar exchange rate against the Egyptian pound today",
+                         "The dollar traded at 48.55 pounds at the Central Bank of Egypt.")]
+        self.assertEqual(self.filter(entries), [e["link"] for e in entries])
+
+    def test_short_titles_need_a_closer_match(self):
+        kept = self.filter([entry("https://ahram.org.eg/gold-sunday", "Gold prices in Egypt today Sunday"),
+                            entry("https://masrawy.com/gold-monday", "Gold prices in Egypt today Monday")])
+        self.assertEqual(kept, ["https://ahram.org.eg/gold-sunday", "https://masrawy.com/gold-monday"])
+
+    def test_aliases_expire_with_window(self):
+        old = (datetime.now() - timedelta(days=WINDOW_DAYS + 1)).isoformat()
+        with open(self.aliases_file, 'w', encoding='utf-8') as f:
+            for url, canonical, timestamp in [("https://a.com/old", "https://b.com/x", old),
+                                              ("https://a.com/same-host", "https://a.com/x", datetime.now().isoformat()),
+                                              ("https://a.com/recent", "https://b.com/x", datetime.now().isoformat())]:
+                f.write(json.dumps({"url": url, "canonical": canonical, "timestamp": timestamp}) + '\n')
+        kept = self.filter([entry("https://a.com/old", "Old alias"), entry("https://a.com/same-host", "Same host"),
+                            entry("https://a.com/recent", "Recent alias")])
+        self.assertEqual(kept, ["https://a.com/old", "https://a.com/same-host"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from structured_output import (
+    REASONING_MAX_CHARS, ParseError, ParseStats, StreamingLabel, label_with_retries, parse_label, parse_label_lenient
+)
+
+
+class ParseLabelTest(unittest.TestCase):
+    def test_valid(self):
+        self.assertEqual(parse_label('{"sentiment": "positive", "reasoning": "Profit up"}'), ("positive", "Profit up"))
+        self.assertEqual(parse_label('{"sentiment": "neutral"}'), ("neutral", ""))
+
+    def test_reasoning_is_capped(self):
+        _, reasoning = parse_label('{"sentiment": "neutral", "reasoning": "%s"}' % ("x" * 500))
+        self.assertEqual(len(reasoning), REASONING_MAX_CHARS)
+
+    def test_invalid(self):
+        for content in ['', 'not json', '["positive"]', '{"sentiment": "bullish"}',
+                        '{"sentiment": "positive", "reasoning": 3}', None]:
+            with self.assertRaises(ParseError):
+                parse_label(content)
+
+    def test_retries(self):
+        answers = iter(['oops', '{"sentiment": "negative", "reasoning": "Loss"}'])
+        stats = ParseStats()
+        self.assertEqual(label_with_retries(lambda: next(answers), stats=stats), ("negative", "Loss"))
+        self.assertEqual((stats.labels, stats.retries, stats.failures), (1, 1, 0))
+        with self.assertRaises(ParseError):
+            label_with_retries(lambda: 'oops', retries=1, stats=stats)
+        self.assertEqual((stats.labels, stats.retries, stats.failures), (2, 2, 1))
+
+
+class StreamingLabelTest(unittest.TestCase):
+    def test_fields_while_streaming(self):
+        streamed = StreamingLabel()
+        streamed.feed('{"sentiment": "posi')
+        self.assertIsNone(streamed.sentiment)
+        streamed.feed('tive", "reasoning": "Record \\"Q2\\" profit \\u06')
+        self.assertEqual(streamed.sentiment, "positive")
+        # The half-received \u escape is held back
+        self.assertEqual(streamed.reasoning, 'Record "Q2" profit ')
+        streamed.feed('45"}')
+        self.assertEqual(streamed.reasoning, 'Record "Q2" profit \u0645')
+        self.assertEqual(streamed.result(), ("positive", 'Record "Q2" profit \u0645'))
+
+
+class LenientParseTest(unittest.TestCase):
+    def test_prose_around_object(self):
+        content = 'Sure! ```json\n{"sentiment": "negative", "reasoning": "Loss widened"}\n```'
+        self.assertEqual(parse_label_lenient(content), ("negative", "Loss widened"))
+
+    def test_no_object(self):
+        with self.assertRaises(ParseError):
+            parse_label_lenient("The sentiment is positive.")
+
+    def test_streamed_result_extracts_object(self):
+        streamed = StreamingLabel()
+        for delta in ['Here you go: {"sentiment": "positive", ', '"reasoning": "<b>Record</b> profit"}', ' Done.']:
+            streamed.feed(delta)
+        self.assertEqual(streamed.result(), ("positive", "<b>Record</b> profit"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import contextlib
+import io
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pandas as pd
+
+import ticker_features
+from auto_score import score_row
+from feature_store import HASH_INDEX, FeatureStore, content_hash
+
+
+def label(text):
+    return ("negative", "loss") if "loss" in text else ("positive", "profit")
+
+
+def scored(text, tickers, **dates):
+    record = dict(dates, text=text, tickers=tickers, content_hash=content_hash(text))
+    return score_row(record, label)
+
+
+class BackfillTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self._paths = (ticker_features.OUTPUT_FILE, ticker_features.STATE_FILE)
+        ticker_features.OUTPUT_FILE = os.path.join(self.dir, "features.parquet")
+        ticker_features.STATE_FILE = os.path.join(self.dir, "state.json")
+        self.store = FeatureStore(os.path.join(self.dir, "store"))
+
+    def tearDown(self):
+        ticker_features.OUTPUT_FILE, ticker_features.STATE_FILE = self._paths
+        shutil.rmtree(self.dir)
+
+    def update(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            ticker_features.update(self.store)
+        return pd.read_parquet(ticker_features.OUTPUT_FILE).set_index("date")
+
+    def test_rows_use_publication_date(self):
+        row = scored("CIB profit rises", ["COMI.CA"], published="Tue, 01 Jul 2025 09:30:00 +0000",
+                     timestamp="2025-10-01T12:00:00")
+        self.assertEqual(row["date"], "2025-07-01")
+        row = scored("CIB profit rises again", ["COMI.CA"], published="", timestamp="2025-10-01T12:00:00")
+        self.assertEqual(row["date"], "2025-10-01")
+        self.assertEqual(self.store.append([scored("Undated", ["COMI.CA"])]), 0)
+
+    def test_backfill_spreads_over_publication_days(self):
+        # Scraped on one day, published over three
+        self.store.append([
+            scored("CIB profit rises", ["COMI.CA"], published="2025-07-01", timestamp="2025-10-01T08:00:00"),
+            scored("CIB posts a loss", ["COMI.CA"], published="2025-07-03", timestamp="2025-10-01T08:00:01"),
+        ])
+        features = self.update()
+        self.assertEqual(list(features.index), ["2025-07-01", "2025-07-02", "2025-07-03"])
+        self.assertEqual(list(features["article_count"]), [1, 0, 1])
+        self.assertEqual(features.loc["2025-07-03", "article_count_7d"], 2)
+
+        # A later backfill of an earlier week is folded in on its own days
+        self.store.append([scored("CIB profit record", ["COMI.CA"], published="2025-06-30",
+                                  timestamp="2025-10-02T08:00:00")])
+        features = self.update()
+        self.assertEqual(features.index[0], "2025-06-30")
+        self.assertEqual(features.loc["2025-07-03", "article_count_7d"], 3)
+
+    def test_older_store_is_cleared(self):
+        self.store.append([scored("CIB profit rises", ["COMI.CA"], published="2025-07-01")])
+        self.update()
+        generation = self.store.generation
+        conn = sqlite3.connect(os.path.join(self.store.root, HASH_INDEX))
+        conn.execute("UPDATE meta SET value = 1 WHERE key = 'version'")
+        conn.commit()
+        conn.close()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.store = FeatureStore(self.store.root)
+        self.assertEqual(len(self.store), 0)
+        self.assertNotEqual(self.store.generation, generation)
+        self.assertEqual(ticker_features.load_state(self.store.generation), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from stock_data import TAGGER_VERSION
+from ticker_index import TickerIndex, article_date
+
+
+def write_records(path, records, mode='w'):
+    with open(path, mode, encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+class TickerIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.dataset = os.path.join(self.dir, "data.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_stale_ingest_tags_are_retagged(self):
+        write_records(self.dataset, [
+            # Tagged by the old substring tagger ("we", "east")
+            {"title": "We expect growth in the east", "text": "", "tickers": ["ETEL.CA", "EAST.CA"],
+             "published": "2025-03-01"},
+            {"title": "CIB profit", "text": "", "tickers": ["COMI.CA"], "tagger_version": TAGGER_VERSION,
+             "published": "2025-03-02"},
+            {"title": "Telecom Egypt results", "text": "", "timestamp": "2025-03-03T10:00:00"},
+        ])
+        index = TickerIndex(self.dataset)
+        self.assertEqual(index.counts(), {"COMI.CA": 1, "ETEL.CA": 1})
+        self.assertEqual([article_date(r) for r in index.articles("ETEL.CA")], ["2025-03-03"])
+
+    def test_catches_up_and_rebuilds_on_new_tagger_version(self):
+        write_records(self.dataset, [{"title": "CIB profit", "text": "", "published": "2025-03-01"}])
+        index = TickerIndex(self.dataset)
+        write_records(self.dataset, [{"title": "CIB loan", "text": "", "published": "2025-03-05"}], mode='a')
+        index.sync()
+        self.assertEqual([r["title"] for r in index.recent("COMI.CA")], ["CIB loan", "CIB profit"])
+
+        # An index written by an older tagger is dropped and rebuilt
+        index._conn.execute("INSERT INTO mentions VALUES ('EAST.CA', '2025-03-01', 0)")
+        index._set_meta('tagger_version', TAGGER_VERSION - 1)
+        index._conn.commit()
+        index.sync()
+        self.assertEqual(index.counts(), {"COMI.CA": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
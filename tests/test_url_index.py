@@ -0,0 +1,69 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from url_index import UrlIndex
+
+
+def append(path, url):
+    """Append one record the way the collectors do; returns (end offset, line size)"""
+    line = json.dumps({"source": url, "text": "..."}) + '\n'
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(line)
+        f.flush()
+        return f.tell(), len(line.encode('utf-8'))
+
+
+class UrlIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.dataset = os.path.join(self.dir, "data.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def reopen(self, index):
+        index._conn.close()
+        return UrlIndex(self.dataset)
+
+    def test_catches_up_with_appended_records(self):
+        append(self.dataset, "https://a")
+        index = UrlIndex(self.dataset)
+        self.assertIn("https://a", index)
+        append(self.dataset, "https://b")
+        with open(self.dataset, 'a', encoding='utf-8') as f:
+            f.write('{"source": "https://partial"')
+        index.sync()
+        self.assertIn("https://b", index)
+        self.assertNotIn("https://partial", index)
+        self.assertEqual(len(index), 2)
+
+    def test_writer_offsets(self):
+        index = UrlIndex(self.dataset)
+        index.add("https://a", *append(self.dataset, "https://a"))
+        # Another tool appends without telling this index, then this writer appends
+        append(self.dataset, "https://other")
+        index.add("https://b", *append(self.dataset, "https://b"))
+        self.assertNotIn("https://other", index)
+        index = self.reopen(index)
+        self.assertEqual(len(index), 3)
+        self.assertIn("https://other", index)
+
+    def test_rewritten_dataset_is_reindexed(self):
+        append(self.dataset, "https://a")
+        index = UrlIndex(self.dataset)
+        replacement = self.dataset + ".new"
+        append(replacement, "https://b")
+        os.replace(replacement, self.dataset)
+        index.sync()
+        self.assertNotIn("https://a", index)
+        self.assertIn("https://b", index)
+
+
+if __name__ == "__main__":
+    unittest.main()